@@ -0,0 +1,363 @@
+"""
+Asyncio API for embedding agt in orchestrators.
+
+The agent lifecycle behind `agt ws new/run/save/push/merge/clean` as
+coroutines built on asyncio subprocesses, so one event loop can drive
+hundreds of agents without a process or thread per operation:
+
+    from agt import api
+    
+    async def lifecycle(root):
+        wt = await api.start(root=root)
+        result = await api.run(wt.agent_id, "pytest -q", root=root)
+        if result.ok:
+            await api.commit(wt.agent_id, "feat: tests", root=root)
+            await api.merge(wt.agent_id, root=root)
+        await api.clean(wt.agent_id, root=root)
+
+Results are returned as dataclasses; failures raise AgtError instead of
+printing and exiting. git processes are capped per event loop at
+MAX_GIT_PROCESSES; commands started by run() are not capped. Cancelling a
+coroutine kills the process it is waiting for.
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import time
+import weakref
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from agt import journal
+from agt.worktree import (
+    LOCK_RETRY_ATTEMPTS,
+    LOCK_RETRY_DELAY,
+    _is_lock_error,
+    add_worktree,
+    format_git_error,
+    generate_agent_id,
+    get_repo_root,
+    get_worktree_path,
+)
+
+# git processes running at once per event loop (AGT_API_MAX_GIT, default
+# twice the CPU count); more only contend on the shared .git locks
+MAX_GIT_PROCESSES = int(os.environ.get("AGT_API_MAX_GIT") or 2 * (os.cpu_count() or 1))
+
+
+class AgtError(Exception):
+    """An agt operation failed; `returncode` and `stderr` are set if a process failed."""
+    
+    def __init__(self, message: str, returncode: Optional[int] = None, stderr: str = ""):
+        super().__init__(message)
+        self.returncode = returncode
+        self.stderr = stderr
+
+
+@dataclass
+class Worktree:
+    """An agent worktree."""
+    
+    agent_id: str
+    path: Path
+    branch: str
+
+
+@dataclass
+class RunResult:
+    """Outcome of a command run in an agent worktree."""
+    
+    agent_id: str
+    command: str
+    exit_status: int
+    stdout: bytes
+    stderr: bytes
+    wall: float
+    
+    @property
+    def ok(self) -> bool:
+        return self.exit_status == 0
+
+
+@dataclass
+class CommitResult:
+    """A commit made in an agent worktree."""
+    
+    agent_id: str
+    commit: str
+
+
+@dataclass
+class PushResult:
+    """An agent branch pushed to a remote."""
+    
+    agent_id: str
+    remote: str
+    branch: str
+
+
+@dataclass
+class MergeResult:
+    """An agent branch fast-forwarded into main."""
+    
+    agent_id: str
+    branch: str
+    commit: str
+
+
+# Per-event-loop state: the git process semaphore and the merge lock
+_loop_state: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+
+def _state() -> dict:
+    loop = asyncio.get_running_loop()
+    state = _loop_state.get(loop)
+    if state is None:
+        state = {"git": asyncio.Semaphore(MAX_GIT_PROCESSES), "merge": {}}
+        _loop_state[loop] = state
+    return state
+
+
+async def _communicate(proc: asyncio.subprocess.Process, group: bool = False) -> tuple[bytes, bytes]:
+    """
+    Wait for a process and collect its output, killing it if cancelled.
+    
+    With `group`, the whole process group led by the process is killed, so
+    children of a shell command don't outlive it holding its pipes open.
+    """
+    try:
+        return await proc.communicate()
+    except asyncio.CancelledError:
+        if proc.returncode is None:
+            if group:
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            else:
+                proc.kill()
+            await proc.wait()
+        raise
+
+
+async def _git(args: list[str], cwd: Path, attempts: int = LOCK_RETRY_ATTEMPTS) -> str:
+    """
+    Run git asynchronously, retrying failures caused by lock contention.
+    
+    Returns:
+        The command's stdout
+    """
+    for attempt in range(attempts):
+        async with _state()["git"]:
+            proc = await asyncio.create_subprocess_exec(
+                "git",
+                *args,
+                cwd=cwd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            stdout, stderr = await _communicate(proc)
+        if proc.returncode == 0:
+            return stdout.decode(errors="replace")
+        error = stderr.decode(errors="replace")
+        if attempt + 1 == attempts or not _is_lock_error(error):
+            lines = (error or stdout.decode(errors="replace")).strip().splitlines()
+            detail = lines[-1] if lines else f"exit status {proc.returncode}"
+            raise AgtError(f"git {args[0]} failed: {detail}", proc.returncode, error)
+        await asyncio.sleep(LOCK_RETRY_DELAY * (2 ** attempt))
+    raise AssertionError("unreachable")
+
+
+def _resolve_root(root: Optional[Path]) -> Path:
+    return Path(root) if root is not None else get_repo_root(Path.cwd())
+
+
+def _existing_worktree(root: Path, agent_id: str) -> Path:
+    worktree_path = get_worktree_path(root, agent_id)
+    if not worktree_path.exists():
+        raise AgtError(f"Worktree not found: {worktree_path}")
+    return worktree_path
+
+
+async def start(
+    base_branch: str = "main",
+    root: Optional[Path] = None,
+    sparse: Optional[list[str]] = None,
+) -> Worktree:
+    """
+    Create an agent worktree on a new feat/<agent-id> branch (agt ws new).
+    
+    A warm pool worktree is claimed if one is ready (see agt.pool); `sparse`
+    directories give a cone-mode sparse checkout and bypass the pool.
+    Otherwise the worktree is made by add_worktree in a thread, which is
+    not interrupted if the coroutine is cancelled. The calling process is
+    recorded as the worktree's owner (see agt.gc).
+    
+    Returns:
+        The new worktree
+    """
+    from agt.pool import claim_worktree, refill_in_background
+    
+    root = _resolve_root(root)
+    if not sparse:
+        try:
+            claimed = await asyncio.to_thread(claim_worktree, root, base_branch, os.getpid())
+        except subprocess.CalledProcessError as e:
+            raise AgtError(f"Failed to claim a pool worktree: {e}", e.returncode, e.stderr or "") from e
+        if claimed:
+            await asyncio.to_thread(refill_in_background, root, base_branch)
+            return Worktree(*claimed)
+    
+    agent_id = generate_agent_id()
+    # add_worktree is synchronous; its git processes count against the cap
+    async with _state()["git"]:
+        try:
+            worktree_path, branch_name = await asyncio.to_thread(
+                add_worktree, root, agent_id, base_branch, sparse=sparse, owner_pid=os.getpid()
+            )
+        except subprocess.CalledProcessError as e:
+            raise AgtError(f"git {e.cmd[1]} failed: {format_git_error(e)}", e.returncode, e.stderr or "") from e
+    return Worktree(agent_id, worktree_path, branch_name)
+
+
+async def run(
+    agent_id: str,
+    command: str,
+    root: Optional[Path] = None,
+    env: Optional[dict[str, str]] = None,
+) -> RunResult:
+    """
+    Run a shell command in an agent worktree and capture its output (agt ws run).
+    
+    A failing command is not an error: check `exit_status` or `ok`. The run
+    is recorded in the run metrics (see agt.metrics), without CPU and memory
+    usage, which asyncio does not report.
+    
+    Returns:
+        The command's exit status, output and wall time
+    """
+    from agt.metrics import record_run
+    from agt.runner import exit_status
+    
+    root = _resolve_root(root)
+    worktree_path = _existing_worktree(root, agent_id)
+    
+    group = hasattr(os, "killpg")
+    started = time.time()
+    proc = await asyncio.create_subprocess_shell(
+        command,
+        cwd=worktree_path,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+        start_new_session=group,
+    )
+    stdout, stderr = await _communicate(proc, group=group)
+    wall = time.time() - started
+    code = exit_status(proc.returncode)
+    record_run(root, agent_id, command, code, started, wall)
+    return RunResult(agent_id, command, code, stdout, stderr, wall)
+
+
+async def commit(agent_id: str, message: str, root: Optional[Path] = None) -> CommitResult:
+    """
+    Stage all changes in an agent worktree and commit them (agt ws save).
+    
+    Journaled worktrees stage only their recorded paths (see agt.journal).
+    
+    Returns:
+        The new commit
+    """
+    root = _resolve_root(root)
+    worktree_path = _existing_worktree(root, agent_id)
+    
+    # Stage only journaled paths when the agent keeps a journal (see agt.journal)
+    taken = await asyncio.to_thread(journal.take, worktree_path)
+    paths = await asyncio.to_thread(journal.read_paths, taken) if taken else None
+    saved = False
+    try:
+        if paths is None:
+            await _git(["add", "-A"], worktree_path)
+        else:
+            try:
+                await asyncio.to_thread(journal.stage_paths, worktree_path, paths)
+            except subprocess.CalledProcessError as e:
+                raise AgtError(f"Failed to stage journaled paths: {e}", e.returncode, (e.stderr or b"").decode()) from e
+        await _git(["commit", "-q", "-m", message], worktree_path)
+        saved = True
+    finally:
+        if taken:
+            await asyncio.to_thread(journal.finish, worktree_path, taken, saved)
+    sha = await _git(["rev-parse", "HEAD"], worktree_path)
+    return CommitResult(agent_id, sha.strip())
+
+
+async def push(agent_id: str, remote: str = "origin", root: Optional[Path] = None) -> PushResult:
+    """
+    Push an agent branch to a remote, setting its upstream (agt ws push).
+    
+    Returns:
+        The pushed branch
+    """
+    root = _resolve_root(root)
+    worktree_path = _existing_worktree(root, agent_id)
+    
+    await _git(["push", "-q", "-u", remote, "HEAD"], worktree_path)
+    return PushResult(agent_id, remote, f"feat/{agent_id}")
+
+
+async def merge(agent_id: str, root: Optional[Path] = None) -> MergeResult:
+    """
+    Rebase an agent branch onto origin/main and fast-forward main to it (agt ws merge).
+    
+    The rebase and fast-forward happen in memory (see agt.merge); merges
+    started from the same event loop run one at a time.
+    
+    Returns:
+        The merged branch and main's new commit
+    """
+    from agt.merge import MergeConflictError, merge_branch
+    
+    root = _resolve_root(root)
+    _existing_worktree(root, agent_id)
+    
+    locks = _state()["merge"]
+    lock = locks.setdefault(root, asyncio.Lock())
+    async with lock:
+        try:
+            result = await asyncio.to_thread(merge_branch, root, agent_id)
+        except MergeConflictError as e:
+            raise AgtError(f"rebase onto main failed: {e}") from e
+        except subprocess.CalledProcessError as e:
+            raise AgtError(f"git {e.cmd[1]} failed: {format_git_error(e)}", e.returncode, e.stderr or "") from e
+        except RuntimeError as e:
+            raise AgtError(str(e)) from e
+    return MergeResult(agent_id, result["branch"], result["commit"])
+
+
+async def clean(agent_id: str, root: Optional[Path] = None) -> Worktree:
+    """
+    Remove an agent worktree (agt ws clean). Its branch is kept.
+    
+    Returns:
+        The removed worktree
+    """
+    from agt import registry
+    
+    root = _resolve_root(root)
+    worktree_path = _existing_worktree(root, agent_id)
+    
+    stamp = await asyncio.to_thread(registry.begin_change, root)
+    await asyncio.to_thread(registry.set_state, root, agent_id, registry.REMOVING)
+    try:
+        await _git(["worktree", "remove", str(worktree_path)], root)
+    except BaseException:
+        await asyncio.to_thread(registry.set_state, root, agent_id, registry.ACTIVE)
+        raise
+    await asyncio.to_thread(registry.unregister_worktree, root, agent_id, stamp)
+    return Worktree(agent_id, worktree_path, f"feat/{agent_id}")
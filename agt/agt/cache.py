@@ -0,0 +1,224 @@
+"""Content-addressed cache of `ws run` results, shared by all agents (.work/.cache/run)."""
+
+import hashlib
+import os
+import struct
+import subprocess
+from pathlib import Path
+from typing import IO, Optional
+
+from agt.lock import file_lock
+from agt.worktree import get_work_dir
+
+CACHE_DIR_NAME = ".cache"
+
+# Size bound of the cache; least recently used entries are evicted beyond it
+MAX_CACHE_BYTES = int(os.environ.get("AGT_CACHE_MAX_BYTES") or 512 * 1024 * 1024)
+
+# Environment variables that are part of every cache key; AGT_CACHE_ENV adds
+# more (comma-separated names)
+CACHE_ENV = ("PATH", "PYTHONPATH", "VIRTUAL_ENV")
+
+# Stream IDs of recorded output
+STDOUT = 1
+STDERR = 2
+
+_MAGIC = b"AGTC1\n"
+_RECORD = struct.Struct(">BI")
+_EXIT = 0
+
+
+def get_cache_dir(root: Path) -> Path:
+    """Get the run cache directory (.work/.cache/run)."""
+    return get_work_dir(root) / CACHE_DIR_NAME / "run"
+
+
+def tree_hash(worktree_path: Path) -> str:
+    """
+    Hash the worktree's current content, including uncommitted and untracked files.
+    
+    The worktree's index is copied to a temporary index, `git add -A` stages
+    everything into it (reusing the index's stat data, so unchanged files
+    aren't rehashed) and `git write-tree` names the result. The real index
+    is untouched. Ignored files are not part of the hash.
+    """
+    import shutil
+    
+    from agt.template import worktree_git_dir
+    
+    git_dir = worktree_git_dir(worktree_path) if (worktree_path / ".git").is_file() else worktree_path / ".git"
+    tmp_index = git_dir / f"agt-cache-index.{os.getpid()}"
+    try:
+        if (git_dir / "index").exists():
+            shutil.copyfile(git_dir / "index", tmp_index)
+        env = dict(os.environ, GIT_INDEX_FILE=str(tmp_index))
+        subprocess.run(["git", "add", "-A"], check=True, capture_output=True, cwd=worktree_path, env=env)
+        result = subprocess.run(
+            ["git", "write-tree"], check=True, capture_output=True, text=True, cwd=worktree_path, env=env
+        )
+    finally:
+        tmp_index.unlink(missing_ok=True)
+    return result.stdout.strip()
+
+
+def cache_key(worktree_path: Path, command: str) -> str:
+    """Cache key of running `command` in the worktree's current state and environment."""
+    names = list(CACHE_ENV) + [n for n in os.environ.get("AGT_CACHE_ENV", "").split(",") if n]
+    digest = hashlib.sha256()
+    digest.update(f"tree {tree_hash(worktree_path)}\0command {command}\0".encode())
+    for name in sorted(set(names)):
+        digest.update(f"env {name}={os.environ.get(name, '')}\0".encode())
+    return digest.hexdigest()
+
+
+def _entry_path(root: Path, key: str) -> Path:
+    return get_cache_dir(root) / key[:2] / key
+
+
+def _count(root: Path, field: str) -> None:
+    """Increment a hit/miss counter (.work/.cache/run/stats)."""
+    cache_dir = get_cache_dir(root)
+    with file_lock(cache_dir / "stats.lock"):
+        stats = _read_counters(cache_dir)
+        stats[field] = stats.get(field, 0) + 1
+        tmp_path = cache_dir / f"stats.{os.getpid()}.tmp"
+        tmp_path.write_text("".join(f"{k} {v}\n" for k, v in sorted(stats.items())), encoding="utf-8")
+        os.replace(tmp_path, cache_dir / "stats")
+
+
+def _read_counters(cache_dir: Path) -> dict[str, int]:
+    try:
+        text = (cache_dir / "stats").read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return {}
+    counters = {}
+    for line in text.splitlines():
+        name, _, value = line.partition(" ")
+        counters[name] = int(value)
+    return counters
+
+
+def lookup(root: Path, key: str) -> Optional[tuple[list[tuple[int, bytes]], int]]:
+    """
+    Look up a cached result and count the hit or miss.
+    
+    Returns:
+        (records, exit_status) where records are (stream, data) in output
+        order, or None on a miss
+    """
+    path = _entry_path(root, key)
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        _count(root, "misses")
+        return None
+    
+    records = []
+    exit_code = None
+    pos = len(_MAGIC) if data.startswith(_MAGIC) else len(data)
+    while pos + _RECORD.size <= len(data):
+        stream, size = _RECORD.unpack_from(data, pos)
+        pos += _RECORD.size
+        chunk = data[pos:pos + size]
+        pos += size
+        if stream == _EXIT:
+            exit_code = struct.unpack(">i", chunk)[0]
+        else:
+            records.append((stream, chunk))
+    if exit_code is None:
+        # Truncated or foreign entry
+        path.unlink(missing_ok=True)
+        _count(root, "misses")
+        return None
+    
+    os.utime(path)  # LRU: entries are ordered by last use
+    _count(root, "hits")
+    return records, exit_code
+
+
+def store(root: Path, key: str, records: list[tuple[int, bytes]], exit_status: int) -> None:
+    """Store a command's output and exit status, then evict down to the size bound."""
+    path = _entry_path(root, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.parent / f"{key}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(_MAGIC)
+        for stream, data in records:
+            fh.write(_RECORD.pack(stream, len(data)))
+            fh.write(data)
+        fh.write(_RECORD.pack(_EXIT, 4))
+        fh.write(struct.pack(">i", exit_status))
+    os.replace(tmp_path, path)
+    evict(root)
+
+
+def _entries(root: Path) -> list[tuple[Path, os.stat_result]]:
+    """List cache entries as (path, stat) pairs."""
+    entries = []
+    cache_dir = get_cache_dir(root)
+    if not cache_dir.exists():
+        return entries
+    for shard in os.scandir(cache_dir):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            if entry.name.endswith(".tmp"):
+                continue
+            try:
+                entries.append((Path(entry.path), entry.stat()))
+            except FileNotFoundError:
+                pass
+    return entries
+
+
+def evict(root: Path, max_bytes: int = MAX_CACHE_BYTES) -> int:
+    """
+    Remove least recently used entries until the cache fits in max_bytes.
+    
+    Returns:
+        Number of entries removed
+    """
+    entries = _entries(root)
+    total = sum(st.st_size for _, st in entries)
+    removed = 0
+    for path, st in sorted(entries, key=lambda e: e[1].st_mtime):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= st.st_size
+        removed += 1
+    return removed
+
+
+def get_stats(root: Path) -> dict[str, int]:
+    """Return cache statistics: entries, bytes, hits and misses."""
+    entries = _entries(root)
+    counters = _read_counters(get_cache_dir(root))
+    return {
+        "entries": len(entries),
+        "bytes": sum(st.st_size for _, st in entries),
+        "hits": counters.get("hits", 0),
+        "misses": counters.get("misses", 0),
+    }
+
+
+def clear(root: Path) -> int:
+    """
+    Remove all cache entries and reset the statistics.
+    
+    Returns:
+        Number of entries removed
+    """
+    entries = _entries(root)
+    for path, _ in entries:
+        path.unlink(missing_ok=True)
+    (get_cache_dir(root) / "stats").unlink(missing_ok=True)
+    return len(entries)
+
+
+def replay(records: list[tuple[int, bytes]], stdout: IO[bytes], stderr: IO[bytes]) -> None:
+    """Write recorded output back to stdout/stderr in its original order."""
+    for stream, data in records:
+        target = stdout if stream == STDOUT else stderr
+        target.write(data)
+        target.flush()
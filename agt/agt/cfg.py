@@ -0,0 +1,14 @@
+"""Configuration (cfg) command handlers."""
+
+from agt.cli import err
+from agt.vscode import cmd_vscode_init
+
+
+def cfg_dispatch(action: str, args: list[str]) -> None:
+    """Dispatch configuration commands."""
+    if action == "vscode":
+        if args and args[0] != "init":
+            err('Usage: agt cfg vscode')
+        cmd_vscode_init()
+    else:
+        err(f"Unknown config action: {action}. Available: vscode")
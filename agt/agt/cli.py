@@ -1,23 +1,49 @@
 """CLI entrypoint for agt command."""
 
-import hashlib
-import json
 import os
-import subprocess
 import sys
-from pathlib import Path
-from typing import Optional, Tuple
-
-from agt.vscode import cmd_vscode_init
-from agt.worktree import (
-    add_worktree,
-    generate_agent_id,
-    get_current_agent_id,
-    get_repo_root,
-    get_worktree_path,
-    list_worktrees,
-    remove_worktree,
-)
+from typing import Callable, Optional, Tuple
+
+# Command registry: domain -> (module, dispatcher). A domain's handler module
+# is imported only when that domain is invoked, so e.g. `agt env time` never
+# loads the worktree machinery.
+COMMANDS: dict[str, Tuple[str, str]] = {
+    "ws": ("agt.ws", "ws_dispatch"),
+    "cfg": ("agt.cfg", "cfg_dispatch"),
+    "task": ("agt.task", "task_dispatch"),
+    "env": ("agt.env", "env_dispatch"),
+    "stats": ("agt.stats", "stats_dispatch"),
+}
+
+# Domains worth forwarding to a running agtd daemon; the rest start fast
+# enough in-process
+DAEMON_DOMAINS = {"ws"}
+
+# Handlers that moved out of this module, still importable from agt.cli
+_MOVED = {
+    "ws_dispatch": "agt.ws",
+    "cmd_start": "agt.ws",
+    "cmd_run": "agt.ws",
+    "cmd_commit": "agt.ws",
+    "cmd_push": "agt.ws",
+    "cmd_merge": "agt.ws",
+    "cmd_clean": "agt.ws",
+    "cmd_pool": "agt.ws",
+    "cfg_dispatch": "agt.cfg",
+    "task_dispatch": "agt.task",
+    "env_dispatch": "agt.env",
+    "cmd_env_audit": "agt.env",
+}
+
+
+def __getattr__(name: str):
+    """Resolve moved handlers lazily from their domain modules."""
+    if name in _MOVED:
+        import importlib
+        
+        return getattr(importlib.import_module(_MOVED[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def _parse_command(argv: list[str]) -> Tuple[Optional[str], Optional[str], list[str]]:
     """Parse domain and action from argv, return (domain, action, remaining_args)."""
@@ -39,6 +65,7 @@ def safe_print(msg: str, file=sys.stdout) -> None:
         msg = msg.replace("✅", "[OK]")
         msg = msg.replace("🚀", "[PUSHED]")
         msg = msg.replace("❌", "[ERROR]")
+        msg = msg.replace("⚠️", "[WARN]")
         print(msg, file=file)
 
 
@@ -61,353 +88,40 @@ def _parse_agent_flag(args: list[str]) -> Tuple[Optional[str], list[str]]:
     return agent_id, args
 
 
-def ws_dispatch(action: str, args: list[str]) -> None:
-    """Dispatch workspace (worktree) commands."""
-    agent_id, args = _parse_agent_flag(args)
-    
-    if action == "new":
-        base_branch = args[0] if args else "main"
-        cmd_start(base_branch)
-    
-    elif action == "run":
-        if not args:
-            err("Missing command to run")
-        cmd_run(args, agent_id=agent_id)
-    
-    elif action == "save":
-        if not args:
-            err('Usage: agt ws save [--agent <id>] "<message>"')
-        message = args[0]
-        cmd_commit(message, agent_id=agent_id)
-    
-    elif action == "push":
-        remote = args[0] if args else "origin"
-        cmd_push(remote, agent_id=agent_id)
-    
-    elif action == "merge":
-        cmd_merge(agent_id=agent_id)
-    
-    elif action == "clean":
-        cmd_clean(agent_id=agent_id)
-    
-    else:
-        err(f"Unknown workspace action: {action}. Available: new, run, save, push, merge, clean")
-
-
-def cfg_dispatch(action: str, args: list[str]) -> None:
-    """Dispatch configuration commands."""
-    if action == "vscode":
-        if args and args[0] != "init":
-            err('Usage: agt cfg vscode')
-        cmd_vscode_init()
-    else:
-        err(f"Unknown config action: {action}. Available: vscode")
-
-
-def task_dispatch(action: str, args: list[str]) -> None:
-    """Dispatch task management commands (preview - not yet implemented)."""
-    available_actions = ["list", "add", "pick", "done"]
-    if action not in available_actions:
-        err(f"Unknown task action: {action}. Available: {', '.join(available_actions)}")
-    
-    safe_print("🟡 Task module is a preview; functionality not yet implemented.", file=sys.stderr)
-    safe_print(f"Command: agt task {action} {' '.join(args) if args else ''}", file=sys.stderr)
-    sys.exit(0)
-
-
-def env_dispatch(action: str, args: list[str]) -> None:
-    """Dispatch environment commands."""
-    if action == "check":
-        # Simple environment check
-        python_version = sys.version_info
-        safe_print(f"Python {python_version.major}.{python_version.minor}.{python_version.micro}")
-        safe_print(f"Platform: {sys.platform}")
-    elif action == "python":
-        # Run python with args
-        if not args:
-            err("Usage: agt env python <script> [args...]")
-        subprocess.run([sys.executable] + args, check=True)
-    elif action == "time":
-        # Get current UTC timestamp
-        import datetime
-        print(datetime.datetime.now(datetime.UTC).isoformat())
-    elif action == "audit":
-        # Project audit: find empty files, large files, duplicates
-        cmd_env_audit(args)
-    else:
-        err(f"Unknown env action: {action}. Available: check, python, time, audit")
-
-
-def cmd_env_audit(args: list[str]) -> None:
-    """Run project audit: find empty files, large files, and duplicates."""
-    # Parse output path (optional)
-    output_path = Path("reports/project_audit_report.json")
-    exclude_dirs = {".git", "docs_refactor"}
-    
-    if args:
-        output_path = Path(args[0])
-    
-    # Ensure output directory exists
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    safe_print("INFO: Starting project audit...")
-    safe_print("INFO: Scanning files (excluding .git and docs_refactor)...")
-    
-    report = {
-        "empty_files": [],
-        "large_files": [],
-        "duplicate_hashes": {},
-        "summary": {"total_files": 0, "total_size_kb": 0}
-    }
-    
-    hashes = {}
-    processed = 0
-    
-    root_path = Path.cwd()
-    
-    for root, dirs, files in os.walk(root_path):
-        # Skip excluded directories
-        rel_root = Path(root).relative_to(root_path)
-        if any(part in exclude_dirs for part in rel_root.parts):
-            # Remove from dirs to prevent walking into them
-            dirs[:] = [d for d in dirs if d not in exclude_dirs]
-            continue
-        
-        # Log progress
-        if processed % 1000 == 0 and processed > 0:
-            safe_print(f"INFO: Processed {processed} files... (current: {rel_root})")
-        
-        for f in files:
-            path = Path(root) / f
-            try:
-                size = path.stat().st_size
-                report["summary"]["total_files"] += 1
-                report["summary"]["total_size_kb"] += size / 1024
-                processed += 1
-                
-                # Check for empty files
-                if size == 0:
-                    report["empty_files"].append(str(path.relative_to(root_path)))
-                
-                # Check for large files (>10MB)
-                if size > 10_000_000:
-                    report["large_files"].append({
-                        "path": str(path.relative_to(root_path)),
-                        "size_mb": round(size / 1_000_000, 2)
-                    })
-                
-                # Calculate hash for duplicate detection (first 8KB)
-                try:
-                    with open(path, "rb") as fh:
-                        h = hashlib.md5(fh.read(8192)).hexdigest()
-                        rel_path = str(path.relative_to(root_path))
-                        hashes.setdefault(h, []).append(rel_path)
-                except (IOError, OSError):
-                    # Skip files that can't be read
-                    pass
-                    
-            except (OSError, PermissionError):
-                # Silently skip files that can't be accessed
-                pass
-    
-    safe_print(f"INFO: Finished scanning. Total files processed: {processed}")
-    safe_print("INFO: Analyzing duplicates...")
-    
-    # Find duplicates (files with same hash)
-    report["duplicate_hashes"] = {k: v for k, v in hashes.items() if len(v) > 1}
-    
-    safe_print(f"INFO: Found {len(report['empty_files'])} empty files")
-    safe_print(f"INFO: Found {len(report['large_files'])} large files (>10MB)")
-    safe_print(f"INFO: Found {len(report['duplicate_hashes'])} duplicate file groups")
-    
-    # Write report
-    safe_print(f"INFO: Writing report to {output_path}...")
-    with open(output_path, "w", encoding="utf-8") as out:
-        json.dump(report, out, indent=2)
-    
-    safe_print(f"SUCCESS: Project audit report saved to {output_path}")
-    safe_print(f"SUMMARY: {report['summary']['total_files']} files, {report['summary']['total_size_kb']/1024:.2f} MB total")
-
-
-def cmd_start(base_branch: str = "main") -> None:
-    """Start a new agent worktree."""
-    root = get_repo_root(Path.cwd())
-    agent_id = generate_agent_id()
-    
-    worktree_path, branch_name = add_worktree(root, agent_id, base_branch)
-    
-    safe_print(f"✅ Worktree ready: {worktree_path} (branch {branch_name})")
-    print(f"AGENT_ID={agent_id}")
-
-
-def cmd_run(command: list[str], agent_id: Optional[str] = None) -> None:
-    """Run a command in the agent worktree."""
-    root = get_repo_root(Path.cwd())
-    
-    if not agent_id:
-        agent_id = get_current_agent_id(root, cwd=Path.cwd())
-    
-    if not agent_id:
-        worktrees = list_worktrees(root)
-        if not worktrees:
-            err("No worktrees found. Run 'agt ws new' first!")
-        else:
-            err(
-                f"Multiple worktrees found: {', '.join(worktrees)}\n"
-                f"Either:\n"
-                f"  - Run command from within worktree directory: cd .work/agent-xxxx\n"
-                f"  - Specify agent ID: agt ws run --agent <id> <command>"
-            )
-    
-    worktree_path = get_worktree_path(root, agent_id)
-    
-    if not worktree_path.exists():
-        err(f"Worktree not found: {worktree_path}. Run 'agt ws new' first!")
-    
-    if not command:
-        err("Missing command to run")
-    
-    cmd_str = " ".join(command)
-    try:
-        subprocess.run(cmd_str, check=True, cwd=worktree_path, shell=True)
-    except subprocess.CalledProcessError as e:
-        sys.exit(e.returncode)
-
-
-def cmd_commit(message: str, agent_id: Optional[str] = None) -> None:
-    """Commit changes in the agent worktree."""
-    root = get_repo_root(Path.cwd())
-    
-    if not agent_id:
-        agent_id = get_current_agent_id(root, cwd=Path.cwd())
-    
-    if not agent_id:
-        worktrees = list_worktrees(root)
-        if not worktrees:
-            err("No worktrees found. Run 'agt ws new' first!")
-        else:
-            err(
-                f"Multiple worktrees found: {', '.join(worktrees)}\n"
-                f"Either:\n"
-                f"  - Run command from within worktree directory: cd .work/agent-xxxx\n"
-                f"  - Specify agent ID: agt ws save --agent <id> <message>"
-            )
-    
-    worktree_path = get_worktree_path(root, agent_id)
-    
-    if not worktree_path.exists():
-        err(f"Worktree not found: {worktree_path}. Run 'agt ws new' first!")
-    
-    subprocess.run("git add -A", shell=True, check=True, cwd=worktree_path)
-    subprocess.run(
-        ["git", "commit", "-m", message],
-        check=True,
-        cwd=worktree_path,
-    )
-    
-    safe_print("✅ Commit ready")
-
-
-def cmd_push(remote: str = "origin", agent_id: Optional[str] = None) -> None:
-    """Push the agent branch to remote."""
-    root = get_repo_root(Path.cwd())
-    
-    if not agent_id:
-        agent_id = get_current_agent_id(root, cwd=Path.cwd())
-    
-    if not agent_id:
-        worktrees = list_worktrees(root)
-        if not worktrees:
-            err("No worktrees found. Run 'agt ws new' first!")
-        else:
-            err(
-                f"Multiple worktrees found: {', '.join(worktrees)}\n"
-                f"Either:\n"
-                f"  - Run command from within worktree directory: cd .work/agent-xxxx\n"
-                f"  - Specify agent ID: agt ws push --agent <id> [remote]"
-            )
-    
-    worktree_path = get_worktree_path(root, agent_id)
-    
-    if not worktree_path.exists():
-        err(f"Worktree not found: {worktree_path}. Run 'agt ws new' first!")
-    
-    subprocess.run(
-        f"git push -u {remote} HEAD",
-        shell=True,
-        check=True,
-        cwd=worktree_path,
-    )
-    
-    safe_print("🚀 Pushed to remote; open a PR in the UI if needed")
+def _parse_value_flag(args: list[str], flag: str) -> Tuple[Optional[str], list[str]]:
+    """Parse a string-valued flag from args, return (value, remaining_args)."""
+    value: Optional[str] = None
+    if flag in args:
+        idx = args.index(flag)
+        if idx + 1 >= len(args):
+            err(f"{flag} requires a value")
+        value = args[idx + 1]
+        args = args[:idx] + args[idx + 2:]
+    return value, args
 
 
-def cmd_merge(agent_id: Optional[str] = None) -> None:
-    """Merge agent branch into main (fast-forward only)."""
-    root = get_repo_root(Path.cwd())
-    
-    if not agent_id:
-        agent_id = get_current_agent_id(root, cwd=Path.cwd())
-    
-    if not agent_id:
-        worktrees = list_worktrees(root)
-        if not worktrees:
-            err("No worktrees found. Run 'agt ws new' first!")
-        else:
-            err(
-                f"Multiple worktrees found: {', '.join(worktrees)}\n"
-                f"Either:\n"
-                f"  - Run command from within worktree directory: cd .work/agent-xxxx\n"
-                f"  - Specify agent ID: agt ws merge --agent <id>"
-            )
-    
-    worktree_path = get_worktree_path(root, agent_id)
-    
-    if not worktree_path.exists():
-        err(f"Worktree not found: {worktree_path}. Run 'agt ws new' first!")
-    
-    branch_name = f"feat/{agent_id}"
-    
-    subprocess.run("git fetch origin main", shell=True, check=True, cwd=worktree_path)
-    subprocess.run("git rebase origin/main", shell=True, check=True, cwd=worktree_path)
-    subprocess.run("git checkout main", shell=True, check=True, cwd=root)
-    subprocess.run(
-        f"git merge --ff-only {branch_name}",
-        shell=True,
-        check=True,
-        cwd=root,
-    )
-    subprocess.run("git push origin main", shell=True, check=True, cwd=root)
-    
-    safe_print("✅ Branch fast-forwarded to main")
+def _parse_bool_flag(args: list[str], flag: str) -> Tuple[bool, list[str]]:
+    """Parse a boolean flag from args, return (present, remaining_args)."""
+    if flag in args:
+        return True, [arg for arg in args if arg != flag]
+    return False, args
 
 
-def cmd_clean(agent_id: Optional[str] = None) -> None:
-    """Remove the agent worktree."""
-    root = get_repo_root(Path.cwd())
-    
-    if not agent_id:
-        agent_id = get_current_agent_id(root, cwd=Path.cwd())
-    
-    if not agent_id:
-        worktrees = list_worktrees(root)
-        if not worktrees:
-            err("No worktrees found. Nothing to clean.")
-        else:
-            err(
-                f"Multiple worktrees found: {', '.join(worktrees)}\n"
-                f"Either:\n"
-                f"  - Run command from within worktree directory: cd .work/agent-xxxx\n"
-                f"  - Specify agent ID: agt ws clean --agent <id>"
-            )
-    
-    worktree_path = get_worktree_path(root, agent_id)
-    
-    if not worktree_path.exists():
-        err(f"Worktree not found: {worktree_path}. Run 'agt ws new' first!")
-    
-    remove_worktree(root, agent_id)
-    safe_print(f"✅ Worktree removed ({agent_id})")
+def _parse_int_flag(args: list[str], flag: str, minimum: int = 1) -> Tuple[Optional[int], list[str]]:
+    """Parse an integer-valued flag (at least `minimum`) from args, return (value, remaining_args)."""
+    value: Optional[int] = None
+    if flag in args:
+        idx = args.index(flag)
+        if idx + 1 >= len(args):
+            err(f"{flag} requires a number")
+        try:
+            value = int(args[idx + 1])
+        except ValueError:
+            err(f"{flag} requires a number, got: {args[idx + 1]}")
+        if value < minimum:
+            err(f"{flag} must be at least {minimum}")
+        args = args[:idx] + args[idx + 2:]
+    return value, args
 
 
 def show_help() -> None:
@@ -424,30 +138,145 @@ DOMAINS:
     cfg         Configuration commands
     task        Task management (preview - not yet implemented)
     env         Environment diagnostics
+    stats       Run metrics per agent or per command
 
 WORKSPACE (ws) COMMANDS:
-    agt ws new [base-branch]
-        Create a new isolated agent worktree.
+    agt ws new [base-branch...] [--count N] [--jobs N] [--sparse <dirs|profile>] [--cow]
+        Create new isolated agent worktrees (N per base branch, in parallel).
+        --sparse checks out only the given directories (cone mode).
+        --cow clones files from a per-commit template (reflink where supported).
         Example: agt ws new develop
-
-    agt ws run <command> [--agent <id>]
-        Run a command in the agent worktree.
+        Example: agt ws new main --count 50 --jobs 8
+        Example: agt ws new --sparse services/api,libs/common
+
+    agt ws status [--agent <id> | --all]
+        Show uncommitted changes of the agent worktree, or one summary line
+        per worktree with --all. On large trees, AGT_FAST_INDEX=1 (or
+        `git config agt.fastIndex true`) gives new worktrees the untracked
+        cache, index v4 and a split index (plus git's fsmonitor daemon on
+        macOS/Windows); it enables extensions.worktreeConfig for the repo.
+
+    agt ws touch [--agent <id>] <path>...
+    agt ws watch [--agent <id>]
+        Keep a change journal (.agt/journal) so 'ws save' stages only the
+        recorded paths with one git update-index instead of scanning the whole
+        worktree. touch records paths explicitly; watch records every change
+        via inotify (Linux) until interrupted. Unrecorded changes are not
+        committed; an overflowed journal falls back to a full scan.
+
+    agt ws run [--agent <id> | --agents <id,id,...> | --all] [--jobs N] [--no-log] [--cache]
+               [--cpus N] [--pin] [--max-mem SIZE] [--max-files N] [--] <command>
+        Run a command in the agent worktree, or concurrently in several
+        worktrees with agent-prefixed output and a per-agent exit summary.
+        Options go before the command: from its first word (or after --)
+        on, flags such as --all or --jobs belong to the command.
         Example: agt ws run "pytest -q"
+        Example: agt ws run --all --jobs 16 "pytest -q"
+        Output is also logged to .work/<agent>/.agt/logs/ (disable with --no-log).
+        --cache replays the stored output and exit code if the same command
+        already ran on identical worktree content (including uncommitted and
+        untracked files) and environment (PATH, PYTHONPATH, VIRTUAL_ENV and
+        the names listed in AGT_CACHE_ENV).
+
+        --cpus N waits for N of the machine-wide CPU slots shared by all agt
+        runs (AGT_SLOTS, default: CPU count) and holds them while the command
+        runs; --pin binds the command to those CPUs. --max-mem / --max-files
+        cap its address space and open files. With AGT_SLOTS set, every run
+        is scheduled with weight 1 by default.
+        Example: agt ws run --all --cpus 4 --max-mem 8G "pytest -n 4"
+
+    agt ws slots
+        Show how many machine-wide CPU slots are busy.
+
+    agt ws cache [stats | clear]
+        Show hit/miss statistics of the shared run cache (.work/.cache), or
+        clear it. Size bound: AGT_CACHE_MAX_BYTES (default 512 MB, LRU).
+
+    agt ws fetch [stats]
+        Count the shared fetches of origin/main run and saved by merges: a
+        merge within AGT_FETCH_MAX_AGE seconds (default 10) of the last fetch
+        reuses it, and concurrent merges wait for the one in flight.
+
+    agt ws logs [<id>] [--follow] [--lines N]
+        Show the end of an agent's run log; --follow streams new output.
+        Rotated segments are kept as run.log.N.gz in the same directory.
 
     agt ws save "<message>" [--agent <id>]
         Commit all changes in the agent worktree.
         Example: agt ws save "feat: add new feature"
 
-    agt ws push [remote] [--agent <id>]
-        Push the agent branch to remote repository.
+    agt ws save --from-stdin [--format json|ndjson|diff] [--no-checkout] "<message>" [--agent <id>]
+        Commit content produced in memory without writing files first:
+        path -> content entries ({{"path", "content", "encoding": "base64",
+        "executable"}}, content null deletes) as JSON or NDJSON, or a unified
+        diff (format detected if omitted). Blobs, index and commit are written
+        with git plumbing; --no-checkout leaves the working tree untouched.
+        Example: generate | agt ws save --from-stdin --format ndjson "gen: update"
+
+    agt ws push [remote] [--agent <id> | --agents <id,id,...> | --all]
+        Push the agent branch to remote repository. With --agents or --all,
+        the branches of all those agents go out in a single git push (one
+        connection and pack), upstreams are set, and each ref is reported.
         Example: agt ws push origin
+        Example: agt ws push --all
+
+    agt ws push [remote] --async [--wait [--timeout S]] [--agent <id> | --agents <id,...> | --all]
+    agt ws push [remote] --wait [--timeout S] [--agent <id> | --agents <id,...> | --all]
+    agt ws push --drain
+        --async queues the push in a durable spool (.work/.spool/push) and
+        returns at once; a background worker pushes only the latest queued
+        commit per branch (AGT_PUSH_JOBS at once), retrying failures with
+        exponential backoff (AGT_PUSH_MAX_ATTEMPTS). --wait blocks until the
+        branch's current commit has landed. --drain runs the worker in the
+        foreground.
 
     agt ws merge [--agent <id>]
-        Merge agent branch back to main (fast-forward only).
+        Rebase the agent branch onto origin/main and fast-forward main to it,
+        in memory: main is never checked out. The repository root's worktree
+        is updated only if it is on main and has no local changes.
+
+    agt ws merge [remote] --queue [--agent <id> | --agents <id,...> | --all] [--batch N] [--verify "<cmd>"]
+    agt ws merge [remote] --run-queue | --status
+        Queue agent branches for a single background merger that stacks up
+        to N queued branches onto main (one rebase each), runs the --verify
+        command once per batch, and fast-forwards main with one push. A
+        failing batch is bisected to find and drop the culprit branch; if
+        main itself fails, the merger stops and leaves the batch queued.
+        --run-queue runs the merger in the foreground; --status shows the
+        queue (and why it is blocked).
+        Example: agt ws merge --queue --all --batch 16 --verify "pytest -q"
+
+    agt ws conflicts [base] [--agents <id,...>] [--json]
+        Predict collisions among agent branches and base (default: main):
+        branches whose changed paths overlap are merged in memory with
+        `git merge-tree`. Prints a matrix (X conflict, ~ same paths but
+        merges cleanly) or JSON. Results are cached per pair of commits.
 
     agt ws clean [--agent <id>]
         Remove the agent worktree after PR is merged.
 
+    agt ws gc [--max-age 7d|<ISO date>] [--merged] [--empty] [--orphaned] [--dry-run] [--maintenance] [--jobs N]
+        Remove agent worktrees, and delete their feat/agent-* branches, that
+        match any selected policy: untouched for longer than --max-age,
+        merged into main, without commits of their own, or whose owner
+        process is gone (branches without a worktree count as orphaned).
+        Worktrees with local changes are kept, and branches are deleted only
+        if their commits are on main or their upstream. Removal runs in parallel and
+        reports the bytes reclaimed; --dry-run only prints the plan and
+        --maintenance starts `git maintenance run --auto` in the background.
+        Example: agt ws gc --merged --max-age 3d --dry-run
+
+    agt ws pipeline <plan.yml|plan.json> [--jobs N] [--retries N]
+        Run many agents' lifecycles (new -> run/save/push -> merge/clean) in
+        one process, as a DAG with a parallelism limit and retries. Steps whose
+        inputs are unchanged since they last succeeded are skipped, so a
+        rerun resumes a failed batch. YAML plans need the `pipeline` extra.
+        Example: agt ws pipeline plans/batch.yml --jobs 16
+
+    agt ws pool [status | fill [base-branch] [--size N] | drain [base-branch]]
+        Keep N idle, pre-checked-out worktrees that 'ws new' claims instantly.
+        Example: agt ws pool fill main --size 8
+
 CONFIG (cfg) COMMANDS:
     agt cfg vscode
         Generate VS Code Command Runner settings with agt commands.
@@ -466,6 +295,14 @@ ENVIRONMENT (env) COMMANDS:
         Run project audit: find empty files, large files (>10MB), and duplicates.
         Outputs JSON report (default: reports/project_audit_report.json).
 
+STATISTICS (stats) COMMANDS:
+    agt stats agent [--since 30m|2h|7d|<ISO date>] [--agent <id>]
+    agt stats command [--since ...] [--agent <id>]
+        Summarize recorded ws run metrics per agent or per command: runs,
+        failures, cache hits, wall-time p50/p90/p99, CPU time, peak RSS and
+        I/O. Every ws run appends one record to .work/.metrics/runs.jsonl.
+        Example: agt stats command --since 2h
+
 TASK (task) COMMANDS (Preview):
     agt task list [--status STATUS]
         List tasks (not yet implemented).
@@ -482,6 +319,13 @@ TASK (task) COMMANDS (Preview):
 OPTIONS:
     --version, -v    Show version information
     --help, -h       Show this help message
+    --profile-startup <domain> <action> [args...]
+                     Run a command and report import and dispatch time
+
+DAEMON:
+    agtd start | stop | status
+        Optional per-repository daemon. While it runs, agt forwards commands
+        to it instead of starting from scratch. Set AGT_NO_DAEMON=1 to bypass.
 
 EXAMPLES:
     # Complete workflow
@@ -497,40 +341,94 @@ For more information, see: https://github.com/tnedr/agent-ops
     safe_print(help_text.strip())
 
 
+def load_command(domain: str) -> Optional[Callable[[str, list[str]], None]]:
+    """Import a domain's handler module and return its dispatcher (None if unknown)."""
+    if domain not in COMMANDS:
+        return None
+    import importlib
+    
+    module_name, dispatcher = COMMANDS[domain]
+    return getattr(importlib.import_module(module_name), dispatcher)
+
+
+def profile_startup(argv: list[str]) -> None:
+    """
+    Run a command in-process and report where its start-up time went.
+    
+    Reports CPU time spent before main() (interpreter start-up plus
+    importing agt.cli), the time to import the domain's handler module, and
+    the time the command itself took. The report goes to stderr.
+    """
+    import time
+    
+    before_main = time.process_time()
+    domain = argv[0] if argv else None
+    modules_before = len(sys.modules)
+    started = time.perf_counter()
+    dispatcher = load_command(domain) if domain else None
+    loaded = time.perf_counter()
+    modules_loaded = len(sys.modules) - modules_before
+    try:
+        run(argv)
+    finally:
+        finished = time.perf_counter()
+        sys.stdout.flush()
+        rows = [("interpreter + agt.cli (CPU)", before_main * 1000, "")]
+        if dispatcher is not None:
+            module_name = COMMANDS[domain][0]
+            rows.append((f"import {module_name}", (loaded - started) * 1000, f"{modules_loaded} new modules"))
+        rows.append(("dispatch", (finished - loaded) * 1000, ""))
+        rows.append(("total", before_main * 1000 + (finished - started) * 1000, ""))
+        print("agt startup profile:", file=sys.stderr)
+        for label, ms, note in rows:
+            print(f"    {label:<32}{ms:8.1f} ms  {note}".rstrip(), file=sys.stderr)
+
+
 def main() -> None:
     """Main CLI entrypoint."""
-    if len(sys.argv) < 2:
+    if sys.argv[1:2] == ["--profile-startup"]:
+        profile_startup(sys.argv[2:])
+        return
+    
+    # Hand the command to a running agtd daemon, if any
+    if len(sys.argv) > 2 and sys.argv[1] in DAEMON_DOMAINS and not os.environ.get("AGT_NO_DAEMON"):
+        from agt.daemon import forward
+        
+        code = forward(sys.argv[1:])
+        if code is not None:
+            sys.exit(code)
+    
+    run(sys.argv[1:])
+
+
+def run(argv: list[str]) -> None:
+    """Dispatch a command in-process."""
+    if len(argv) < 1:
         show_help()
         sys.exit(1)
     
     # Check for version flag
-    if sys.argv[1] in ["--version", "-v"]:
+    if argv[0] in ["--version", "-v"]:
         from agt import __version__
         print(f"agent-tools-drnt {__version__}")
         sys.exit(0)
     
     # Check for help flag
-    if sys.argv[1] in ["--help", "-h", "help"]:
+    if argv[0] in ["--help", "-h", "help"]:
         show_help()
         sys.exit(0)
     
     # Parse domain and action
-    domain, action, rest_args = _parse_command(sys.argv[1:])
+    domain, action, rest_args = _parse_command(argv)
     
     if domain is None or action is None:
         err("Invalid command. Use 'agt <domain> <action>'.\nUse 'agt --help' for help.")
     
-    # Dispatch to domain handlers
-    if domain == "ws":
-        ws_dispatch(action, rest_args)
-    elif domain == "cfg":
-        cfg_dispatch(action, rest_args)
-    elif domain == "task":
-        task_dispatch(action, rest_args)
-    elif domain == "env":
-        env_dispatch(action, rest_args)
-    else:
-        err(f"Unknown domain: {domain}. Available: ws, cfg, task, env\nUse 'agt --help' for help.")
+    # Dispatch to the domain's handlers
+    dispatcher = load_command(domain)
+    if dispatcher is None:
+        err(f"Unknown domain: {domain}. Available: {', '.join(COMMANDS)}\nUse 'agt --help' for help.")
+    dispatcher(action, rest_args)
 
 
 if __name__ == "__main__":
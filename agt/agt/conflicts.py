@@ -0,0 +1,170 @@
+"""
+Cross-agent conflict prediction (`agt ws conflicts`).
+
+For every active agent branch, the set of paths it changed since it forked
+from main is computed (one `git diff` per branch). Two branches - or a
+branch and main - can only conflict if those sets overlap (a path on one
+side, or a directory above it, changed on the other); only such pairs are
+checked for real conflicts with `git merge-tree --write-tree`, which merges
+in the object store without touching any worktree.
+
+Both steps are cached in .work/.conflicts/cache.json: path sets per (fork
+point, tip) and merge results per pair of commit IDs, so a repeated query
+only does work for branches that moved. Entries not used by a query are
+dropped from the cache.
+"""
+
+import json
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+from pathlib import Path
+from typing import Optional
+
+from agt.worktree import get_work_dir
+
+CONFLICTS_DIR_NAME = ".conflicts"
+CACHE_NAME = "cache.json"
+
+# Pair outcomes
+OVERLAP = "overlap"
+CONFLICT = "conflict"
+
+
+def _cache_path(root: Path) -> Path:
+    return get_work_dir(root) / CONFLICTS_DIR_NAME / CACHE_NAME
+
+
+def _load_cache(root: Path) -> dict:
+    try:
+        cache = json.loads(_cache_path(root).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {"paths": {}, "pairs": {}}
+    return {"paths": cache.get("paths") or {}, "pairs": cache.get("pairs") or {}}
+
+
+def _save_cache(root: Path, cache: dict) -> None:
+    path = _cache_path(root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(cache, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _git(args: list[str], cwd: Path) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, check=True).stdout
+
+
+def _changed_paths(root: Path, fork: str, tip: str) -> list[str]:
+    output = _git(["diff", "--name-only", "--no-renames", "-z", fork, tip], root)
+    return sorted(path for path in output.split("\0") if path)
+
+
+def _overlap(paths_a: list[str], paths_b: list[str]) -> list[str]:
+    """Paths changed on both sides, including a file on one side where the other has a directory."""
+    def with_dirs(paths: list[str]) -> set[str]:
+        dirs = set(paths)
+        for path in paths:
+            parts = path.split("/")
+            dirs.update("/".join(parts[:n]) for n in range(1, len(parts)))
+        return dirs
+    
+    a, b = set(paths_a), set(paths_b)
+    return sorted((a & with_dirs(paths_b)) | (b & with_dirs(paths_a)))
+
+
+def predict(root: Path, agent_ids: list[str], base: str = "main", jobs: Optional[int] = None) -> dict:
+    """
+    Predict which agent branches collide with each other or with `base`.
+    
+    Returns:
+        {"base": {"ref", "commit"},
+         "agents": [{"agent_id", "branch", "commit", "paths"}],
+         "pairs": [{"a", "b", "status", "overlap", "conflicts"}]}
+        where pairs lists only the ones that are not clean ("a"/"b" are
+        agent IDs, or `base`), status is "overlap" (same paths changed but
+        merges cleanly) or "conflict", and "paths" is the number of paths
+        the branch changed
+    """
+    from agt.merge import conflicting_paths
+    from agt.push import agent_branch
+    from agt.registry import read_branch_commit
+    from agt.worktree import DEFAULT_JOBS
+    
+    base_commit = _git(["rev-parse", "--verify", f"{base}^{{commit}}"], root).strip()
+    cache = _load_cache(root)
+    used = {"paths": {}, "pairs": {}}
+    
+    agents = []
+    changed = {base: []}
+    commits = {base: base_commit}
+    for agent_id in agent_ids:
+        branch = agent_branch(root, agent_id)
+        commit = read_branch_commit(root, branch)
+        if commit is None:
+            continue
+        agents.append({"agent_id": agent_id, "branch": branch, "commit": commit})
+        commits[agent_id] = commit
+    
+    def fork_paths(agent: dict) -> tuple[list[str], list[str]]:
+        """Paths the agent changed and paths base changed, since the fork point."""
+        fork = _git(["merge-base", base_commit, agent["commit"]], root).strip()
+        result = []
+        for tip in (agent["commit"], base_commit):
+            key = f"{fork}..{tip}"
+            paths = cache["paths"].get(key)
+            if paths is None:
+                paths = _changed_paths(root, fork, tip)
+            used["paths"][key] = paths
+            result.append(paths)
+        return result[0], result[1]
+    
+    candidates = []
+    with ThreadPoolExecutor(max_workers=jobs or DEFAULT_JOBS) as pool:
+        for agent, (paths, base_paths) in zip(agents, pool.map(fork_paths, agents)):
+            agent["paths"] = len(paths)
+            changed[agent["agent_id"]] = paths
+            overlap = _overlap(paths, base_paths)
+            if overlap:
+                candidates.append((base, agent["agent_id"], overlap))
+        for a, b in combinations([agent["agent_id"] for agent in agents], 2):
+            overlap = _overlap(changed[a], changed[b])
+            if overlap:
+                candidates.append((a, b, overlap))
+        
+        def check(candidate: tuple[str, str, list[str]]) -> dict:
+            a, b, overlap = candidate
+            key = "..".join(sorted((commits[a], commits[b])))
+            conflicts = cache["pairs"].get(key)
+            if conflicts is None:
+                conflicts = conflicting_paths(root, commits[a], commits[b])
+            used["pairs"][key] = conflicts
+            return {"a": a, "b": b, "status": CONFLICT if conflicts else OVERLAP, "overlap": overlap, "conflicts": conflicts}
+        
+        pairs = list(pool.map(check, candidates))
+    
+    _save_cache(root, used)
+    return {"base": {"ref": base, "commit": base_commit}, "agents": agents, "pairs": pairs}
+
+
+def format_matrix(prediction: dict) -> list[str]:
+    """
+    Render a prediction as a matrix: base and agents are numbered, each
+    cell shows "X" (conflict), "~" (overlap, merges cleanly) or "." (clean).
+    """
+    names = [prediction["base"]["ref"]] + [agent["agent_id"] for agent in prediction["agents"]]
+    index = {name: n for n, name in enumerate(names)}
+    cells = [["." if i != j else "-" for j in range(len(names))] for i in range(len(names))]
+    for pair in prediction["pairs"]:
+        mark = "X" if pair["status"] == CONFLICT else "~"
+        i, j = index[pair["a"]], index[pair["b"]]
+        cells[i][j] = cells[j][i] = mark
+    
+    width = len(str(len(names) - 1))
+    name_width = max(len(name) for name in names)
+    header = " " * (width + name_width + 3) + " ".join(str(n % 10) for n in range(len(names)))
+    lines = [header]
+    for n, name in enumerate(names):
+        lines.append(f"{n:>{width}} {name:<{name_width}}  " + " ".join(cells[n]))
+    return lines
@@ -0,0 +1,430 @@
+"""agtd - optional per-repository daemon that keeps agt warm.
+
+A running daemon listens on a Unix domain socket in .work/. `agt` forwards its
+argv, cwd, environment and stdio file descriptors to it; the daemon forks a
+child that already has agt imported and the repository discovered, runs the
+command in-process on the client's own stdio, and reports the exit code.
+When no daemon is running, `agt` dispatches in-process as usual.
+
+USAGE:
+    agtd start [--foreground] [--idle-timeout SECONDS]
+    agtd stop
+    agtd status
+"""
+
+import json
+import os
+import signal
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from agt import __version__
+from agt.lock import private_dir
+
+SOCKET_NAME = "agtd.sock"
+LOCK_NAME = "agtd.lock"
+
+# Exit after this long without requests
+DEFAULT_IDLE_TIMEOUT = 30 * 60
+
+# The accept loop is single-threaded: a client gets this long to send its
+# request before the daemon drops it and serves the next one
+HANDSHAKE_TIMEOUT = 5.0
+
+# Unix socket paths are limited to ~107 bytes
+_MAX_SOCKET_PATH = 100
+
+_HELLO = b"AGT1"
+
+
+def _runtime_dir() -> Path:
+    """
+    A directory only the current user can use, for sockets that don't fit in .work/.
+    
+    $XDG_RUNTIME_DIR if it is private, else <tmp>/agtd-<uid> (created 0700).
+    
+    Raises:
+        PermissionError: if <tmp>/agtd-<uid> exists but is not a private
+            directory of the current user (someone else may have planted it)
+    """
+    import tempfile
+    
+    uid = os.getuid()
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        try:
+            st = os.lstat(runtime_dir)
+        except OSError:
+            st = None
+        if st is not None and stat.S_ISDIR(st.st_mode) and st.st_uid == uid and not st.st_mode & 0o077:
+            return Path(runtime_dir)
+    
+    return private_dir(Path(tempfile.gettempdir()) / f"agtd-{uid}")
+
+
+def get_socket_path(root: Path) -> Path:
+    """
+    Return the daemon socket path for a repository.
+    
+    Raises:
+        PermissionError: if the path is too long for .work/ and no private
+            runtime directory is available (see _runtime_dir)
+    """
+    path = root / ".work" / SOCKET_NAME
+    if len(str(path)) <= _MAX_SOCKET_PATH:
+        return path
+    import hashlib
+    
+    digest = hashlib.sha1(str(root).encode()).hexdigest()[:16]
+    return _runtime_dir() / f"agtd-{digest}.sock"
+
+
+def _peer_uid(conn: socket.socket) -> Optional[int]:
+    """The uid of the process at the other end of a Unix socket (None where unsupported)."""
+    if hasattr(socket, "SO_PEERCRED"):
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        return struct.unpack("3i", creds)[1]
+    if hasattr(os, "getpeereid"):  # pragma: no cover - BSD/macOS
+        return os.getpeereid(conn.fileno())[0]
+    return None
+
+
+def is_supported() -> bool:
+    """The daemon needs Unix sockets, fd passing and fork."""
+    return hasattr(socket, "AF_UNIX") and hasattr(socket, "send_fds") and hasattr(os, "fork")
+
+
+def _read_line(conn: socket.socket) -> Optional[dict]:
+    """Read one newline-terminated JSON message."""
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            return None
+        data += chunk
+    return json.loads(data)
+
+
+def _send(conn: socket.socket, message: dict) -> None:
+    conn.sendall(json.dumps(message).encode() + b"\n")
+
+
+def _connect(root: Path) -> Optional[socket.socket]:
+    """
+    Connect to the repository's daemon, or return None if none is running.
+    
+    The socket and the daemon behind it must belong to the current user:
+    the environment and the terminal are sent over it.
+    """
+    try:
+        socket_path = get_socket_path(root)
+        st = os.lstat(socket_path)
+    except OSError:
+        return None
+    if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(str(socket_path))
+        peer_uid = _peer_uid(conn)
+    except OSError:
+        conn.close()
+        return None
+    if peer_uid is not None and peer_uid != os.getuid():
+        conn.close()
+        return None
+    return conn
+
+
+def forward(argv: list[str]) -> Optional[int]:
+    """
+    Run an agt command through the repository's daemon.
+    
+    Returns:
+        The command's exit code, or None if no usable daemon is running (the
+        caller should then dispatch in-process)
+    """
+    if not is_supported():
+        return None
+    from agt.worktree import get_repo_root
+    
+    try:
+        root = get_repo_root(Path.cwd())
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    conn = _connect(root)
+    if conn is None:
+        return None
+    
+    with conn:
+        request = {
+            "version": __version__,
+            "argv": argv,
+            "cwd": os.getcwd(),
+            # Worktrees are owned by our parent, not by the daemon's child
+            "env": {"AGT_OWNER_PID": str(os.getppid()), **os.environ},
+            "encoding": sys.stdout.encoding or "utf-8",
+        }
+        try:
+            socket.send_fds(conn, [_HELLO], [0, 1, 2])
+            _send(conn, request)
+            reply = _read_line(conn)
+        except OSError:
+            return None
+        if not reply or "pid" not in reply:
+            return None  # daemon refused (e.g. version mismatch)
+        
+        # Forward interrupts to the command's process group
+        child_pid = reply["pid"]
+        
+        def relay(signum, frame):
+            try:
+                os.killpg(child_pid, signum)
+            except OSError:
+                pass
+        
+        previous = {sig: signal.signal(sig, relay) for sig in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            reply = _read_line(conn)
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+    
+    if not reply or "exit" not in reply:
+        print("agtd: connection lost before the command finished", file=sys.stderr)
+        return 1
+    return reply["exit"]
+
+
+def _run_request(conn: socket.socket, fds: list[int], request: dict) -> None:
+    """Run one forwarded command in a forked child and report its exit code."""
+    os.setpgid(0, 0)
+    for target, fd in enumerate(fds[:3]):
+        os.dup2(fd, target)
+        os.close(fd)
+    encoding = request.get("encoding") or "utf-8"
+    sys.stdin = open(0, closefd=False, encoding=encoding)
+    sys.stdout = open(1, "w", buffering=1, closefd=False, encoding=encoding)
+    sys.stderr = open(2, "w", buffering=1, closefd=False, encoding=encoding)
+    os.environ.clear()
+    os.environ.update(request["env"])
+    os.chdir(request["cwd"])
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    
+    _send(conn, {"pid": os.getpid()})
+    
+    from agt.cli import run
+    
+    code = 0
+    try:
+        sys.argv = ["agt", *request["argv"]]
+        run(request["argv"])
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except KeyboardInterrupt:
+        code = 130
+    except BaseException:
+        import traceback
+        
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    _send(conn, {"exit": code})
+
+
+def _warm_up(root: Path) -> None:
+    """Import agt's command modules and prime per-process caches before forking."""
+    import agt.ws  # noqa: F401
+    from agt import registry
+    from agt.worktree import get_repo_root
+    
+    get_repo_root(root)
+    try:
+        registry.list_entries(root)
+    except Exception:
+        pass
+
+
+def serve(root: Path, idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> None:
+    """Serve forwarded agt commands for a repository until stopped or idle."""
+    from agt.lock import file_lock
+    
+    work_dir = root / ".work"
+    socket_path = get_socket_path(root)
+    with file_lock(work_dir / LOCK_NAME, blocking=False) as locked:
+        if not locked:
+            print("agtd: already running", file=sys.stderr)
+            sys.exit(1)
+        
+        _warm_up(root)
+        if socket_path.exists():
+            socket_path.unlink()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Create the socket 0600 from the start: no window in which others can connect
+        previous_umask = os.umask(0o177)
+        try:
+            server.bind(str(socket_path))
+        finally:
+            os.umask(previous_umask)
+        server.listen(128)
+        server.settimeout(1.0)
+        
+        stopping = False
+        
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+        
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        
+        started = time.time()
+        last_request = time.monotonic()
+        served = 0
+        try:
+            while not stopping and time.monotonic() - last_request < idle_timeout:
+                # Reap finished request children
+                try:
+                    while os.waitpid(-1, os.WNOHANG)[0]:
+                        pass
+                except ChildProcessError:
+                    pass
+                
+                try:
+                    conn, _ = server.accept()
+                except TimeoutError:
+                    continue
+                except InterruptedError:
+                    continue
+                last_request = time.monotonic()
+                conn.settimeout(HANDSHAKE_TIMEOUT)
+                with conn:
+                    fds: list[int] = []
+                    try:
+                        if _peer_uid(conn) not in (None, os.getuid()):
+                            continue
+                        hello, fds, _, _ = socket.recv_fds(conn, len(_HELLO), 3)
+                        request = _read_line(conn) if hello == _HELLO else None
+                    except (OSError, ValueError):
+                        # Includes a client that went silent (TimeoutError)
+                        request = None
+                    conn.settimeout(None)
+                    if request is None:
+                        for fd in fds:
+                            os.close(fd)
+                        continue
+                    
+                    if request.get("control") == "status":
+                        _send(conn, {"pid": os.getpid(), "served": served, "started": started})
+                    elif request.get("control") == "stop":
+                        _send(conn, {"stopping": True})
+                        stopping = True
+                    elif request.get("version") != __version__ or len(fds) != 3:
+                        _send(conn, {"error": f"agtd runs agt {__version__}"})
+                    else:
+                        served += 1
+                        if os.fork() == 0:
+                            server.close()
+                            try:
+                                _run_request(conn, fds, request)
+                            finally:
+                                os._exit(0)
+                    for fd in fds:
+                        os.close(fd)
+        finally:
+            server.close()
+            if socket_path.exists():
+                socket_path.unlink()
+
+
+def _control(root: Path, command: str) -> Optional[dict]:
+    """Send a control request (status, stop) to the daemon."""
+    conn = _connect(root)
+    if conn is None:
+        return None
+    with conn:
+        socket.send_fds(conn, [_HELLO], [])
+        _send(conn, {"control": command})
+        return _read_line(conn)
+
+
+def main() -> None:
+    """agtd entrypoint."""
+    from agt.cli import _parse_bool_flag, _parse_int_flag, err, safe_print
+    from agt.worktree import get_repo_root
+    
+    if not is_supported():
+        err("agtd requires Unix domain sockets and fork()")
+    
+    args = sys.argv[1:]
+    foreground, args = _parse_bool_flag(args, "--foreground")
+    idle_timeout, args = _parse_int_flag(args, "--idle-timeout")
+    action = args[0] if args else "status"
+    root = get_repo_root(Path.cwd())
+    
+    if action == "start":
+        if _control(root, "status"):
+            safe_print("✅ agtd already running")
+            return
+        if foreground:
+            serve(root, idle_timeout or DEFAULT_IDLE_TIMEOUT)
+            return
+        command = [sys.executable, "-m", "agt.daemon", "start", "--foreground"]
+        if idle_timeout:
+            command += ["--idle-timeout", str(idle_timeout)]
+        subprocess.Popen(
+            command,
+            cwd=root,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            status = _control(root, "status")
+            if status:
+                safe_print(f"✅ agtd started (pid {status['pid']})")
+                return
+            time.sleep(0.05)
+        err("agtd did not start within 10 seconds")
+    
+    elif action == "stop":
+        if _control(root, "stop") is None:
+            safe_print("agtd is not running")
+            return
+        socket_path = get_socket_path(root)
+        deadline = time.monotonic() + 10
+        while socket_path.exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        safe_print("✅ agtd stopped")
+    
+    elif action == "status":
+        status = _control(root, "status")
+        if status is None:
+            safe_print("agtd is not running")
+            sys.exit(1)
+        uptime = int(time.time() - status["started"])
+        safe_print(f"agtd running (pid {status['pid']}, up {uptime}s, {status['served']} commands served)")
+    
+    else:
+        err(f"Unknown agtd action: {action}. Available: start, stop, status")
+
+
+if __name__ == "__main__":
+    main()
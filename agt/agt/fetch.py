@@ -0,0 +1,138 @@
+"""
+Shared, rate-limited fetch of a remote branch (used by `agt ws merge`).
+
+Every worktree shares the repository's object store and remote-tracking
+refs, so one fetch of origin/main serves all agents. fetch() keeps the time
+of the last fetch of each remote branch in the common git dir
+(<git-common-dir>/agt-fetch/); a caller within the freshness window
+(AGT_FETCH_MAX_AGE seconds) reuses refs/remotes/<remote>/<branch> instead
+of contacting the remote. Fetches run under a lock file next to it, so
+concurrent callers wait for the one in flight and then reuse its result.
+
+Fetches run and saved are counted per remote branch (see get_stats).
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import time
+from pathlib import Path
+from typing import Optional
+
+from agt.lock import file_lock
+from agt.worktree import get_git_common_dir
+
+FETCH_DIR_NAME = "agt-fetch"
+
+# Seconds a fetch is reused by later callers
+MAX_AGE = float(os.environ.get("AGT_FETCH_MAX_AGE") or 10)
+
+
+def get_fetch_dir(root: Path) -> Path:
+    """Get the fetch state directory (<git-common-dir>/agt-fetch)."""
+    return get_git_common_dir(root) / FETCH_DIR_NAME
+
+
+def _key(remote: str, branch: str) -> str:
+    return hashlib.sha1(f"{remote}\0{branch}".encode()).hexdigest()[:16]
+
+
+def _read(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(data, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _count(root: Path, remote: str, branch: str, counter: str) -> None:
+    stats_path = get_fetch_dir(root) / "stats.json"
+    with file_lock(get_fetch_dir(root) / "stats.lock"):
+        stats = _read(stats_path)
+        entry = stats.setdefault(f"{remote}/{branch}", {"fetches": 0, "saved": 0})
+        entry[counter] += 1
+        _write(stats_path, stats)
+
+
+def _tracking_commit(root: Path, remote: str, branch: str) -> Optional[str]:
+    result = subprocess.run(
+        ["git", "rev-parse", "--verify", "-q", f"refs/remotes/{remote}/{branch}"],
+        cwd=root,
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def _fresh_commit(root: Path, remote: str, branch: str, max_age: float) -> Optional[str]:
+    """The tracking ref's commit if it was fetched less than `max_age` seconds ago."""
+    state = _read(get_fetch_dir(root) / f"{_key(remote, branch)}.json")
+    if time.time() - state.get("fetched_at", 0.0) >= max_age:
+        return None
+    return _tracking_commit(root, remote, branch)
+
+
+def fetch(root: Path, remote: str = "origin", branch: str = "main", max_age: Optional[float] = None) -> str:
+    """
+    Fetch `branch` from `remote` unless it was fetched within `max_age` seconds (default MAX_AGE).
+    
+    Raises:
+        subprocess.CalledProcessError: if the fetch fails
+    
+    Returns:
+        The commit of refs/remotes/<remote>/<branch>
+    """
+    max_age = MAX_AGE if max_age is None else max_age
+    commit = _fresh_commit(root, remote, branch, max_age)
+    if commit is not None:
+        _count(root, remote, branch, "saved")
+        return commit
+    
+    key = _key(remote, branch)
+    with file_lock(get_fetch_dir(root) / f"{key}.lock"):
+        # Whoever held the lock may just have fetched
+        commit = _fresh_commit(root, remote, branch, max_age)
+        if commit is not None:
+            _count(root, remote, branch, "saved")
+            return commit
+        started = time.time()
+        subprocess.run(
+            ["git", "fetch", "-q", remote, f"+refs/heads/{branch}:refs/remotes/{remote}/{branch}"],
+            cwd=root,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        _write(get_fetch_dir(root) / f"{key}.json", {"fetched_at": started})
+    _count(root, remote, branch, "fetches")
+    return _tracking_commit(root, remote, branch)
+
+
+def note_pushed(root: Path, remote: str, branch: str, commit: str) -> None:
+    """
+    Record that `commit` was just pushed to `branch` on `remote`.
+    
+    The tracking ref is set to it and counts as freshly fetched, so callers
+    in the window build on the pushed commit without fetching it back.
+    """
+    key = _key(remote, branch)
+    with file_lock(get_fetch_dir(root) / f"{key}.lock"):
+        subprocess.run(
+            ["git", "update-ref", f"refs/remotes/{remote}/{branch}", commit],
+            cwd=root,
+            check=True,
+            capture_output=True,
+        )
+        _write(get_fetch_dir(root) / f"{key}.json", {"fetched_at": time.time()})
+
+
+def get_stats(root: Path) -> dict[str, dict[str, int]]:
+    """Fetches run and saved: {"<remote>/<branch>": {"fetches", "saved"}}."""
+    return _read(get_fetch_dir(root) / "stats.json")
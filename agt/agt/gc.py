@@ -0,0 +1,253 @@
+"""
+Garbage collection of abandoned agent worktrees and branches (`agt ws gc`).
+
+A worktree (and its branch), or an agent branch whose worktree is already
+gone, is collected when it matches any of the selected policies:
+
+- age: neither created nor committed to since a cutoff time;
+- merged: its branch has commits, all of them on main;
+- empty: its branch has no commits of its own;
+- orphaned: the process that created it (registry owner_pid) is gone, or
+  it has no worktree at all.
+
+Worktrees with local changes are never collected, and a branch is only
+deleted once its commits are on main or on its upstream: a worktree whose
+branch has unmerged commits is removed but its branch is kept, and such a
+branch without a worktree is left alone. Worktrees are removed in
+parallel, the matching branches are deleted with one `git branch -D`, and
+`git worktree prune` clears leftover metadata; `git maintenance run --auto`
+can follow in the background to repack what was freed.
+"""
+
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from agt.worktree import DEFAULT_JOBS, format_git_error, remove_worktree, worktree_status
+
+AGE = "age"
+MERGED = "merged"
+EMPTY = "empty"
+ORPHANED = "orphaned"
+POLICIES = (AGE, MERGED, EMPTY, ORPHANED)
+
+BRANCH_PATTERN = "refs/heads/feat/agent-*"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _disk_usage(path: Path) -> int:
+    """Bytes allocated under `path` (hard links counted once)."""
+    total = 0
+    seen = set()
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in dirnames + filenames:
+            try:
+                st = os.lstat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+            if (st.st_dev, st.st_ino) in seen:
+                continue
+            seen.add((st.st_dev, st.st_ino))
+            total += getattr(st, "st_blocks", 0) * 512 or st.st_size
+    return total
+
+
+def _branch_info(root: Path) -> dict[str, tuple[str, float]]:
+    """{branch: (tip commit, committer time)} for the agent branches."""
+    output = subprocess.run(
+        ["git", "for-each-ref", "--format=%(refname:short) %(objectname) %(committerdate:unix)", BRANCH_PATTERN],
+        cwd=root,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    info = {}
+    for line in output.splitlines():
+        name, commit, date = line.split(" ")
+        info[name] = (commit, float(date or 0))
+    return info
+
+
+def _on_base(root: Path, commit: str, base: str) -> bool:
+    return subprocess.run(
+        ["git", "merge-base", "--is-ancestor", commit, base], cwd=root, capture_output=True
+    ).returncode == 0
+
+
+def _landed(root: Path, branch: str, commit: str, base: str) -> bool:
+    """Whether deleting the branch loses no commits: its tip is on `base` or on its upstream."""
+    if _on_base(root, commit, base):
+        return True
+    upstream = subprocess.run(
+        ["git", "rev-parse", "--verify", "-q", f"refs/heads/{branch}@{{upstream}}"],
+        cwd=root,
+        capture_output=True,
+        text=True,
+    )
+    return upstream.returncode == 0 and _on_base(root, commit, upstream.stdout.strip())
+
+
+def plan(
+    root: Path,
+    policies: list[str],
+    older_than: Optional[float] = None,
+    base: str = "main",
+    jobs: Optional[int] = None,
+) -> list[dict]:
+    """
+    Select the worktrees and branches to collect.
+    
+    `older_than` is the cutoff timestamp of the age policy.
+    
+    Returns:
+        [{"agent_id", "path" (None if the worktree is gone), "branch",
+          "commit", "reasons", "bytes", "keep" (why it is kept despite
+          matching, or None), "keep_branch" (the branch has unmerged
+          commits)}] for every match, sorted by agent ID
+    """
+    from agt import registry
+    
+    branches = _branch_info(root)
+    entries = {entry["agent_id"]: entry for entry in registry.list_entries(root, verify=True)}
+    candidates = [
+        {
+            "agent_id": agent_id,
+            "path": Path(entry["path"]),
+            "branch": entry["branch"],
+            "base_commit": entry["base_commit"],
+            "created_at": entry["created_at"],
+            "owner_pid": entry["owner_pid"],
+        }
+        for agent_id, entry in entries.items()
+    ]
+    claimed = {entry["branch"] for entry in entries.values()}
+    for branch in branches:
+        if branch not in claimed:
+            candidates.append({
+                "agent_id": branch.rsplit("/", 1)[-1],
+                "path": None,
+                "branch": branch,
+                "base_commit": None,
+                "created_at": 0.0,
+                "owner_pid": None,
+            })
+    
+    def evaluate(candidate: dict) -> Optional[dict]:
+        commit, committed_at = branches.get(candidate["branch"], (None, 0.0))
+        reasons = []
+        if AGE in policies and older_than is not None and max(committed_at, candidate["created_at"]) < older_than:
+            reasons.append(AGE)
+        if commit is not None and (MERGED in policies or EMPTY in policies):
+            if commit == candidate["base_commit"]:
+                if EMPTY in policies:
+                    reasons.append(EMPTY)
+            elif _on_base(root, commit, base):
+                # Without a recorded base, a branch with nothing beyond main counts as merged
+                if MERGED in policies:
+                    reasons.append(MERGED)
+        if ORPHANED in policies and (
+            candidate["path"] is None or (candidate["owner_pid"] and not _pid_alive(candidate["owner_pid"]))
+        ):
+            reasons.append(ORPHANED)
+        if not reasons:
+            return None
+        
+        keep = None
+        size = 0
+        keep_branch = commit is not None and not _landed(root, candidate["branch"], commit, base)
+        if candidate["path"] is None and keep_branch:
+            keep = "unmerged commits"
+        elif candidate["path"] is not None and candidate["path"].exists():
+            try:
+                if worktree_status(candidate["path"]):
+                    keep = "local changes"
+            except subprocess.CalledProcessError as e:
+                keep = format_git_error(e)
+            size = _disk_usage(candidate["path"])
+        return {
+            "agent_id": candidate["agent_id"],
+            "path": candidate["path"],
+            "branch": candidate["branch"],
+            "commit": commit,
+            "reasons": reasons,
+            "bytes": size,
+            "keep": keep,
+            "keep_branch": keep_branch,
+        }
+    
+    with ThreadPoolExecutor(max_workers=jobs or DEFAULT_JOBS) as pool:
+        matches = [match for match in pool.map(evaluate, candidates) if match]
+    return sorted(matches, key=lambda match: match["agent_id"])
+
+
+def collect(root: Path, matches: list[dict], jobs: Optional[int] = None) -> list[dict]:
+    """
+    Remove the planned worktrees (in parallel) and delete their branches.
+    
+    Matches marked "keep" are skipped; for those marked "keep_branch" only
+    the worktree is removed.
+    
+    Returns:
+        [{"agent_id", "branch", "commit", "bytes", "error", "branch_deleted"}]
+        per collected match; bytes is what removing the worktree freed
+    """
+    def remove(match: dict) -> dict:
+        result = {"agent_id": match["agent_id"], "branch": match["branch"], "commit": match["commit"], "bytes": 0, "error": None, "branch_deleted": False}
+        if match["path"] is not None and match["path"].exists():
+            try:
+                remove_worktree(root, match["agent_id"])
+            except subprocess.CalledProcessError as e:
+                result["error"] = format_git_error(e)
+                return result
+            result["bytes"] = match["bytes"]
+        return result
+    
+    todo = [match for match in matches if not match["keep"]]
+    with ThreadPoolExecutor(max_workers=jobs or DEFAULT_JOBS) as pool:
+        results = list(pool.map(remove, todo))
+    
+    deletable = {match["branch"] for match in todo if match["commit"] is not None and not match["keep_branch"]}
+    branches = [r["branch"] for r in results if not r["error"] and r["branch"] in deletable]
+    for r in results:
+        r["branch_deleted"] = r["branch"] in branches
+    if branches:
+        deleted = subprocess.run(["git", "branch", "-q", "-D", *branches], cwd=root, capture_output=True, text=True)
+        if deleted.returncode:
+            # Some branch could not be deleted (e.g. checked out elsewhere): report per branch
+            for r in results:
+                if r["branch"] in branches and _branch_exists(root, r["branch"]):
+                    r["branch_deleted"] = False
+                    r["error"] = f"branch not deleted: {deleted.stderr.strip()}"
+    subprocess.run(["git", "worktree", "prune"], cwd=root, capture_output=True)
+    return results
+
+
+def _branch_exists(root: Path, branch: str) -> bool:
+    return subprocess.run(
+        ["git", "rev-parse", "--verify", "-q", f"refs/heads/{branch}"], cwd=root, capture_output=True
+    ).returncode == 0
+
+
+def start_maintenance(root: Path) -> None:
+    """Start a detached `git maintenance run --auto` to repack and prune what was freed."""
+    subprocess.Popen(
+        ["git", "maintenance", "run", "--auto", "--quiet"],
+        cwd=root,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
@@ -0,0 +1,347 @@
+"""
+Per-worktree change journal (.agt/journal) so `ws save` stages only touched paths.
+
+Agents record the paths they modify - through record() / `agt ws touch`, or
+by running the inotify watcher (`agt ws watch`, Linux only). `ws save` then
+stages exactly those paths with one `git update-index` instead of scanning
+the whole worktree with `git add -A`. A worktree without a journal, or whose
+journal overflowed (too large, or the watcher lost events), falls back to
+the full scan.
+
+The journal is trusted: changes that were never recorded are not committed
+until a save falls back to a full scan.
+"""
+
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+JOURNAL_PATH = Path(".agt") / "journal"
+
+# A journal line that forces the next save to scan the whole worktree
+OVERFLOW = "*"
+
+# Past this size the journal is treated as overflowed (a full scan is cheaper)
+MAX_JOURNAL_BYTES = int(os.environ.get("AGT_JOURNAL_MAX_BYTES") or 4 * 1024 * 1024)
+
+# Directories never journaled
+_SKIP_DIRS = {".git", ".agt"}
+
+
+def get_journal_path(worktree_path: Path) -> Path:
+    """Get a worktree's journal file (.agt/journal)."""
+    return worktree_path / JOURNAL_PATH
+
+
+def _append(worktree_path: Path, lines: Iterable[str]) -> None:
+    """Append lines with one O_APPEND write so concurrent writers never interleave."""
+    data = "".join(f"{line}\n" for line in lines).encode("utf-8", errors="surrogateescape")
+    if not data:
+        return
+    fd = os.open(get_journal_path(worktree_path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def enable(worktree_path: Path, root: Optional[Path] = None) -> bool:
+    """
+    Start journaling a worktree (no-op if it already has a journal).
+    
+    A worktree with uncommitted changes starts with an overflowed journal, so
+    its first save still scans everything.
+    
+    Returns:
+        True if the journal was created
+    """
+    path = get_journal_path(worktree_path)
+    if path.exists():
+        return False
+    from agt.logs import ensure_excluded
+    from agt.worktree import get_repo_root, worktree_status
+    
+    ensure_excluded(root or get_repo_root(worktree_path))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    dirty = bool(worktree_status(worktree_path))
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        if dirty:
+            fh.write(f"{OVERFLOW}\n")
+    return True
+
+
+def _relative(worktree_path: Path, path: Path) -> Optional[str]:
+    """Path relative to the worktree (None if outside it or inside .git/.agt)."""
+    absolute = Path(os.path.abspath(worktree_path / path))
+    try:
+        relative = absolute.relative_to(os.path.abspath(worktree_path))
+    except ValueError:
+        return None
+    if not relative.parts or relative.parts[0] in _SKIP_DIRS:
+        return None
+    return relative.as_posix()
+
+
+def record(worktree_path: Path, paths: Iterable) -> int:
+    """
+    Record modified, created or deleted paths (absolute, or relative to the worktree).
+    
+    Directories stand for everything below them.
+    
+    Returns:
+        Number of paths recorded
+    """
+    enable(worktree_path)
+    lines = [rel for rel in (_relative(worktree_path, Path(p)) for p in paths) if rel is not None]
+    _append(worktree_path, lines)
+    return len(lines)
+
+
+def mark_overflow(worktree_path: Path) -> None:
+    """Make the next save scan the whole worktree."""
+    _append(worktree_path, [OVERFLOW])
+
+
+def take(worktree_path: Path) -> Optional[Path]:
+    """
+    Detach the current journal for a save; new records go to a fresh journal.
+    
+    Returns:
+        The detached journal (pass it to read_paths and then finish), or
+        None if the worktree isn't journaled
+    """
+    path = get_journal_path(worktree_path)
+    saving = path.with_name(f"journal.saving.{os.getpid()}")
+    # Left behind by an earlier save that was never finished
+    saving.unlink(missing_ok=True)
+    try:
+        os.link(path, saving)
+    except FileNotFoundError:
+        return None
+    # Swap in an empty journal atomically: writers open the journal for every
+    # append, so each record lands in exactly one of the two files
+    fresh = path.with_name(f"journal.new.{os.getpid()}")
+    open(fresh, "w").close()
+    os.replace(fresh, path)
+    return saving
+
+
+def read_paths(taken: Path) -> Optional[list[str]]:
+    """
+    Read a detached journal.
+    
+    Returns:
+        The unique recorded paths, or None if the journal overflowed
+    """
+    if taken.stat().st_size > MAX_JOURNAL_BYTES:
+        return None
+    lines = taken.read_bytes().decode("utf-8", errors="surrogateescape").splitlines()
+    if OVERFLOW in lines:
+        return None
+    return list(dict.fromkeys(line for line in lines if line))
+
+
+def finish(worktree_path: Path, taken: Path, saved: bool) -> None:
+    """Drop a detached journal after a save, or merge it back if the save failed."""
+    if not saved:
+        _append(worktree_path, taken.read_bytes().decode("utf-8", errors="surrogateescape").splitlines())
+    taken.unlink(missing_ok=True)
+
+
+def _expand(worktree_path: Path, paths: list[str]) -> list[str]:
+    """
+    Turn journaled paths into file paths for update-index.
+    
+    Existing directories expand to the files below them; paths that no longer
+    exist expand to the tracked files they covered (a deleted or moved-away
+    directory), so update-index --remove drops them.
+    """
+    files = []
+    missing = []
+    for rel in paths:
+        full = worktree_path / rel
+        if full.is_dir() and not full.is_symlink():
+            for dirpath, dirnames, filenames in os.walk(full):
+                dirnames[:] = [d for d in dirnames if d not in _SKIP_DIRS]
+                base = Path(dirpath).relative_to(worktree_path)
+                files.extend((base / name).as_posix() for name in filenames)
+        elif full.exists() or full.is_symlink():
+            files.append(rel)
+        else:
+            missing.append(rel)
+    
+    # Chunked to stay below the argument length limit
+    for start in range(0, len(missing), 1000):
+        result = subprocess.run(
+            ["git", "ls-files", "-z", "--", *(f":(literal){rel}" for rel in missing[start:start + 1000])],
+            check=True,
+            capture_output=True,
+            cwd=worktree_path,
+        )
+        files.extend(p for p in result.stdout.decode(errors="surrogateescape").split("\0") if p)
+    return list(dict.fromkeys(files))
+
+
+def stage_paths(worktree_path: Path, paths: list[str]) -> int:
+    """
+    Stage exactly `paths` (additions, modifications and deletions) in one batch.
+    
+    Untracked files matching .gitignore are skipped, as `git add` would.
+    
+    Returns:
+        Number of paths passed to update-index
+    """
+    files = _expand(worktree_path, paths)
+    if not files:
+        return 0
+    stdin = b"".join(p.encode(errors="surrogateescape") + b"\0" for p in files)
+    ignored = subprocess.run(
+        ["git", "check-ignore", "-z", "--stdin"],
+        input=stdin,
+        capture_output=True,
+        cwd=worktree_path,
+    )
+    if ignored.returncode not in (0, 1):
+        raise subprocess.CalledProcessError(ignored.returncode, ignored.args, ignored.stdout, ignored.stderr)
+    skip = set(ignored.stdout.decode(errors="surrogateescape").split("\0"))
+    files = [p for p in files if p not in skip]
+    if not files:
+        return 0
+    subprocess.run(
+        ["git", "update-index", "--add", "--remove", "-z", "--stdin"],
+        input=b"".join(p.encode(errors="surrogateescape") + b"\0" for p in files),
+        check=True,
+        capture_output=True,
+        cwd=worktree_path,
+    )
+    return len(files)
+
+
+# inotify(7) constants
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+IN_EXCL_UNLINK = 0x4000000
+IN_ISDIR = 0x40000000
+_WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR | IN_EXCL_UNLINK
+)
+
+# How often the watcher appends what it saw to the journal
+FLUSH_INTERVAL = 0.2
+
+
+def _load_inotify():
+    """Load inotify from libc via ctypes (Linux only)."""
+    import ctypes
+    import ctypes.util
+    import sys
+    
+    if not sys.platform.startswith("linux"):
+        raise OSError(f"inotify is not available on {sys.platform}")
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+def watch(
+    worktree_path: Path,
+    stop: Optional[threading.Event] = None,
+    on_ready: Optional[Callable[[int], None]] = None,
+) -> None:
+    """
+    Journal every change under a worktree until interrupted (or `stop` is set).
+    
+    Each directory gets an inotify watch; new directories are watched as they
+    appear and their contents journaled. If the kernel drops events or the
+    watch limit (fs.inotify.max_user_watches) is reached, the journal is
+    marked overflowed so the next save scans everything.
+    """
+    import ctypes
+    import select
+    import struct
+    
+    libc = _load_inotify()
+    enable(worktree_path)
+    fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+    
+    dirs: dict[int, Path] = {}
+    pending: set[str] = set()
+    overflowed = False
+    
+    def add_tree(top: Path, journal_files: bool) -> None:
+        nonlocal overflowed
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames[:] = [d for d in dirnames if d not in _SKIP_DIRS or Path(dirpath) != worktree_path]
+            wd = libc.inotify_add_watch(fd, os.fsencode(dirpath), _WATCH_MASK)
+            if wd < 0:
+                overflowed = True  # most likely ENOSPC: out of watches
+                dirnames[:] = []
+                continue
+            dirs[wd] = Path(dirpath)
+            if journal_files:
+                pending.update(str(Path(dirpath) / name) for name in filenames)
+    
+    header = struct.Struct("iIII")
+    try:
+        add_tree(worktree_path, journal_files=False)
+        if on_ready is not None:
+            on_ready(len(dirs))
+        last_flush = time.monotonic()
+        while stop is None or not stop.is_set():
+            ready, _, _ = select.select([fd], [], [], FLUSH_INTERVAL)
+            if ready:
+                try:
+                    data = os.read(fd, 65536)
+                except BlockingIOError:
+                    data = b""
+                pos = 0
+                while pos + header.size <= len(data):
+                    wd, mask, _, length = header.unpack_from(data, pos)
+                    name = data[pos + header.size:pos + header.size + length].rstrip(b"\0")
+                    pos += header.size + length
+                    if mask & IN_Q_OVERFLOW:
+                        overflowed = True
+                        continue
+                    if mask & IN_IGNORED:
+                        dirs.pop(wd, None)
+                        continue
+                    parent = dirs.get(wd)
+                    if parent is None or not name:
+                        continue
+                    path = parent / os.fsdecode(name)
+                    if parent == worktree_path and path.name in _SKIP_DIRS:
+                        continue
+                    pending.add(str(path))
+                    if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                        # Files may have landed in it before the watch existed
+                        add_tree(path, journal_files=True)
+            now = time.monotonic()
+            if (pending or overflowed) and (now - last_flush >= FLUSH_INTERVAL or not ready):
+                if overflowed:
+                    mark_overflow(worktree_path)
+                    overflowed = False
+                record(worktree_path, sorted(pending))
+                pending.clear()
+                last_flush = now
+    finally:
+        if overflowed:
+            mark_overflow(worktree_path)
+        if pending:
+            record(worktree_path, sorted(pending))
+        os.close(fd)
@@ -0,0 +1,98 @@
+"""Cross-process file locking helpers."""
+
+import os
+import stat
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+
+def private_dir(path: Path) -> Path:
+    """
+    Create `path` as a directory only the current user can use (0700), or
+    check that an existing one is.
+    
+    For fixed paths in shared places such as /tmp, where another user could
+    create the directory first or plant symlinks in it.
+    
+    Raises:
+        PermissionError: if `path` exists but is a symlink, not owned by the
+            current user, or accessible to group or others
+    """
+    uid = os.getuid()
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != uid or st.st_mode & 0o077:
+        raise PermissionError(f"{path} is not a private directory of uid {uid}")
+    return path
+
+
+def _try_lock(fd: int, shared: bool = False) -> bool:
+    """Try to take an exclusive (or shared) lock on fd without blocking."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+        else:  # pragma: no cover - Windows
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:  # pragma: no cover - Windows
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(
+    path: Path,
+    blocking: bool = True,
+    timeout: Optional[float] = None,
+    shared: bool = False,
+) -> Iterator[bool]:
+    """
+    Hold an exclusive lock on `path` for the duration of the block.
+    
+    With `shared`, any number of shared holders may hold it at once while
+    excluding exclusive holders (on Windows the lock is always exclusive).
+    
+    The lock is released automatically if the process dies, so a crashed
+    holder never leaves a stale lock behind.
+    
+    Yields:
+        True if the lock is held; False if blocking is False (or the timeout
+        expired) and another process holds it
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None and blocking and timeout is None:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            locked = True
+        else:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            locked = _try_lock(fd, shared)
+            while not locked and blocking and (deadline is None or time.monotonic() < deadline):
+                time.sleep(0.01)
+                locked = _try_lock(fd, shared)
+        try:
+            yield locked
+        finally:
+            if locked:
+                _unlock(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,229 @@
+"""Per-agent run logs (.work/<agent>/.agt/logs/) with size rotation and compression."""
+
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import IO, Optional
+
+from agt.worktree import get_git_common_dir
+
+LOG_DIR = Path(".agt") / "logs"
+LOG_NAME = "run.log"
+
+# Rotate the live log once it grows past this size
+MAX_LOG_BYTES = int(os.environ.get("AGT_LOG_MAX_BYTES") or 8 * 1024 * 1024)
+
+# Compressed segments kept besides the live log (run.log.1.gz is the newest)
+MAX_SEGMENTS = 5
+
+# Output buffered in memory while the disk writer catches up; beyond this the
+# oldest output is dropped instead of blocking the command
+RING_BYTES = 4 * 1024 * 1024
+
+# Exclude pattern keeping agt's per-worktree files out of `git add -A`
+_EXCLUDE_PATTERN = "/.agt/"
+
+
+def get_log_dir(worktree_path: Path) -> Path:
+    """Get the log directory of an agent worktree (.agt/logs)."""
+    return worktree_path / LOG_DIR
+
+
+def ensure_excluded(root: Path) -> None:
+    """Add /.agt/ to the repository's info/exclude so agt files are never committed."""
+    exclude_path = get_git_common_dir(root) / "info" / "exclude"
+    try:
+        lines = exclude_path.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        lines = []
+    if _EXCLUDE_PATTERN in lines:
+        return
+    exclude_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(exclude_path, "a", encoding="utf-8") as fh:
+        if lines and lines[-1]:
+            fh.write("\n")
+        fh.write(f"# agt per-worktree state\n{_EXCLUDE_PATTERN}\n")
+
+
+def rotate(log_dir: Path, keep: int = MAX_SEGMENTS) -> None:
+    """Compress run.log into run.log.1.gz, shifting older segments and dropping the oldest."""
+    import gzip
+    import shutil
+    
+    log_path = log_dir / LOG_NAME
+    if not log_path.exists():
+        return
+    for n in range(keep, 0, -1):
+        segment = log_dir / f"{LOG_NAME}.{n}.gz"
+        if segment.exists():
+            if n == keep:
+                segment.unlink()
+            else:
+                os.replace(segment, log_dir / f"{LOG_NAME}.{n + 1}.gz")
+    # Move the live log aside first so concurrent writers start a fresh one
+    pending = log_dir / f"{LOG_NAME}.{os.getpid()}.rotating"
+    os.replace(log_path, pending)
+    tmp_path = log_dir / f"{LOG_NAME}.1.gz.tmp"
+    with open(pending, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp_path, log_dir / f"{LOG_NAME}.1.gz")
+    pending.unlink()
+
+
+class LogSink:
+    """
+    Append command output to an agent's run.log without ever blocking the writer.
+    
+    write() only queues data in a bounded in-memory ring; a background thread
+    writes it to disk and rotates the log when it outgrows max_bytes. If the
+    disk falls behind by more than ring_bytes, the oldest queued output is
+    dropped and a marker noting the loss is written in its place.
+    """
+    
+    def __init__(self, log_dir: Path, max_bytes: int = MAX_LOG_BYTES, ring_bytes: int = RING_BYTES):
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.ring_bytes = ring_bytes
+        self._chunks: deque[bytes] = deque()
+        self._buffered = 0
+        self._dropped = 0
+        self._closed = False
+        self._ready = threading.Condition()
+        log_dir.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+    
+    def write(self, data: bytes) -> None:
+        """Queue output for the log; never blocks on disk I/O."""
+        if not data:
+            return
+        with self._ready:
+            self._chunks.append(data)
+            self._buffered += len(data)
+            while self._buffered > self.ring_bytes and len(self._chunks) > 1:
+                dropped = self._chunks.popleft()
+                self._buffered -= len(dropped)
+                self._dropped += len(dropped)
+            self._ready.notify()
+    
+    def close(self) -> None:
+        """Flush everything queued so far and stop the writer thread."""
+        with self._ready:
+            self._closed = True
+            self._ready.notify()
+        self._thread.join()
+    
+    def _drain(self) -> None:
+        from agt.lock import file_lock
+        
+        log_path = self.log_dir / LOG_NAME
+        fh = open(log_path, "ab")
+        try:
+            while True:
+                with self._ready:
+                    while not self._chunks and not self._closed:
+                        self._ready.wait()
+                    chunks = list(self._chunks)
+                    self._chunks.clear()
+                    self._buffered = 0
+                    dropped, self._dropped = self._dropped, 0
+                    closed = self._closed
+                if dropped:
+                    fh.write(f"\n[agt: {dropped} bytes of output dropped]\n".encode())
+                fh.writelines(chunks)
+                fh.flush()
+                if fh.tell() >= self.max_bytes:
+                    fh.close()
+                    with file_lock(self.log_dir / "rotate.lock"):
+                        # Another writer may have rotated it already
+                        if log_path.exists() and log_path.stat().st_size >= self.max_bytes:
+                            rotate(self.log_dir)
+                    fh = open(log_path, "ab")
+                if closed:
+                    return
+        finally:
+            fh.close()
+
+
+def open_log(root: Path, worktree_path: Path, command: str) -> LogSink:
+    """Start a log entry for one `ws run` and return its sink."""
+    ensure_excluded(root)
+    sink = LogSink(get_log_dir(worktree_path))
+    started = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    sink.write(f"=== {started} $ {command}\n".encode())
+    return sink
+
+
+def close_log(sink: LogSink, exit_status: int) -> None:
+    """Finish a log entry with the command's exit status."""
+    sink.write(f"=== exit {exit_status}\n".encode())
+    sink.close()
+
+
+def tail(path: Path, lines: int, block_size: int = 8192) -> tuple[bytes, int]:
+    """
+    Read the last `lines` lines of a file, seeking backwards from its end.
+    
+    Returns:
+        (data, end_offset) - pass end_offset to follow() to continue from there
+    """
+    with open(path, "rb") as fh:
+        end = pos = fh.seek(0, os.SEEK_END)
+        data = b""
+        # Read one line more than needed: the file normally ends with a newline
+        while pos > 0 and data.count(b"\n") <= lines:
+            step = min(block_size, pos)
+            pos -= step
+            fh.seek(pos)
+            data = fh.read(step) + data
+    return b"".join(data.splitlines(keepends=True)[-lines:]) if lines else b"", end
+
+
+def follow(
+    path: Path,
+    out: IO[bytes],
+    offset: int = 0,
+    poll_interval: float = 0.25,
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """
+    Copy data appended to `path` (from `offset` on) to `out` until interrupted.
+    
+    A rotation shows up as the file being replaced or truncated; the rest of
+    the old file is drained and the new log is then read from its start.
+    Stops when `stop` is set, if given.
+    """
+    fh = None
+    inode = None
+    try:
+        while stop is None or not stop.is_set():
+            if fh is None:
+                try:
+                    fh = open(path, "rb")
+                except FileNotFoundError:
+                    time.sleep(poll_interval)
+                    continue
+                st = os.fstat(fh.fileno())
+                inode = st.st_ino
+                # A log rotated since `offset` was taken is read from its start
+                fh.seek(offset if offset <= st.st_size else 0)
+                offset = 0
+            data = fh.read(65536)
+            if data:
+                out.write(data)
+                out.flush()
+                continue
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                st = None
+            if st is None or st.st_ino != inode or st.st_size < fh.tell():
+                fh.close()
+                fh = None
+                continue
+            time.sleep(poll_interval)
+    finally:
+        if fh is not None:
+            fh.close()
@@ -0,0 +1,268 @@
+"""
+In-memory rebase and fast-forward with git plumbing (used by `agt ws merge`).
+
+A branch is rebased without a checkout: each commit is replayed onto the
+new base with `git merge-tree --write-tree` (a three-way merge of trees in
+the object store) and `git commit-tree` (keeping author and message), so
+the work is proportional to the changed files, not to the repository.
+Branches are then moved with `git update-ref <ref> <new> <old>`, which
+fails if anyone else moved them meanwhile. A worktree that has the moved
+branch checked out is brought along with a two-way `git read-tree -m -u`
+(only the changed files are written) - and only if it is clean; otherwise
+its branch is left where it was.
+
+Needs git 2.38 or later (merge-tree --write-tree).
+"""
+
+import os
+import re
+import subprocess
+from functools import cache
+from pathlib import Path
+from typing import Optional
+
+MIN_GIT_VERSION = (2, 38)
+
+
+class MergeConflictError(Exception):
+    """A commit did not apply cleanly onto the new base."""
+    
+    def __init__(self, commit: str, paths: list[str]):
+        self.commit = commit
+        self.paths = paths
+        super().__init__(f"{commit[:12]} conflicts in: {', '.join(paths) or '(unknown paths)'}")
+
+
+def _git(args: list[str], cwd: Path, input: Optional[bytes] = None, env: Optional[dict] = None) -> bytes:
+    result = subprocess.run(["git", *args], cwd=cwd, input=input, capture_output=True, env=env)
+    if result.returncode:
+        raise subprocess.CalledProcessError(
+            result.returncode, result.args, result.stdout, result.stderr.decode(errors="replace")
+        )
+    return result.stdout
+
+
+@cache
+def git_version() -> tuple[int, ...]:
+    """The installed git's version, e.g. (2, 43, 0)."""
+    output = subprocess.run(["git", "version"], capture_output=True, text=True).stdout
+    match = re.search(r"(\d+)\.(\d+)(?:\.(\d+))?", output)
+    return tuple(int(part) for part in match.groups(default="0")) if match else (0, 0, 0)
+
+
+def commits_to_replay(cwd: Path, upstream: str, tip: str) -> list[str]:
+    """
+    The commits a rebase of `tip` onto `upstream` would replay, oldest first.
+    
+    Like `git rebase`, merge commits and commits whose change upstream
+    already has (same patch ID) are left out.
+    """
+    output = _git(["rev-list", "--reverse", "--no-merges", "--right-only", "--cherry-pick", f"{upstream}...{tip}"], cwd)
+    return output.decode().split()
+
+
+def _read_commits(cwd: Path, commits: list[str]) -> dict[str, tuple[list[str], dict, bytes]]:
+    """
+    Read several commit objects with one `git cat-file --batch`.
+    
+    Returns:
+        {commit: (parents, author environment for commit-tree, message)}
+    """
+    output = _git(["cat-file", "--batch"], cwd, input="".join(f"{c}\n" for c in commits).encode())
+    parsed = {}
+    pos = 0
+    for commit in commits:
+        header_end = output.index(b"\n", pos)
+        size = int(output[pos:header_end].split()[2])
+        body = output[header_end + 1:header_end + 1 + size]
+        pos = header_end + 1 + size + 1
+        headers, _, message = body.partition(b"\n\n")
+        parents, env = [], {}
+        for line in headers.decode(errors="surrogateescape").splitlines():
+            if line.startswith("parent "):
+                parents.append(line.split(" ", 1)[1])
+            elif line.startswith("author "):
+                name, _, rest = line[len("author "):].partition(" <")
+                email, _, date = rest.partition("> ")
+                env = {"GIT_AUTHOR_NAME": name, "GIT_AUTHOR_EMAIL": email, "GIT_AUTHOR_DATE": date}
+        parsed[commit] = (parents, env, message)
+    return parsed
+
+
+def _merge_trees(cwd: Path, base: Optional[str], ours: str, theirs: str) -> tuple[Optional[str], list[str]]:
+    """
+    Three-way merge of commits `ours` and `theirs` against `base`, in the object store.
+    
+    With `base` None, git picks the merge base of the two commits.
+    
+    Returns:
+        (tree, []) on success, or (None, conflicted paths)
+    """
+    if base is None:
+        args = ["merge-tree", "--write-tree", "--name-only", ours, theirs]
+    elif git_version() >= (2, 40):
+        args = ["merge-tree", "--write-tree", "--name-only", f"--merge-base={base}", ours, theirs]
+    else:
+        # No --merge-base yet: give `ours` a stand-in commit whose only parent
+        # is `base`, so that base is the merge base of the two
+        tree = _git(["rev-parse", f"{ours}^{{tree}}"], cwd).decode().strip()
+        ours = _git(["commit-tree", tree, "-p", base, "-m", "agt merge base"], cwd).decode().strip()
+        args = ["merge-tree", "--write-tree", "--name-only", ours, theirs]
+    result = subprocess.run(["git", *args], cwd=cwd, capture_output=True)
+    lines = result.stdout.decode(errors="surrogateescape").split("\n")
+    if result.returncode == 0:
+        return lines[0], []
+    if result.returncode == 1:
+        # Tree, then the conflicted paths up to an empty line
+        paths = []
+        for line in lines[1:]:
+            if not line:
+                break
+            paths.append(line)
+        return None, list(dict.fromkeys(paths))
+    raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr.decode(errors="replace"))
+
+
+def conflicting_paths(cwd: Path, ours: str, theirs: str) -> list[str]:
+    """
+    The paths that would conflict if commits `ours` and `theirs` were merged (none: merges cleanly).
+    
+    Nothing is checked out or written outside the object store.
+    """
+    if git_version() < MIN_GIT_VERSION:
+        raise RuntimeError(f"in-memory merges need git {'.'.join(map(str, MIN_GIT_VERSION))} or later")
+    return _merge_trees(cwd, None, ours, theirs)[1]
+
+
+def replay(cwd: Path, commits: list[str], onto: str) -> str:
+    """
+    Replay commits (oldest first, see commits_to_replay) onto `onto` without a checkout.
+    
+    Commits that become empty are dropped, as `git rebase` does.
+    
+    Raises:
+        MergeConflictError: if a commit doesn't apply cleanly
+    
+    Returns:
+        The new tip (`onto` itself if nothing was left to replay)
+    """
+    if git_version() < MIN_GIT_VERSION:
+        raise RuntimeError(f"in-memory merges need git {'.'.join(map(str, MIN_GIT_VERSION))} or later")
+    tip = onto
+    tip_tree = _git(["rev-parse", f"{onto}^{{tree}}"], cwd).decode().strip()
+    for commit, (parents, author, message) in _read_commits(cwd, commits).items():
+        tree, conflicts = _merge_trees(cwd, parents[0], tip, commit)
+        if tree is None:
+            raise MergeConflictError(commit, conflicts)
+        if tree == tip_tree:
+            continue
+        tip = _git(["commit-tree", tree, "-p", tip], cwd, input=message, env=dict(os.environ, **author)).decode().strip()
+        tip_tree = tree
+    return tip
+
+
+def rebase(cwd: Path, upstream: str, tip: str, onto: Optional[str] = None) -> str:
+    """
+    Rebase `tip` onto `onto` (default: `upstream`) in memory.
+    
+    Raises:
+        MergeConflictError: if a commit doesn't apply cleanly
+    
+    Returns:
+        The rebased tip
+    """
+    return replay(cwd, commits_to_replay(cwd, upstream, tip), onto or upstream)
+
+
+def checked_out_in(root: Path, branch: str) -> Optional[Path]:
+    """The worktree that has `branch` checked out, if any."""
+    output = _git(["worktree", "list", "--porcelain"], root).decode(errors="surrogateescape")
+    path = None
+    for line in output.splitlines():
+        if line.startswith("worktree "):
+            path = Path(line[len("worktree "):])
+        elif line == f"branch refs/heads/{branch}":
+            return path
+    return None
+
+
+def _is_clean(worktree_path: Path) -> bool:
+    """No staged or unstaged changes to tracked files."""
+    return not _git(["status", "--porcelain", "--untracked-files=no"], worktree_path).strip()
+
+
+def move_branch(root: Path, branch: str, new: str, old: str) -> bool:
+    """
+    Move `branch` from `old` to `new`, updating the worktree that has it checked out.
+    
+    If that worktree has local changes, neither the branch nor the worktree
+    is touched.
+    
+    Raises:
+        subprocess.CalledProcessError: if the branch no longer points at `old`
+    
+    Returns:
+        True if the branch was moved
+    """
+    worktree_path = checked_out_in(root, branch)
+    if worktree_path is not None and not _is_clean(worktree_path):
+        return False
+    ref = f"refs/heads/{branch}"
+    _git(["update-ref", "-m", f"agt merge: fast-forward to {new[:12]}", ref, new, old], root)
+    if worktree_path is not None:
+        try:
+            # Two-way merge from the old commit: only changed files are written
+            _git(["read-tree", "-m", "-u", old, new], worktree_path)
+        except subprocess.CalledProcessError:
+            # Something appeared in the worktree meanwhile (e.g. an untracked
+            # file in the way): put the branch back
+            _git(["update-ref", ref, old, new], root)
+            return False
+    return True
+
+
+def merge_branch(root: Path, agent_id: str, remote: str = "origin") -> dict:
+    """
+    Rebase an agent branch onto the remote's main and fast-forward main to it, in memory.
+    
+    main is fetched through the shared fetch (agt.fetch), so it may be a
+    few seconds old; the remote's main is updated with one plain push of
+    the rebased commit, and if that is refused, the branch is rebased onto
+    a fresh fetch and pushed again. The local main and the agent branch
+    follow via move_branch.
+    
+    Raises:
+        MergeConflictError: if the branch doesn't rebase cleanly
+        subprocess.CalledProcessError: if a git command fails (e.g. the push)
+    
+    Returns:
+        {"branch", "commit" (main's new commit), "main_updated", "branch_updated"}
+    """
+    from agt.fetch import fetch, note_pushed
+    from agt.push import agent_branch
+    
+    branch = agent_branch(root, agent_id)
+    old_tip = _git(["rev-parse", f"refs/heads/{branch}"], root).decode().strip()
+    onto = fetch(root, remote, "main")
+    while True:
+        new_tip = rebase(root, onto, old_tip)
+        try:
+            _git(["push", "-q", remote, f"{new_tip}:refs/heads/main"], root)
+            break
+        except subprocess.CalledProcessError:
+            # The shared fetch may be a few seconds old: retry on a fresh one
+            # for as long as main keeps moving
+            latest = fetch(root, remote, "main", max_age=0)
+            if latest == onto:
+                raise
+            onto = latest
+    note_pushed(root, remote, "main", new_tip)
+    
+    branch_updated = new_tip == old_tip or move_branch(root, branch, new_tip, old_tip)
+    old_main = _git(["rev-parse", "refs/heads/main"], root).decode().strip()
+    main_updated = old_main == new_tip
+    if not main_updated and subprocess.run(
+        ["git", "merge-base", "--is-ancestor", old_main, new_tip], cwd=root, capture_output=True
+    ).returncode == 0:
+        main_updated = move_branch(root, "main", new_tip, old_main)
+    return {"branch": branch, "commit": new_tip, "main_updated": main_updated, "branch_updated": branch_updated}
@@ -0,0 +1,366 @@
+"""
+Merge queue that lands agent branches on main in batches (`agt ws merge --queue`).
+
+`merge --queue` records each branch's current commit in .work/.mergequeue/
+and starts the merger unless one is running (one per repository, held by a
+lock). The merger takes up to `batch` queued branches at a time and:
+
+1. fetches main (shared with other callers, see agt.fetch) and stacks the
+   branches onto it, one in-memory rebase each (see agt.merge); a branch
+   that conflicts is failed and left out;
+2. runs the verification command once on the top of the stack, if one is
+   configured, in its own detached worktree (.work/.merger); when it fails,
+   main itself is verified (once per batch) and a binary search over the
+   stack's prefixes finds the first branch that breaks it, which is
+   failed before the rest is restacked and verified again. If main fails
+   on its own, the merger stops and leaves the batch queued (see
+   get_blocked);
+3. fast-forwards main on the remote with one push of the stack (a rejected
+   push, e.g. main moved meanwhile, starts the batch over).
+
+Outcomes per agent are kept in results/ (see get_result).
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from agt.fetch import fetch, note_pushed
+from agt.lock import file_lock
+from agt.worktree import get_work_dir
+
+QUEUE_DIR_NAME = ".mergequeue"
+MERGER_WORKTREE_NAME = ".merger"
+CONFIG_NAME = "config.json"
+BLOCKED_NAME = "blocked.json"
+
+# Branches stacked and pushed together
+DEFAULT_BATCH = 8
+
+# Rejected pushes of one batch before it is given up
+PUSH_ATTEMPTS = 3
+
+# Output kept from a failed verification
+MAX_DETAIL_LINES = 20
+
+# Outcomes
+MERGED = "merged"
+FAILED = "failed"
+
+
+class BaseVerificationError(RuntimeError):
+    """main itself fails the verification command; the queued entries are kept."""
+
+
+def get_queue_dir(root: Path) -> Path:
+    """Get the merge queue directory (.work/.mergequeue)."""
+    return get_work_dir(root) / QUEUE_DIR_NAME
+
+
+def _read(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _queue_lock(root: Path):
+    """Serializes changes to queue entries between enqueuers and the merger."""
+    return file_lock(get_queue_dir(root) / "queue.lock")
+
+
+def get_config(root: Path) -> dict:
+    """The queue settings: {"batch": int, "verify": command or None}."""
+    config = _read(get_queue_dir(root) / CONFIG_NAME) or {}
+    return {"batch": config.get("batch") or DEFAULT_BATCH, "verify": config.get("verify") or None}
+
+
+def set_config(root: Path, batch: Optional[int] = None, verify: Optional[str] = None) -> dict:
+    """
+    Change the queue settings (None leaves a setting unchanged; verify "" removes it).
+    
+    Returns:
+        The new settings
+    """
+    with _queue_lock(root):
+        config = get_config(root)
+        if batch is not None:
+            config["batch"] = batch
+        if verify is not None:
+            config["verify"] = verify or None
+        _write(get_queue_dir(root) / CONFIG_NAME, config)
+    return config
+
+
+def enqueue(root: Path, agent_id: str, branch: str, commit: str) -> dict:
+    """
+    Queue `commit` of an agent branch for merging (replaces the agent's queued entry).
+    
+    Returns:
+        The entry
+    """
+    entry = {"agent_id": agent_id, "branch": branch, "commit": commit, "queued_at": time.time()}
+    with _queue_lock(root):
+        _write(get_queue_dir(root) / "queue" / f"{agent_id}.json", entry)
+    return entry
+
+
+def list_queue(root: Path) -> list[dict]:
+    """Queued entries, oldest first."""
+    queue_dir = get_queue_dir(root) / "queue"
+    if not queue_dir.exists():
+        return []
+    entries = [entry for entry in (_read(p) for p in queue_dir.glob("*.json")) if entry]
+    return sorted(entries, key=lambda entry: entry["queued_at"])
+
+
+def get_result(root: Path, agent_id: str) -> Optional[dict]:
+    """
+    The outcome of an agent's last dequeued entry.
+    
+    Returns:
+        {"agent_id", "branch", "status", "detail", "commit", "finished_at"}
+        (commit: the rebased commit that landed), or None
+    """
+    return _read(get_queue_dir(root) / "results" / f"{agent_id}.json")
+
+
+def get_blocked(root: Path) -> Optional[dict]:
+    """
+    Why the merger last stopped without merging, if main failed verification.
+    
+    Returns:
+        {"base", "detail", "since"} (base: the main commit that failed), or
+        None once a batch lands or main passes again
+    """
+    return _read(get_queue_dir(root) / BLOCKED_NAME)
+
+
+def _finish(root: Path, entry: dict, status: str, detail: str = "", commit: Optional[str] = None) -> dict:
+    """Record an entry's outcome and dequeue it, unless it was queued again meanwhile."""
+    queue_dir = get_queue_dir(root)
+    result = {
+        "agent_id": entry["agent_id"],
+        "branch": entry["branch"],
+        "status": status,
+        "detail": detail,
+        "commit": commit,
+        "finished_at": time.time(),
+    }
+    with _queue_lock(root):
+        _write(queue_dir / "results" / f"{entry['agent_id']}.json", result)
+        current = _read(queue_dir / "queue" / f"{entry['agent_id']}.json")
+        if current is not None and current["queued_at"] == entry["queued_at"]:
+            (queue_dir / "queue" / f"{entry['agent_id']}.json").unlink(missing_ok=True)
+    return result
+
+
+def _git(args: list[str], cwd: Path, check: bool = True) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, check=check)
+
+
+def _tail(output: str) -> str:
+    return "\n".join(output.strip().splitlines()[-MAX_DETAIL_LINES:])
+
+
+def _merger_worktree(root: Path, base: str) -> Path:
+    """The merger's detached worktree (.work/.merger), created on first use."""
+    path = get_work_dir(root) / MERGER_WORKTREE_NAME
+    if not (path / ".git").exists():
+        _git(["worktree", "prune"], root)
+        _git(["worktree", "add", "--detach", str(path), base], root)
+    return path
+
+
+def _checkout(merger: Path, commit: str) -> None:
+    """Point the merger worktree at `commit` with no leftovers of earlier runs."""
+    _git(["reset", "-q", "--hard", commit], merger)
+    _git(["clean", "-fdq"], merger)
+
+
+def _stack(root: Path, base: str, entries: list[dict]) -> tuple[list[tuple[dict, str]], list[tuple[dict, str]]]:
+    """
+    Rebase the entries' commits one after another onto `base`, in memory (see agt.merge).
+    
+    Returns:
+        ([(entry, rebased tip)] in stack order, [(entry, reason)] for
+        entries that did not rebase cleanly)
+    """
+    from agt.merge import MergeConflictError, rebase
+    
+    tip = base
+    stacked, conflicts = [], []
+    for entry in entries:
+        try:
+            tip = rebase(root, base, entry["commit"], onto=tip)
+        except MergeConflictError as e:
+            conflicts.append((entry, f"conflicts with main or with a branch ahead of it in the batch: {e}"))
+            continue
+        stacked.append((entry, tip))
+    return stacked, conflicts
+
+
+def _verify(root: Path, commit: str, command: str) -> tuple[bool, str]:
+    """Run the verification command on `commit`, checked out in the merger worktree."""
+    merger = _merger_worktree(root, commit)
+    _checkout(merger, commit)
+    result = subprocess.run(command, shell=True, cwd=merger, capture_output=True, text=True)
+    return result.returncode == 0, _tail(result.stdout + result.stderr)
+
+
+def _find_culprit(root: Path, stacked: list[tuple[dict, str]], command: str) -> tuple[int, str]:
+    """
+    Binary-search the first stack prefix that fails verification.
+    
+    The whole stack is known to fail and main (the empty prefix) to pass
+    (checked by the caller).
+    
+    Returns:
+        (index of the culprit in `stacked`, its verification output)
+    """
+    low, high = 0, len(stacked) - 1
+    output = ""
+    while low < high:
+        middle = (low + high) // 2
+        ok, middle_output = _verify(root, stacked[middle][1], command)
+        if ok:
+            low = middle + 1
+        else:
+            high, output = middle, middle_output
+    if not output:
+        output = _verify(root, stacked[low][1], command)[1]
+    return low, output
+
+
+def _advance_local_main(root: Path, commit: str) -> None:
+    """Bring the local main branch up to the pushed commit if it can fast-forward."""
+    from agt.merge import move_branch
+    
+    old = _git(["rev-parse", "refs/heads/main"], root).stdout.strip()
+    if _git(["merge-base", "--is-ancestor", old, commit], root, check=False).returncode == 0:
+        move_branch(root, "main", commit, old)
+
+
+def _merge_batches(root: Path, remote: str, finish: Callable[..., None]) -> None:
+    """Merge batches until the queue is empty; `finish` records each entry's outcome."""
+    rejected_pushes = 0
+    while True:
+        config = get_config(root)
+        entries = list_queue(root)[:config["batch"]]
+        if not entries:
+            return
+        
+        # After a rejected push the shared fetch is known to be stale
+        base = fetch(root, remote, "main", max_age=0 if rejected_pushes else None)
+        stacked, conflicts = _stack(root, base, entries)
+        for entry, reason in conflicts:
+            finish(entry, FAILED, reason)
+        
+        base_verified = False
+        while stacked and config["verify"]:
+            ok, _ = _verify(root, stacked[-1][1], config["verify"])
+            if ok:
+                break
+            if not base_verified:
+                # Bisecting assumes main passes; if it doesn't, no branch is to blame
+                ok, output = _verify(root, base, config["verify"])
+                if not ok:
+                    detail = f"main ({base[:12]}) fails verification: {config['verify']}\n{output}".rstrip()
+                    _write(get_queue_dir(root) / BLOCKED_NAME, {"base": base, "detail": detail, "since": time.time()})
+                    raise BaseVerificationError(detail)
+                (get_queue_dir(root) / BLOCKED_NAME).unlink(missing_ok=True)
+                base_verified = True
+            index, output = _find_culprit(root, stacked, config["verify"])
+            finish(stacked[index][0], FAILED, f"verification failed: {config['verify']}\n{output}".rstrip())
+            stacked, conflicts = _stack(root, base, [e for i, (e, _) in enumerate(stacked) if i != index])
+            for entry, reason in conflicts:
+                finish(entry, FAILED, reason)
+        if not stacked:
+            continue
+        
+        tip = stacked[-1][1]
+        push = _git(["push", "-q", remote, f"{tip}:refs/heads/main"], root, check=False)
+        if push.returncode:
+            # Most likely main moved on the remote: refetch and restack
+            rejected_pushes += 1
+            if rejected_pushes >= PUSH_ATTEMPTS:
+                for entry, _ in stacked:
+                    finish(entry, FAILED, f"push to {remote} main failed: {_tail(push.stderr)}")
+                rejected_pushes = 0
+            continue
+        rejected_pushes = 0
+        (get_queue_dir(root) / BLOCKED_NAME).unlink(missing_ok=True)
+        note_pushed(root, remote, "main", tip)
+        _advance_local_main(root, tip)
+        for entry, commit in stacked:
+            finish(entry, MERGED, f"landed on {remote}/main", commit)
+
+
+def run_queue(
+    root: Path,
+    remote: str = "origin",
+    report: Optional[Callable[[dict], None]] = None,
+) -> list[dict]:
+    """
+    Merge queued branches batch by batch until the queue is empty (the merger).
+    
+    Uses the configured batch size and verification command (get_config),
+    re-read for every batch. Only one merger runs per repository; if another
+    holds the merger lock, this returns at once.
+    
+    Raises:
+        BaseVerificationError: if main itself fails verification (the
+            batch stays queued)
+    
+    Returns:
+        The outcome of every entry handled (see get_result), in order;
+        each is also passed to `report` as it is decided
+    """
+    outcomes = []
+    
+    def finish(entry: dict, status: str, detail: str = "", commit: Optional[str] = None) -> None:
+        outcome = _finish(root, entry, status, detail, commit)
+        outcomes.append(outcome)
+        if report is not None:
+            report(outcome)
+    
+    while True:
+        with file_lock(get_queue_dir(root) / "merger.lock", blocking=False) as locked:
+            if not locked:
+                return outcomes
+            _merge_batches(root, remote, finish)
+        # An entry queued while this merger was about to exit saw it running
+        # and started no other: pick it up
+        if not list_queue(root):
+            return outcomes
+
+
+def is_merger_running(root: Path) -> bool:
+    """Whether a merger currently holds the merger lock."""
+    with file_lock(get_queue_dir(root) / "merger.lock", blocking=False) as locked:
+        return not locked
+
+
+def start_merger(root: Path, remote: str = "origin") -> None:
+    """Start a detached `agt ws merge --run-queue` unless a merger is already running."""
+    if is_merger_running(root):
+        return
+    subprocess.Popen(
+        [sys.executable, "-m", "agt", "ws", "merge", "--run-queue", remote],
+        cwd=root,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
@@ -0,0 +1,177 @@
+"""Resource accounting for `ws run` commands (.work/.metrics/runs.jsonl)."""
+
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from agt.worktree import get_work_dir
+
+METRICS_DIR_NAME = ".metrics"
+METRICS_FILE_NAME = "runs.jsonl"
+
+# ru_maxrss is in kilobytes on Linux but in bytes on macOS
+_MAXRSS_DIVISOR = 1024 if sys.platform == "darwin" else 1
+
+
+def get_metrics_path(root: Path) -> Path:
+    """Get the run metrics file path (.work/.metrics/runs.jsonl)."""
+    return get_work_dir(root) / METRICS_DIR_NAME / METRICS_FILE_NAME
+
+
+def _read_proc_io(pid: int) -> dict[str, int]:
+    """Read a process's I/O counters from /proc/<pid>/io (empty where unavailable)."""
+    try:
+        with open(f"/proc/{pid}/io", encoding="ascii") as fh:
+            fields = dict(line.split(": ", 1) for line in fh.read().splitlines())
+    except (OSError, ValueError):
+        return {}
+    return {"read_bytes": int(fields.get("read_bytes", 0)), "write_bytes": int(fields.get("write_bytes", 0))}
+
+
+def wait_with_usage(proc: subprocess.Popen) -> tuple[int, dict]:
+    """
+    Wait for a child and collect the resources used by it and its descendants.
+    
+    The child is first waited for without reaping it (waitid WNOWAIT), so its
+    /proc/<pid>/io still exists; those counters include descendants it has
+    reaped itself. wait4 then reaps it and returns the rusage of the whole
+    tree. Without wait4 (Windows) only the exit code is collected.
+    
+    Returns:
+        (returncode, usage) - usage holds user/sys CPU seconds, max RSS in
+        KiB and read/write bytes, as far as the platform provides them
+    """
+    if not hasattr(os, "wait4") or proc.returncode is not None:
+        return proc.wait(), {}
+    
+    usage: dict = {}
+    if hasattr(os, "waitid"):
+        try:
+            os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+            usage.update(_read_proc_io(proc.pid))
+        except ChildProcessError:
+            pass
+    while True:
+        try:
+            _, status, rusage = os.wait4(proc.pid, 0)
+            break
+        except InterruptedError:
+            continue
+        except ChildProcessError:
+            # Reaped elsewhere (e.g. by a SIGCHLD handler)
+            return proc.wait(), usage
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    usage.update(
+        user=round(rusage.ru_utime, 3),
+        sys=round(rusage.ru_stime, 3),
+        maxrss_kb=rusage.ru_maxrss // _MAXRSS_DIVISOR,
+    )
+    return proc.returncode, usage
+
+
+def record_run(
+    root: Path,
+    agent_id: str,
+    command: str,
+    exit_status: int,
+    started: float,
+    wall: float,
+    usage: Optional[dict] = None,
+    cached: bool = False,
+) -> None:
+    """Append one run's metrics as a JSON line to .work/.metrics/runs.jsonl."""
+    record = {
+        "ts": round(started, 3),
+        "agent": agent_id,
+        "cmd": command,
+        "exit": exit_status,
+        "wall": round(wall, 3),
+        **(usage or {}),
+    }
+    if cached:
+        record["cached"] = True
+    path = get_metrics_path(root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+    # A single O_APPEND write keeps concurrent writers' lines intact
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def read_runs(root: Path, since: Optional[float] = None) -> list[dict]:
+    """Read recorded runs, optionally only those started at or after `since` (epoch seconds)."""
+    path = get_metrics_path(root)
+    runs = []
+    try:
+        fh = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return runs
+    with fh:
+        for line in fh:
+            try:
+                run = json.loads(line)
+            except ValueError:
+                continue  # torn line from a crashed writer
+            if since is None or run.get("ts", 0) >= since:
+                runs.append(run)
+    return runs
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(len(ordered) * pct / 100))
+    return ordered[rank - 1]
+
+
+def aggregate(runs: list[dict], by: str = "agent") -> list[dict]:
+    """
+    Group runs by "agent" or "command" and summarize each group.
+    
+    Returns:
+        One dict per group, most total wall time first, with run and failure
+        counts, wall-time p50/p90/p99, total CPU seconds, peak RSS and total
+        I/O bytes
+    """
+    key = {"agent": "agent", "command": "cmd"}[by]
+    groups: dict[str, list[dict]] = {}
+    for run in runs:
+        groups.setdefault(run.get(key, "?"), []).append(run)
+    
+    summaries = []
+    for name, group in groups.items():
+        walls = [r.get("wall", 0.0) for r in group]
+        summaries.append({
+            "name": name,
+            "runs": len(group),
+            "failed": sum(1 for r in group if r.get("exit")),
+            "cached": sum(1 for r in group if r.get("cached")),
+            "wall_total": sum(walls),
+            "wall_p50": percentile(walls, 50),
+            "wall_p90": percentile(walls, 90),
+            "wall_p99": percentile(walls, 99),
+            "cpu_total": sum(r.get("user", 0.0) + r.get("sys", 0.0) for r in group),
+            "maxrss_kb": max(r.get("maxrss_kb", 0) for r in group),
+            "read_bytes": sum(r.get("read_bytes", 0) for r in group),
+            "write_bytes": sum(r.get("write_bytes", 0) for r in group),
+        })
+    summaries.sort(key=lambda s: s["wall_total"], reverse=True)
+    return summaries
+
+
+def parse_since(value: str) -> float:
+    """Parse a time window start: a duration ago (30m, 2h, 7d) or an ISO date/time."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    if value[-1:] in units and value[:-1].replace(".", "", 1).isdigit():
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    from datetime import datetime
+    
+    return datetime.fromisoformat(value).timestamp()
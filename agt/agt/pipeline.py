@@ -0,0 +1,375 @@
+"""
+Declarative multi-agent pipelines (`agt ws pipeline plan.yml`).
+
+A plan lists agents, each with a chain of steps run in its own worktree
+(created implicitly from `base`). Agents start once the agents they `need`
+have finished, at most `jobs` steps run at once, and failed steps are
+retried. A plan can be YAML (needs PyYAML: the `pipeline` extra) or JSON:
+
+    jobs: 8
+    retries: 1
+    agents:
+      - name: api
+        base: main
+        steps:
+          - run: pytest -q services/api
+          - save: "feat: api"
+          - push
+      - name: docs
+        needs: [api]
+        steps:
+          - run: {command: make docs, retries: 3}
+          - save: "docs: regenerate"
+          - merge
+          - clean
+
+Steps are run, save, push, merge and clean, with the semantics of the ws
+commands of the same names (save is skipped when there is nothing to
+commit). Progress is kept in .work/.pipeline/<plan>.json: rerunning a plan
+reuses each agent's worktree and skips steps whose inputs are unchanged
+since they last succeeded (a run step's worktree content, the commit a push
+or merge would publish), so a failed batch resumes where it stopped.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from agt import api
+from agt.cli import safe_print
+
+PIPELINE_DIR_NAME = ".pipeline"
+
+STEP_KINDS = ("run", "save", "push", "merge", "clean")
+
+# Delay before the first retry of a failed step; doubles on each further retry
+RETRY_DELAY = 1.0
+
+# Step outcomes
+DONE = "done"
+FAILED = "failed"
+BLOCKED = "blocked"
+
+
+def get_state_path(root: Path, plan_path: Path) -> Path:
+    """Get the progress file of a plan (.work/.pipeline/<plan>.json)."""
+    from agt.worktree import get_work_dir
+    
+    return get_work_dir(root) / PIPELINE_DIR_NAME / f"{plan_path.stem}.json"
+
+
+def _check_count(value, what: str, minimum: int) -> int:
+    """Return `value` if it is an integer >= minimum, else raise ValueError."""
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+        raise ValueError(f"{what} must be an integer >= {minimum}, got {value!r}")
+    return value
+
+
+def _normalize_step(agent: str, raw) -> dict:
+    """Turn a plan step ("push" or {kind: arg | {...}}) into {kind, arg, retries}."""
+    if isinstance(raw, str):
+        kind, value = raw, None
+    elif isinstance(raw, dict) and len(raw) == 1:
+        (kind, value), = raw.items()
+    else:
+        raise ValueError(f"{agent}: invalid step {raw!r}")
+    if kind not in STEP_KINDS:
+        raise ValueError(f"{agent}: unknown step {kind!r} (available: {', '.join(STEP_KINDS)})")
+    
+    retries = None
+    if isinstance(value, dict):
+        retries = value.get("retries")
+        if retries is not None:
+            _check_count(retries, f"{agent}: {kind} retries", 0)
+        value = value.get("command", value.get("message", value.get("remote")))
+    if kind in ("run", "save") and not value:
+        raise ValueError(f"{agent}: {kind} step needs a {'command' if kind == 'run' else 'message'}")
+    if kind == "push":
+        value = value or "origin"
+    return {"kind": kind, "arg": value, "retries": retries}
+
+
+def parse_plan(data: dict) -> dict:
+    """
+    Validate a loaded plan and normalize it.
+    
+    Raises:
+        ValueError: on malformed agents, unknown steps, duplicate or unknown
+        agent names, invalid jobs or retries, or dependency cycles
+    
+    Returns:
+        {"jobs", "retries", "agents": [{"name", "base", "needs", "steps", "spec"}]}
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("agents"), list):
+        raise ValueError("plan must be a mapping with an 'agents' list")
+    
+    jobs = data.get("jobs")
+    if jobs is not None:
+        _check_count(jobs, "jobs", 1)
+    retries = _check_count(data.get("retries", 0), "retries", 0)
+    
+    agents = []
+    for index, raw in enumerate(data["agents"]):
+        if not isinstance(raw, dict):
+            raise ValueError(f"agent {index + 1} must be a mapping, got {raw!r}")
+        name = str(raw.get("name") or f"agent{index + 1}")
+        if any(a["name"] == name for a in agents):
+            raise ValueError(f"duplicate agent name: {name}")
+        needs = raw.get("needs") or []
+        agents.append({
+            "name": name,
+            "base": raw.get("base", "main"),
+            "needs": [needs] if isinstance(needs, str) else list(needs),
+            "steps": [_normalize_step(name, step) for step in raw.get("steps") or []],
+            # Fingerprint of the agent's definition; a changed agent starts over
+            "spec": hashlib.sha256(json.dumps(raw, sort_keys=True, default=str).encode()).hexdigest(),
+        })
+    
+    names = {a["name"] for a in agents}
+    for agent in agents:
+        unknown = [n for n in agent["needs"] if n not in names]
+        if unknown:
+            raise ValueError(f"{agent['name']}: unknown agent in needs: {', '.join(unknown)}")
+    
+    # Reject cycles (depth-first search over needs)
+    needs = {a["name"]: a["needs"] for a in agents}
+    visiting, visited = set(), set()
+    
+    def visit(name: str) -> None:
+        if name in visited:
+            return
+        if name in visiting:
+            raise ValueError(f"dependency cycle through agent {name}")
+        visiting.add(name)
+        for dep in needs[name]:
+            visit(dep)
+        visiting.discard(name)
+        visited.add(name)
+    
+    for name in needs:
+        visit(name)
+    
+    return {"jobs": jobs, "retries": retries, "agents": agents}
+
+
+def load_plan(path: Path) -> dict:
+    """
+    Read and validate a YAML or JSON plan file.
+    
+    Raises:
+        ValueError: if the plan is invalid
+        ImportError: for a YAML plan without PyYAML installed
+    """
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".json":
+        data = json.loads(text)
+    else:
+        import yaml
+        
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ValueError(str(e)) from e
+    return parse_plan(data)
+
+
+def _load_state(state_path: Path) -> dict:
+    try:
+        return json.loads(state_path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_state(state_path: Path, state: dict) -> None:
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = state_path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, state_path)
+
+
+async def _step_key(step: dict, worktree_path: Path) -> Optional[str]:
+    """
+    Fingerprint a step's inputs in the worktree's current state.
+    
+    Returns:
+        The key, or None if the step always runs
+    """
+    kind, arg = step["kind"], step["arg"]
+    if kind == "run":
+        from agt.cache import tree_hash
+        
+        tree = await asyncio.to_thread(tree_hash, worktree_path)
+        return f"run {arg} {tree}"
+    if kind in ("push", "merge"):
+        head = await api._git(["rev-parse", "HEAD"], worktree_path)
+        return f"{kind} {arg} {head.strip()}"
+    return None
+
+
+async def _is_clean(worktree_path: Path) -> bool:
+    """Whether the worktree has nothing to commit."""
+    status = await api._git(["status", "--porcelain"], worktree_path)
+    return not status.strip()
+
+
+def _print_output(name: str, data: bytes, target) -> None:
+    if data:
+        text = data.decode(errors="replace")
+        target.write("".join(f"[{name}] {line}" for line in text.splitlines(keepends=True)))
+        if not text.endswith("\n"):
+            target.write("\n")
+        target.flush()
+
+
+async def _execute(step: dict, name: str, agent_id: str, root: Path) -> None:
+    """Run one step; raises AgtError on failure (including a failing command)."""
+    kind, arg = step["kind"], step["arg"]
+    if kind == "run":
+        result = await api.run(agent_id, arg, root=root)
+        _print_output(name, result.stdout, sys.stdout)
+        _print_output(name, result.stderr, sys.stderr)
+        if not result.ok:
+            raise api.AgtError(f"command exited with status {result.exit_status}", result.exit_status)
+    elif kind == "save":
+        await api.commit(agent_id, arg, root=root)
+    elif kind == "push":
+        await api.push(agent_id, arg, root=root)
+    elif kind == "merge":
+        await api.merge(agent_id, root=root)
+    elif kind == "clean":
+        await api.clean(agent_id, root=root)
+
+
+async def run_pipeline(
+    root: Path,
+    plan: dict,
+    state_path: Path,
+    jobs: Optional[int] = None,
+    retries: Optional[int] = None,
+    retry_delay: float = RETRY_DELAY,
+) -> dict[str, str]:
+    """
+    Run a parsed plan: every agent's steps in order, agents as a DAG.
+    
+    At most `jobs` steps run at once (default: the plan's jobs, then the
+    CPU count). A failing step is retried up to `retries` times (default:
+    the step's, then the plan's retries) with exponential backoff; if it
+    still fails, the agent stops and agents that need it are blocked.
+    
+    Returns:
+        Outcome per agent name: done, failed or blocked
+    """
+    from agt.logs import ensure_excluded
+    from agt.runner import DEFAULT_JOBS
+    from agt.worktree import get_worktree_path
+    
+    # Keep agt's own files out of run-step fingerprints
+    ensure_excluded(root)
+    
+    state = _load_state(state_path)
+    slots = asyncio.Semaphore(max(1, jobs or plan["jobs"] or DEFAULT_JOBS))
+    finished = {a["name"]: asyncio.Event() for a in plan["agents"]}
+    outcomes: dict[str, str] = {}
+    
+    def report(ok: bool, name: str, label: str, detail: str = "") -> None:
+        line = f"{'✅' if ok else '❌'} [{name}] {label}" + (f" ({detail})" if detail else "")
+        safe_print(line, file=sys.stdout if ok else sys.stderr)
+    
+    async def run_agent(agent: dict) -> None:
+        name = agent["name"]
+        try:
+            for dep in agent["needs"]:
+                await finished[dep].wait()
+            blocked = [dep for dep in agent["needs"] if outcomes[dep] != DONE]
+            if blocked:
+                outcomes[name] = BLOCKED
+                report(False, name, "blocked", f"needs {', '.join(blocked)}")
+                return
+            outcomes[name] = await run_steps(agent)
+        except (api.AgtError, subprocess.CalledProcessError, OSError) as e:
+            # Errors outside a step's own command (fingerprinting the worktree,
+            # saving progress) fail this agent only, not the whole plan
+            detail = e.stderr.strip() if isinstance(e, subprocess.CalledProcessError) and e.stderr else str(e)
+            outcomes[name] = FAILED
+            report(False, name, "error", detail)
+        finally:
+            finished[name].set()
+    
+    async def run_steps(agent: dict) -> str:
+        name = agent["name"]
+        entry = state.get(name)
+        if entry and entry.get("spec") == agent["spec"] and entry.get("complete"):
+            report(True, name, "complete", "unchanged, skipped")
+            return DONE
+        if not entry or entry.get("spec") != agent["spec"]:
+            # New or changed agent: run every step again (in its old worktree,
+            # if it still has one)
+            entry = {"spec": agent["spec"], "agent_id": (entry or {}).get("agent_id"), "keys": {}}
+            state[name] = entry
+        
+        agent_id = entry.get("agent_id")
+        if not agent_id or not get_worktree_path(root, agent_id).exists():
+            async with slots:
+                try:
+                    worktree = await api.start(agent["base"], root=root)
+                except api.AgtError as e:
+                    report(False, name, f"new from {agent['base']}", str(e))
+                    return FAILED
+            agent_id = worktree.agent_id
+            entry.update(agent_id=agent_id, keys={})
+            _save_state(state_path, state)
+            report(True, name, f"new from {agent['base']}", agent_id)
+        worktree_path = get_worktree_path(root, agent_id)
+        
+        for index, step in enumerate(agent["steps"]):
+            label = step["kind"] + (f": {step['arg']}" if step["kind"] in ("run", "save") else "")
+            slot = str(index)
+            step_retries = step["retries"] if step["retries"] is not None else retries
+            attempts = 1 + (step_retries if step_retries is not None else plan["retries"])
+            async with slots:
+                if step["kind"] != "clean":
+                    key = await _step_key(step, worktree_path)
+                    if key is not None and entry["keys"].get(slot) == key:
+                        report(True, name, label, "unchanged, skipped")
+                        continue
+                    if step["kind"] == "save" and await _is_clean(worktree_path):
+                        report(True, name, label, "nothing to commit, skipped")
+                        continue
+                for attempt in range(attempts):
+                    started = time.time()
+                    try:
+                        await _execute(step, name, agent_id, root)
+                        break
+                    except api.AgtError as e:
+                        if attempt + 1 == attempts:
+                            report(False, name, label, str(e))
+                            _save_state(state_path, state)
+                            return FAILED
+                        report(False, name, label, f"{e}; retrying ({attempt + 1}/{attempts - 1})")
+                    # Back off without holding a slot other agents could use
+                    slots.release()
+                    try:
+                        await asyncio.sleep(retry_delay * (2 ** attempt))
+                    finally:
+                        await slots.acquire()
+                report(True, name, label, f"{time.time() - started:.1f}s")
+                if step["kind"] != "clean":
+                    # Store the inputs as they are after the step: unchanged on
+                    # the next run means there is nothing new for it to do
+                    key = await _step_key(step, worktree_path)
+                    if key is not None:
+                        entry["keys"][slot] = key
+                    _save_state(state_path, state)
+        
+        entry["complete"] = True
+        _save_state(state_path, state)
+        return DONE
+    
+    await asyncio.gather(*(run_agent(agent) for agent in plan["agents"]))
+    return {agent["name"]: outcomes[agent["name"]] for agent in plan["agents"]}
@@ -0,0 +1,290 @@
+"""
+Index-only commits through git plumbing (`agt ws save --from-stdin`).
+
+Agents that produce their output in memory hand it over as JSON/NDJSON
+entries or as a unified diff instead of writing every file and having
+`git add -A` scan the worktree:
+
+    {"path": "src/a.py", "content": "..."}                  # text
+    {"path": "img.png", "content": "iVBO...", "encoding": "base64"}
+    {"path": "run.sh", "content": "...", "executable": true}
+    {"path": "old.txt", "content": null}                    # delete
+
+A JSON document may also be a single {path: content} object. All blobs are
+written by one `git fast-import`, the index is updated with one
+`git update-index --index-info`, and the commit is made with write-tree,
+commit-tree and update-ref. Diffs go through `git apply --cached`. Both
+work on a scratch copy of the index that replaces the real one only once
+the branch has moved, so a failure leaves nothing staged. The committed
+paths are then checked out, unless checkout=False leaves the
+working tree untouched (its files then show up as unstaged changes).
+"""
+
+import base64
+import json
+import os
+import posixpath
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+FORMATS = ("json", "ndjson", "diff")
+
+MODE_FILE = "100644"
+MODE_EXECUTABLE = "100755"
+
+
+def _git(args: list[str], cwd: Path, input: Optional[bytes] = None, index: Optional[Path] = None) -> bytes:
+    env = None if index is None else dict(os.environ, GIT_INDEX_FILE=str(index))
+    result = subprocess.run(["git", *args], cwd=cwd, input=input, capture_output=True, env=env)
+    if result.returncode:
+        # Text stderr, for format_git_error
+        raise subprocess.CalledProcessError(
+            result.returncode, result.args, result.stdout, result.stderr.decode(errors="replace")
+        )
+    return result.stdout
+
+
+def detect_format(data: bytes) -> str:
+    """Guess the format of stdin data: diff, json (one document) or ndjson."""
+    head = data.lstrip()
+    if head.startswith((b"diff --git ", b"--- ", b"Index: ")):
+        return "diff"
+    if head.startswith((b"{", b"[")):
+        try:
+            json.loads(data)
+            return "json"
+        except ValueError:
+            pass
+    return "ndjson"
+
+
+def _normalize_path(path) -> str:
+    """Validate a repository-relative path and return it in normalized form."""
+    if not isinstance(path, str) or not path:
+        raise ValueError(f"invalid path: {path!r}")
+    normalized = posixpath.normpath(path)
+    parts = normalized.split("/")
+    if normalized.startswith("/") or ".." in parts or parts[0] in (".", ".git") or "\0" in normalized:
+        raise ValueError(f"path must stay inside the worktree: {path}")
+    return normalized
+
+
+def _normalize_entry(raw) -> dict:
+    """Turn an input entry into {path, data (None to delete), mode}."""
+    if not isinstance(raw, dict) or "path" not in raw:
+        raise ValueError(f"entry needs a path: {raw!r}")
+    content = raw.get("content")
+    if raw.get("delete"):
+        content = None
+    if content is None:
+        data = None
+    elif not isinstance(content, str):
+        raise ValueError(f"{raw['path']}: content must be a string or null")
+    elif raw.get("encoding", "utf-8") == "base64":
+        data = base64.b64decode(content, validate=True)
+    else:
+        data = content.encode(raw.get("encoding", "utf-8"), errors="surrogateescape")
+    # None keeps the mode of an existing file
+    mode = None if "executable" not in raw else MODE_EXECUTABLE if raw["executable"] else MODE_FILE
+    return {"path": _normalize_path(raw["path"]), "data": data, "mode": mode}
+
+
+def parse_entries(data: bytes, fmt: str) -> list[dict]:
+    """
+    Parse JSON or NDJSON path -> content entries (see module docstring).
+    
+    Later entries for the same path win.
+    
+    Raises:
+        ValueError: on malformed input or paths outside the worktree
+    
+    Returns:
+        [{"path", "data": bytes or None (delete), "mode" or None}], one per path
+    """
+    if fmt == "json":
+        document = json.loads(data)
+        if isinstance(document, dict) and "path" not in document:
+            raw_entries = [{"path": path, "content": content} for path, content in document.items()]
+        elif isinstance(document, dict):
+            raw_entries = [document]
+        elif isinstance(document, list):
+            raw_entries = document
+        else:
+            raise ValueError("JSON input must be an object or a list of entries")
+    elif fmt == "ndjson":
+        raw_entries = [json.loads(line) for line in data.splitlines() if line.strip()]
+    else:
+        raise ValueError(f"unknown format: {fmt} (available: {', '.join(FORMATS)})")
+    
+    entries = {}
+    for raw in raw_entries:
+        entry = _normalize_entry(raw)
+        entries[entry["path"]] = entry
+    return list(entries.values())
+
+
+def write_blobs(worktree_path: Path, blobs: list[bytes]) -> list[str]:
+    """
+    Write blobs to the object database with a single `git fast-import`.
+    
+    Returns:
+        Object IDs, in the order of `blobs`
+    """
+    if not blobs:
+        return []
+    stream = bytearray()
+    for mark, blob in enumerate(blobs, 1):
+        stream += b"blob\nmark :%d\ndata %d\n" % (mark, len(blob))
+        stream += blob
+        stream += b"\n"
+    with tempfile.TemporaryDirectory(prefix="agt-fast-import-") as tmp:
+        marks_path = Path(tmp) / "marks"
+        _git(["fast-import", "--quiet", f"--export-marks={marks_path}"], worktree_path, input=bytes(stream))
+        marks = dict(line.split(" ", 1) for line in marks_path.read_text().splitlines())
+    return [marks[f":{mark}"] for mark in range(1, len(blobs) + 1)]
+
+
+def _index_modes(worktree_path: Path, paths: list[str]) -> dict[str, str]:
+    """Modes of the given paths in the index (paths not in it are left out)."""
+    modes = {}
+    # Chunked to stay below the argument length limit
+    for start in range(0, len(paths), 1000):
+        chunk = [f":(literal){p}" for p in paths[start:start + 1000]]
+        output = _git(["ls-files", "-s", "-z", "--", *chunk], worktree_path).decode(errors="surrogateescape")
+        for record in filter(None, output.split("\0")):
+            info, path = record.split("\t", 1)
+            modes[path] = info.split(" ", 1)[0]
+    return modes
+
+
+def _check_index_clean(worktree_path: Path) -> None:
+    """Refuse to commit over changes that are already staged."""
+    result = subprocess.run(["git", "diff-index", "--cached", "--quiet", "HEAD", "--"], cwd=worktree_path)
+    if result.returncode == 1:
+        raise ValueError("the index has staged changes; commit or unstage them first")
+    if result.returncode:
+        raise subprocess.CalledProcessError(result.returncode, result.args)
+
+
+@contextmanager
+def _scratch_index(worktree_path: Path) -> Iterator[Path]:
+    """
+    A copy of the worktree's index to stage into, removed afterwards unless
+    _commit_index moved it over the real index.
+    """
+    real_index = worktree_path / _git(["rev-parse", "--git-path", "index"], worktree_path).decode().strip()
+    scratch = real_index.with_name(f"index.agt-{os.getpid()}")
+    shutil.copyfile(real_index, scratch)
+    try:
+        yield scratch
+    finally:
+        scratch.unlink(missing_ok=True)
+
+
+def _commit_index(worktree_path: Path, index: Path, message: str, checkout: bool) -> Optional[str]:
+    """
+    Commit the scratch `index` with write-tree / commit-tree / update-ref.
+    
+    The scratch index becomes the worktree's index only once the branch has
+    moved; if anything fails the real index is left as it was.
+    
+    Returns:
+        The new commit, or None if the index matches HEAD
+    """
+    head = _git(["rev-parse", "HEAD"], worktree_path).decode().strip()
+    tree = _git(["write-tree"], worktree_path, index=index).decode().strip()
+    if tree == _git(["rev-parse", "HEAD^{tree}"], worktree_path).decode().strip():
+        return None
+    commit = _git(["commit-tree", tree, "-p", head], worktree_path, input=message.encode()).decode().strip()
+    # Moves the checked-out branch only if nobody else committed meanwhile
+    subject = message.splitlines()[0] if message else ""
+    _git(["update-ref", "-m", f"agt ws save: {subject}", "HEAD", commit, head], worktree_path)
+    os.replace(index, index.with_name("index"))
+    
+    if checkout:
+        changes = _git(["diff-tree", "-r", "-z", "--no-renames", "--name-status", head, commit], worktree_path)
+        fields = changes.decode(errors="surrogateescape").split("\0")
+        written = []
+        for status, path in zip(fields[0::2], fields[1::2]):
+            if status == "D":
+                full = worktree_path / path
+                if full.is_file() or full.is_symlink():
+                    full.unlink()
+            else:
+                written.append(path)
+        if written:
+            _git(
+                ["checkout-index", "-f", "-z", "--stdin"],
+                worktree_path,
+                input=b"".join(p.encode(errors="surrogateescape") + b"\0" for p in written),
+            )
+    return commit
+
+
+def commit_entries(worktree_path: Path, entries: list[dict], message: str, checkout: bool = True) -> Optional[str]:
+    """
+    Commit path -> content entries (from parse_entries) without `git add`.
+    
+    Raises:
+        ValueError: if the index already has staged changes
+        subprocess.CalledProcessError: if a git command fails (e.g. the
+        branch moved while committing)
+    
+    Returns:
+        The new commit, or None if the entries change nothing
+    """
+    _check_index_clean(worktree_path)
+    written = [e for e in entries if e["data"] is not None]
+    object_ids = dict(zip((e["path"] for e in written), write_blobs(worktree_path, [e["data"] for e in written])))
+    modes = _index_modes(worktree_path, [e["path"] for e in written if e["mode"] is None])
+    null_id = "0" * len(_git(["rev-parse", "HEAD"], worktree_path).strip())
+    
+    records = []
+    for entry in entries:
+        if entry["data"] is None:
+            records.append(f"0 {null_id}\t{entry['path']}")
+        else:
+            mode = entry["mode"] or modes.get(entry["path"], MODE_FILE)
+            records.append(f"{mode} {object_ids[entry['path']]}\t{entry['path']}")
+    with _scratch_index(worktree_path) as index:
+        _git(
+            ["update-index", "-z", "--index-info"],
+            worktree_path,
+            input=b"".join(r.encode(errors="surrogateescape") + b"\0" for r in records),
+            index=index,
+        )
+        return _commit_index(worktree_path, index, message, checkout)
+
+
+def commit_patch(worktree_path: Path, patch: bytes, message: str, checkout: bool = True) -> Optional[str]:
+    """
+    Commit a unified diff by applying it to the index only (`git apply --cached`).
+    
+    Raises:
+        ValueError: if the index already has staged changes
+        subprocess.CalledProcessError: if the patch does not apply
+    
+    Returns:
+        The new commit, or None if the patch changes nothing
+    """
+    _check_index_clean(worktree_path)
+    with _scratch_index(worktree_path) as index:
+        _git(["apply", "--cached", "--whitespace=nowarn", "-"], worktree_path, input=patch, index=index)
+        return _commit_index(worktree_path, index, message, checkout)
+
+
+def commit_stdin(worktree_path: Path, data: bytes, message: str, fmt: Optional[str] = None, checkout: bool = True) -> Optional[str]:
+    """
+    Commit stdin data in any of FORMATS (detected when `fmt` is None).
+    
+    Returns:
+        The new commit, or None if nothing changed
+    """
+    fmt = fmt or detect_format(data)
+    if fmt == "diff":
+        return commit_patch(worktree_path, data, message, checkout)
+    return commit_entries(worktree_path, parse_entries(data, fmt), message, checkout)
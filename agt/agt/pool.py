@@ -0,0 +1,201 @@
+"""Warm pool of pre-checked-out worktrees that `agt ws new` can claim instantly."""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from agt import registry
+from agt.lock import file_lock
+from agt.worktree import (
+    configure_fast_index,
+    fast_index_enabled,
+    generate_agent_id,
+    get_work_dir,
+    repair_worktree,
+)
+
+POOL_DIR_NAME = ".pool"
+POOL_CONFIG_NAME = "pool.json"
+
+
+def get_pool_dir(root: Path) -> Path:
+    """Get the pool directory path (.work/.pool)."""
+    return get_work_dir(root) / POOL_DIR_NAME
+
+
+def _base_dir(root: Path, base_branch: str) -> Path:
+    """Get the pool directory for one base branch (slashes are flattened)."""
+    return get_pool_dir(root) / base_branch.replace("/", "__")
+
+
+def get_pool_sizes(root: Path) -> dict[str, int]:
+    """Return the configured target pool size per base branch."""
+    config_path = get_pool_dir(root) / POOL_CONFIG_NAME
+    try:
+        return json.loads(config_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def set_pool_size(root: Path, base_branch: str, size: int) -> None:
+    """Set the target pool size for a base branch (0 disables the pool)."""
+    pool_dir = get_pool_dir(root)
+    with file_lock(pool_dir / f"{POOL_CONFIG_NAME}.lock"):
+        sizes = get_pool_sizes(root)
+        if size > 0:
+            sizes[base_branch] = size
+        else:
+            sizes.pop(base_branch, None)
+        tmp_path = pool_dir / f"{POOL_CONFIG_NAME}.{os.getpid()}.tmp"
+        tmp_path.write_text(json.dumps(sizes, indent=2), encoding="utf-8")
+        os.replace(tmp_path, pool_dir / POOL_CONFIG_NAME)
+
+
+def list_pooled(root: Path, base_branch: str) -> list[Path]:
+    """List idle, fully checked-out pool worktrees for a base branch."""
+    base_dir = _base_dir(root, base_branch)
+    if not base_dir.exists():
+        return []
+    return sorted(p for p in base_dir.iterdir() if p.name.startswith("pool-"))
+
+
+def fill_pool(root: Path, base_branch: str, size: Optional[int] = None) -> int:
+    """
+    Create pool worktrees until the pool for base_branch reaches its target size.
+    
+    Only one filler runs per base branch; if another process is already
+    filling, this returns immediately.
+    
+    Returns:
+        Number of worktrees created
+    """
+    target = size if size is not None else get_pool_sizes(root).get(base_branch, 0)
+    base_dir = _base_dir(root, base_branch)
+    created = 0
+    
+    with file_lock(get_pool_dir(root) / f"{base_dir.name}.lock", blocking=False) as locked:
+        if not locked:
+            return 0
+        base_dir.mkdir(parents=True, exist_ok=True)
+        fast_index = fast_index_enabled(root)
+        while len(list_pooled(root, base_branch)) < target:
+            # Check out under a name claimers ignore, then publish atomically
+            name = uuid.uuid4().hex[:8]
+            building_path = base_dir / f"building-{name}"
+            subprocess.run(
+                ["git", "worktree", "add", "--detach", str(building_path), base_branch],
+                check=True,
+                capture_output=True,
+                cwd=root,
+            )
+            if fast_index:
+                configure_fast_index(root, building_path)
+            ready_path = base_dir / f"pool-{name}"
+            os.rename(building_path, ready_path)
+            repair_worktree(root, ready_path)
+            created += 1
+    
+    return created
+
+
+def claim_worktree(
+    root: Path,
+    base_branch: str = "main",
+    owner_pid: Optional[int] = None,
+) -> Optional[tuple[str, Path, str]]:
+    """
+    Claim an idle pool worktree as a new agent worktree.
+    
+    The pool entry is renamed into .work/ (atomic, so concurrent claimers
+    never get the same entry) and switched to a fresh feat/<agent-id> branch
+    at the current tip of base_branch. An entry that cannot be switched is
+    discarded. `owner_pid` is recorded as in add_worktree.
+    
+    Returns:
+        (agent_id, worktree_path, branch_name), or None if the pool is empty
+        or the claimed entry was unusable (the caller then creates the
+        worktree normally)
+    """
+    for pooled_path in list_pooled(root, base_branch):
+        agent_id = generate_agent_id()
+        worktree_path = get_work_dir(root) / agent_id
+        try:
+            os.rename(pooled_path, worktree_path)
+        except OSError:
+            # Another process claimed it first
+            continue
+        
+        branch_name = f"feat/{agent_id}"
+        stamp = registry.begin_change(root)
+        try:
+            repair_worktree(root, worktree_path)
+            subprocess.run(
+                ["git", "switch", "--quiet", "-c", branch_name, base_branch],
+                check=True,
+                capture_output=True,
+                cwd=worktree_path,
+            )
+        except subprocess.CalledProcessError:
+            _discard(root, worktree_path)
+            return None
+        registry.register_worktree(
+            root,
+            agent_id,
+            worktree_path,
+            branch_name,
+            base_commit=registry.read_branch_commit(root, branch_name),
+            stamp_before=stamp,
+            owner_pid=owner_pid,
+        )
+        return agent_id, worktree_path, branch_name
+    
+    return None
+
+
+def _discard(root: Path, worktree_path: Path) -> None:
+    """Remove a claimed worktree that could not be switched, and its git metadata."""
+    subprocess.run(
+        ["git", "worktree", "remove", "--force", str(worktree_path)],
+        capture_output=True,
+        cwd=root,
+    )
+    shutil.rmtree(worktree_path, ignore_errors=True)
+    subprocess.run(["git", "worktree", "prune"], capture_output=True, cwd=root)
+
+
+def refill_in_background(root: Path, base_branch: str) -> None:
+    """Start a detached `agt ws pool fill` so claiming never waits on checkout."""
+    if get_pool_sizes(root).get(base_branch, 0) <= 0:
+        return
+    subprocess.Popen(
+        [sys.executable, "-m", "agt", "ws", "pool", "fill", base_branch],
+        cwd=root,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def drain_pool(root: Path, base_branch: str) -> int:
+    """
+    Remove all idle pool worktrees for a base branch.
+    
+    Returns:
+        Number of worktrees removed
+    """
+    removed = 0
+    for pooled_path in list_pooled(root, base_branch):
+        subprocess.run(
+            ["git", "worktree", "remove", "--force", str(pooled_path)],
+            check=True,
+            capture_output=True,
+            cwd=root,
+        )
+        removed += 1
+    return removed
@@ -0,0 +1,91 @@
+"""
+Batched push of many agent branches (`agt ws push --all`).
+
+Instead of one `git push -u <remote> HEAD` per worktree - a connection, a
+ref negotiation and a pack per agent - every selected branch goes to the
+remote in a single `git push --porcelain -u` from the main repository with
+one refspec per branch. The pack is computed once over the shared history,
+upstreams are set for all pushed branches in the same run, and the
+porcelain output gives a result per ref.
+"""
+
+import subprocess
+from pathlib import Path
+
+# Refspecs per `git push` invocation (keeps the command line short enough)
+MAX_REFSPECS = 1000
+
+# `git push --porcelain` flags (see git-push(1), OUTPUT)
+FLAG_SUMMARY = {
+    " ": "fast-forward",
+    "+": "forced update",
+    "-": "deleted",
+    "*": "new branch",
+    "!": "rejected",
+    "=": "up to date",
+}
+
+
+def agent_branch(root: Path, agent_id: str) -> str:
+    """The branch of an agent worktree (from the registry, else feat/<agent_id>)."""
+    from agt import registry
+    
+    entry = registry.get_entry(root, agent_id)
+    return entry["branch"] if entry else f"feat/{agent_id}"
+
+
+def parse_porcelain(output: str) -> dict[str, tuple[str, str]]:
+    """
+    Parse `git push --porcelain` output.
+    
+    Returns:
+        {destination ref: (flag, summary)}
+    """
+    results = {}
+    for line in output.splitlines():
+        parts = line.split("\t")
+        if len(parts) != 3 or len(parts[0]) != 1:
+            continue  # "To <url>", "Done" and other chatter
+        flag, refs, summary = parts
+        results[refs.rsplit(":", 1)[-1]] = (flag, summary)
+    return results
+
+
+def push_branches(root: Path, agent_ids: list[str], remote: str = "origin") -> list[dict]:
+    """
+    Push the branches of several agents to a remote in one `git push`.
+    
+    Upstreams (branch.<name>.remote/merge) are set for every branch that was
+    pushed. A rejected ref doesn't stop the others.
+    
+    Returns:
+        One {"agent_id", "branch", "ok", "flag", "summary"} per agent, in
+        the order given
+    """
+    from agt.registry import read_branch_commit
+    
+    branches = {agent_id: agent_branch(root, agent_id) for agent_id in dict.fromkeys(agent_ids)}
+    # One unknown source ref would make git push refuse the whole batch
+    missing = {b for b in branches.values() if read_branch_commit(root, b) is None}
+    refspecs = [f"refs/heads/{b}:refs/heads/{b}" for b in branches.values() if b not in missing]
+    
+    results: dict[str, tuple[str, str]] = {b: ("!", "no such local branch") for b in missing}
+    errors = []
+    for start in range(0, len(refspecs), MAX_REFSPECS):
+        proc = subprocess.run(
+            ["git", "push", "--porcelain", "-u", remote, *refspecs[start:start + MAX_REFSPECS]],
+            capture_output=True,
+            text=True,
+            cwd=root,
+        )
+        results.update((ref.removeprefix("refs/heads/"), result) for ref, result in parse_porcelain(proc.stdout).items())
+        if proc.returncode and proc.stderr.strip():
+            errors.append(proc.stderr.strip().splitlines()[-1])
+    
+    report = []
+    for agent_id, branch in branches.items():
+        # Refs missing from the output failed before the push (e.g. unknown remote)
+        flag, summary = results.get(branch, ("!", errors[-1] if errors else "not pushed"))
+        summary = summary.strip() or FLAG_SUMMARY.get(flag, "")
+        report.append({"agent_id": agent_id, "branch": branch, "ok": flag != "!", "flag": flag, "summary": summary})
+    return report
@@ -0,0 +1,284 @@
+"""Persistent registry of agent worktrees (.work/registry.db).
+
+The registry replaces directory scans of .work/ with indexed lookups. It is a
+SQLite database in WAL mode, so many agt processes can read and write it
+concurrently. It is kept in sync transactionally by add_worktree and
+remove_worktree, and reconciled lazily against `git worktree list
+--porcelain` whenever git's own worktree metadata changed behind its back.
+"""
+
+import os
+import sqlite3
+import subprocess
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from agt.worktree import get_git_common_dir, get_work_dir
+
+REGISTRY_NAME = "registry.db"
+
+# Lifecycle states
+CREATING = "creating"
+ACTIVE = "active"
+REMOVING = "removing"
+
+# Rows stuck in "creating" longer than this belong to a crashed process.
+STALE_CREATING_SECONDS = 300
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS worktrees (
+    agent_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    base_commit TEXT,
+    created_at REAL NOT NULL,
+    owner_pid INTEGER,
+    state TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS worktrees_state ON worktrees (state);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def get_registry_path(root: Path) -> Path:
+    """Get the registry database path (.work/registry.db)."""
+    return get_work_dir(root) / REGISTRY_NAME
+
+
+def get_owner_pid() -> int:
+    """
+    PID of the process that owns new worktrees.
+    
+    agt itself exits right away, so the owner is its parent (the agent or
+    orchestrator), unless AGT_OWNER_PID names a different process (agtd
+    sets it to the parent of the forwarding client).
+    """
+    return int(os.environ.get("AGT_OWNER_PID") or os.getppid())
+
+
+def _worktrees_mtime(root: Path) -> str:
+    """Change stamp of git's worktree metadata dir (.git/worktrees)."""
+    try:
+        return str(os.stat(get_git_common_dir(root) / "worktrees").st_mtime_ns)
+    except FileNotFoundError:
+        return "0"
+
+
+@contextmanager
+def connect(root: Path) -> Iterator[sqlite3.Connection]:
+    """Open the registry, creating it if needed. Commits on success."""
+    path = get_registry_path(root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _get_meta(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else None
+
+
+def _set_meta(conn: sqlite3.Connection, key: str, value: str) -> None:
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def begin_change(root: Path) -> str:
+    """
+    Capture git's worktree change stamp before agt modifies worktrees.
+    
+    Pass the result to register_worktree/unregister_worktree so that agt's own
+    changes don't force a reconcile on the next lookup.
+    """
+    return _worktrees_mtime(root)
+
+
+def _note_own_change(conn: sqlite3.Connection, root: Path, stamp_before: Optional[str]) -> None:
+    """Advance the stored change stamp if nothing else changed since stamp_before."""
+    if stamp_before is not None and _get_meta(conn, "worktrees_mtime") == stamp_before:
+        _set_meta(conn, "worktrees_mtime", _worktrees_mtime(root))
+
+
+def register_worktree(
+    root: Path,
+    agent_id: str,
+    path: Path,
+    branch: str,
+    base_commit: Optional[str] = None,
+    state: str = ACTIVE,
+    stamp_before: Optional[str] = None,
+    owner_pid: Optional[int] = None,
+) -> None:
+    """Insert or update a worktree entry (a new one is owned by `owner_pid`, default get_owner_pid())."""
+    with connect(root) as conn:
+        existing = conn.execute(
+            "SELECT created_at, owner_pid, base_commit FROM worktrees WHERE agent_id = ?",
+            (agent_id,),
+        ).fetchone()
+        created_at = existing["created_at"] if existing else time.time()
+        owner_pid = existing["owner_pid"] if existing else owner_pid or get_owner_pid()
+        base_commit = base_commit or (existing["base_commit"] if existing else None)
+        conn.execute(
+            "INSERT OR REPLACE INTO worktrees"
+            " (agent_id, path, branch, base_commit, created_at, owner_pid, state)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (agent_id, str(path), branch, base_commit, created_at, owner_pid, state),
+        )
+        _note_own_change(conn, root, stamp_before)
+
+
+def set_state(root: Path, agent_id: str, state: str) -> None:
+    """Change the lifecycle state of a worktree entry."""
+    with connect(root) as conn:
+        conn.execute("UPDATE worktrees SET state = ? WHERE agent_id = ?", (state, agent_id))
+
+
+def unregister_worktree(root: Path, agent_id: str, stamp_before: Optional[str] = None) -> None:
+    """Delete a worktree entry."""
+    with connect(root) as conn:
+        conn.execute("DELETE FROM worktrees WHERE agent_id = ?", (agent_id,))
+        _note_own_change(conn, root, stamp_before)
+
+
+def get_entry(root: Path, agent_id: str) -> Optional[dict]:
+    """Look up one worktree entry by agent ID (checking only its own directory on disk)."""
+    with connect(root) as conn:
+        _reconcile_if_stale(conn, root)
+        row = conn.execute("SELECT * FROM worktrees WHERE agent_id = ?", (agent_id,)).fetchone()
+        if row and _missing([row]):
+            _reconcile(conn, root)
+            row = conn.execute("SELECT * FROM worktrees WHERE agent_id = ?", (agent_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def list_entries(root: Path, state: Optional[str] = ACTIVE, verify: bool = False) -> list[dict]:
+    """
+    List worktree entries (all states if state is None), sorted by agent ID.
+    
+    With `verify`, every active entry's directory is also checked on disk (one
+    stat per row), so worktrees deleted by hand drop out before `git worktree
+    prune` runs. Plain lookups skip that scan.
+    """
+    def query(conn: sqlite3.Connection) -> list[sqlite3.Row]:
+        if state is None:
+            return conn.execute("SELECT * FROM worktrees ORDER BY agent_id").fetchall()
+        return conn.execute(
+            "SELECT * FROM worktrees WHERE state = ? ORDER BY agent_id", (state,)
+        ).fetchall()
+    
+    with connect(root) as conn:
+        _reconcile_if_stale(conn, root)
+        rows = query(conn)
+        if verify and _missing(rows):
+            _reconcile(conn, root)
+            rows = query(conn)
+    return [dict(row) for row in rows]
+
+
+def _missing(rows: list[sqlite3.Row]) -> bool:
+    """
+    Whether any of the given active entries' worktrees is gone from disk.
+    
+    Deleting a worktree directory by hand leaves git's metadata (and so the
+    mtime stamp) untouched until `git worktree prune`, so the stamp alone
+    misses it.
+    """
+    return any(row["state"] == ACTIVE and not Path(row["path"], ".git").exists() for row in rows)
+
+
+def _parse_porcelain(output: str) -> list[dict]:
+    """Parse `git worktree list --porcelain` into dicts of its attributes."""
+    entries = []
+    for block in output.strip().split("\n\n"):
+        entry = {}
+        for line in block.splitlines():
+            key, _, value = line.partition(" ")
+            entry[key] = value
+        if "worktree" in entry:
+            entries.append(entry)
+    return entries
+
+
+def _reconcile_if_stale(conn: sqlite3.Connection, root: Path) -> None:
+    """Reconcile only if git's worktree metadata changed since the last sync."""
+    if _get_meta(conn, "worktrees_mtime") != _worktrees_mtime(root):
+        _reconcile(conn, root)
+
+
+def _reconcile(conn: sqlite3.Connection, root: Path) -> None:
+    """Make the registry match the agent worktrees git knows about."""
+    stamp = _worktrees_mtime(root)
+    result = subprocess.run(
+        ["git", "worktree", "list", "--porcelain"],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=root,
+    )
+    work_dir = get_work_dir(root).resolve()
+    live = {}
+    for entry in _parse_porcelain(result.stdout):
+        path = Path(entry["worktree"]).resolve()
+        if path.parent == work_dir and path.name.startswith("agent-") and "prunable" not in entry:
+            live[path.name] = (path, entry.get("branch", "").removeprefix("refs/heads/"))
+    
+    now = time.time()
+    known = {row["agent_id"]: row for row in conn.execute("SELECT * FROM worktrees")}
+    for agent_id, row in known.items():
+        if agent_id in live:
+            continue
+        if row["state"] == CREATING and now - row["created_at"] < STALE_CREATING_SECONDS:
+            continue  # still being created by another process
+        conn.execute("DELETE FROM worktrees WHERE agent_id = ?", (agent_id,))
+    
+    for agent_id, (path, branch) in live.items():
+        row = known.get(agent_id)
+        if row is None:
+            created_at = path.stat().st_mtime if path.exists() else now
+            conn.execute(
+                "INSERT OR IGNORE INTO worktrees"
+                " (agent_id, path, branch, base_commit, created_at, owner_pid, state)"
+                " VALUES (?, ?, ?, NULL, ?, NULL, ?)",
+                (agent_id, str(path), branch, created_at, ACTIVE),
+            )
+        elif row["state"] == CREATING:
+            conn.execute("UPDATE worktrees SET state = ? WHERE agent_id = ?", (ACTIVE, agent_id))
+    
+    _set_meta(conn, "worktrees_mtime", stamp)
+
+
+def reconcile(root: Path) -> None:
+    """Force a full reconcile of the registry with `git worktree list`."""
+    with connect(root) as conn:
+        _reconcile(conn, root)
+
+
+def read_branch_commit(root: Path, branch: str) -> Optional[str]:
+    """Resolve refs/heads/<branch> without running git (loose ref, then packed-refs)."""
+    common_dir = get_git_common_dir(root)
+    ref = f"refs/heads/{branch}"
+    try:
+        return (common_dir / ref).read_text(encoding="utf-8").strip()
+    except OSError:
+        pass
+    try:
+        with open(common_dir / "packed-refs", encoding="utf-8") as fh:
+            for line in fh:
+                sha, _, name = line.rstrip("\n").partition(" ")
+                if name == ref:
+                    return sha
+    except OSError:
+        pass
+    return None
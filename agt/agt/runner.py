@@ -0,0 +1,282 @@
+"""Run one command in many agent worktrees concurrently, with prefixed output."""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Callable, ContextManager, Optional
+
+if TYPE_CHECKING:
+    from agt.logs import LogSink
+
+# Default number of commands running at once
+DEFAULT_JOBS = os.cpu_count() or 1
+
+
+def exit_status(returncode: int) -> int:
+    """Map a Popen returncode to a shell-style exit status (signal N -> 128 + N)."""
+    return 128 - returncode if returncode < 0 else returncode
+
+
+def _prefixed(prefix: str, data: bytes) -> str:
+    """Decode output for display, prefixing each line and ending the last one."""
+    text = data.decode(errors="replace")
+    if not text.endswith("\n"):
+        text += "\n"
+    return "".join(prefix + line for line in text.splitlines(keepends=True))
+
+
+def _pump(
+    agent_id: str,
+    source: IO[bytes],
+    target: IO[str],
+    lock: threading.Lock,
+    log: Optional["LogSink"] = None,
+    record: Optional[list] = None,
+    stream: int = 1,
+) -> None:
+    """
+    Copy lines from source to target until EOF, prefixing each with the agent ID.
+    
+    The log and record get the raw bytes, as run_captured stores them; only
+    the displayed copy is decoded and prefixed.
+    """
+    prefix = f"[{agent_id}] "
+    for line in source:
+        if log is not None:
+            log.write(line)
+        if record is not None:
+            record.append((stream, line))
+        with lock:
+            target.write(_prefixed(prefix, line))
+            target.flush()
+    source.close()
+
+
+def _tee(
+    source: IO[bytes],
+    target: IO[bytes],
+    log: Optional["LogSink"] = None,
+    record: Optional[list] = None,
+    stream: int = 1,
+) -> None:
+    """Copy raw output from a pipe to target (and the log/record) as it arrives."""
+    while True:
+        data = source.read1(65536)
+        if not data:
+            break
+        if log is not None:
+            log.write(data)
+        if record is not None:
+            record.append((stream, data))
+        target.write(data)
+        target.flush()
+    source.close()
+
+
+def run_passthrough(
+    root: Path,
+    worktree_path: Path,
+    command: str,
+    schedule: Optional[Callable[[], ContextManager]] = None,
+) -> int:
+    """
+    Run a shell command in one worktree on our own stdio, recording its resource usage.
+    
+    Returns:
+        The command's exit status
+    """
+    from agt.metrics import record_run, wait_with_usage
+    
+    with schedule() if schedule else nullcontext() as wrap:
+        started = time.time()
+        proc = subprocess.Popen(wrap(command) if wrap else command, shell=wrap is None, cwd=worktree_path)
+        try:
+            returncode, usage = wait_with_usage(proc)
+        except KeyboardInterrupt:
+            # The child got the same SIGINT; let it finish before exiting
+            proc.wait()
+            raise
+        code = exit_status(returncode)
+    record_run(root, worktree_path.name, command, code, started, time.time() - started, usage)
+    return code
+
+
+def run_captured(
+    root: Path,
+    worktree_path: Path,
+    command: str,
+    log: bool = True,
+    record: Optional[list] = None,
+    schedule: Optional[Callable[[], ContextManager]] = None,
+) -> int:
+    """
+    Run a shell command in one worktree, teeing its output.
+    
+    Output is passed through unchanged (not line-buffered) and the run's
+    resource usage is recorded (see agt.metrics). With `log`, output is
+    also appended to .agt/logs/run.log in the worktree (see agt.logs);
+    with `record`, (stream, data) pairs are appended to that list (stream 1
+    is stdout, 2 is stderr). `schedule` returns a context manager held while
+    the command runs that yields its wrapper (see agt.sched.scheduled).
+    
+    Returns:
+        The command's exit status
+    """
+    from agt.metrics import record_run, wait_with_usage
+    
+    sink = None
+    if log:
+        from agt.logs import open_log
+        
+        sink = open_log(root, worktree_path, command)
+    code = 1
+    try:
+        with schedule() if schedule else nullcontext() as wrap:
+            started = time.time()
+            proc = subprocess.Popen(
+                wrap(command) if wrap else command,
+                shell=wrap is None,
+                cwd=worktree_path,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            stderr_tee = threading.Thread(
+                target=_tee, args=(proc.stderr, sys.stderr.buffer, sink, record, 2), daemon=True
+            )
+            stderr_tee.start()
+            _tee(proc.stdout, sys.stdout.buffer, sink, record, 1)
+            stderr_tee.join()
+            returncode, usage = wait_with_usage(proc)
+            code = exit_status(returncode)
+        record_run(root, worktree_path.name, command, code, started, time.time() - started, usage)
+        return code
+    except KeyboardInterrupt:
+        code = 130
+        raise
+    finally:
+        if sink is not None:
+            from agt.logs import close_log
+            
+            close_log(sink, code)
+
+
+def run_in_worktrees(
+    targets: list[tuple[str, Path]],
+    command: str,
+    jobs: Optional[int] = None,
+    root: Optional[Path] = None,
+    log: bool = False,
+    cache: bool = False,
+    schedule: Optional[Callable[[], ContextManager]] = None,
+) -> list[tuple[str, int, float]]:
+    """
+    Run a shell command in each (agent_id, worktree_path) target concurrently.
+    
+    At most `jobs` commands run at once. Their stdout and stderr are streamed
+    line by line to ours, each line prefixed with "[agent-id] ". A failing
+    command does not stop the others. If `root` is given, each run's
+    resource usage is recorded (see agt.metrics). With `log`, each agent's
+    output is also appended to its own log (see agt.logs); with `cache`,
+    results are looked up in and stored to the run cache (see agt.cache).
+    Both need `root`. `schedule` is entered around each command, as in run_captured.
+    
+    Returns:
+        list of (agent_id, exit_status, seconds) tuples in input order
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    from agt.metrics import record_run, wait_with_usage
+    
+    if log:
+        from agt.logs import close_log, open_log
+    if cache:
+        from agt import cache as run_cache
+    
+    output_lock = threading.Lock()
+    running: dict[str, subprocess.Popen] = {}
+    running_lock = threading.Lock()
+    
+    def replay(agent_id: str, records: list[tuple[int, bytes]], sink: Optional["LogSink"]) -> None:
+        # Records stored by run_captured are arbitrary chunks: join each run
+        # of one stream so lines split across chunks get a single prefix
+        merged: list[tuple[int, bytes]] = []
+        for stream, data in records:
+            if sink is not None:
+                sink.write(data)
+            if merged and merged[-1][0] == stream:
+                merged[-1] = (stream, merged[-1][1] + data)
+            else:
+                merged.append((stream, data))
+        for stream, data in merged:
+            target = sys.stdout if stream == run_cache.STDOUT else sys.stderr
+            with output_lock:
+                target.write(_prefixed(f"[{agent_id}] ", data))
+                target.flush()
+    
+    def run_one(agent_id: str, worktree_path: Path) -> tuple[str, int, float]:
+        started = time.time()
+        sink = open_log(root, worktree_path, command) if log else None
+        key = run_cache.cache_key(worktree_path, command) if cache else None
+        hit = run_cache.lookup(root, key) if key else None
+        if hit is not None:
+            records, code = hit
+            replay(agent_id, records, sink)
+            if sink is not None:
+                close_log(sink, code)
+            wall = time.time() - started
+            if root is not None:
+                record_run(root, agent_id, command, code, started, wall, cached=True)
+            return agent_id, code, wall
+        
+        record = [] if key else None
+        with schedule() if schedule else nullcontext() as wrap:
+            started = time.time()
+            proc = subprocess.Popen(
+                wrap(command) if wrap else command,
+                shell=wrap is None,
+                cwd=worktree_path,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            with running_lock:
+                running[agent_id] = proc
+            stderr_pump = threading.Thread(
+                target=_pump, args=(agent_id, proc.stderr, sys.stderr, output_lock, sink, record, 2), daemon=True
+            )
+            stderr_pump.start()
+            _pump(agent_id, proc.stdout, sys.stdout, output_lock, sink, record, 1)
+            stderr_pump.join()
+            returncode, usage = wait_with_usage(proc)
+            code = exit_status(returncode)
+            wall = time.time() - started
+            with running_lock:
+                running.pop(agent_id, None)
+        if sink is not None:
+            close_log(sink, code)
+        if key:
+            run_cache.store(root, key, record, code)
+        if root is not None:
+            record_run(root, agent_id, command, code, started, wall, usage)
+        return agent_id, code, wall
+    
+    workers = max(1, min(jobs or DEFAULT_JOBS, len(targets)))
+    pool = ThreadPoolExecutor(max_workers=workers)
+    futures = []
+    try:
+        futures = [pool.submit(run_one, agent_id, path) for agent_id, path in targets]
+        return [future.result() for future in futures]
+    except KeyboardInterrupt:
+        # Stop queued commands from starting and terminate the running ones
+        for future in futures:
+            future.cancel()
+        with running_lock:
+            for proc in running.values():
+                proc.terminate()
+        raise
+    finally:
+        pool.shutdown(wait=True)
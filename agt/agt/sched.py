@@ -0,0 +1,236 @@
+"""Machine-wide CPU slot scheduler and per-child resource limits for `ws run`.
+
+Every agt process of a user shares one directory of slot lock files
+(AGT_SCHED_DIR, default <tmp>/agt-sched-<uid>, which must be private to
+the user). A run with weight N holds N
+slot locks for as long as its command runs, so at most AGT_SLOTS (default:
+the CPU count) weighted commands run at once across all repositories and
+agents. Locks are released by the kernel when a process dies, so a crashed
+run never leaks its slots.
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from agt.lock import _try_lock, _unlock, private_dir
+
+# Retry interval while waiting for slots (grows up to the maximum)
+WAIT_INITIAL = 0.02
+WAIT_MAX = 0.5
+
+# Never follow a symlink planted in place of a slot lock
+_NOFOLLOW = getattr(os, "O_NOFOLLOW", 0)
+
+_SIZE_SUFFIXES = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def get_sched_dir() -> Path:
+    """
+    Directory of the machine-wide slot lock files, created if needed.
+    
+    Raises:
+        PermissionError: if the default directory exists but is not private
+            to the current user (see agt.lock.private_dir)
+    """
+    configured = os.environ.get("AGT_SCHED_DIR")
+    if configured:
+        path = Path(configured)
+        path.mkdir(mode=0o700, parents=True, exist_ok=True)
+        return path
+    import tempfile
+    
+    if not hasattr(os, "getuid"):  # pragma: no cover - Windows
+        path = Path(tempfile.gettempdir()) / "agt-sched-user"
+        path.mkdir(exist_ok=True)
+        return path
+    return private_dir(Path(tempfile.gettempdir()) / f"agt-sched-{os.getuid()}")
+
+
+def get_slot_count() -> int:
+    """Number of CPU slots shared by all agt runs (AGT_SLOTS, default: CPU count)."""
+    configured = os.environ.get("AGT_SLOTS")
+    if configured:
+        return max(1, int(configured))
+    return os.cpu_count() or 1
+
+
+def is_enabled() -> bool:
+    """Whether runs are scheduled by default (AGT_SLOTS is set)."""
+    return bool(os.environ.get("AGT_SLOTS"))
+
+
+def parse_size(value: str) -> int:
+    """Parse a byte size such as 512M or 4G (binary units)."""
+    value = value.strip().upper().removesuffix("B")
+    multiplier = _SIZE_SUFFIXES.get(value[-1:], 1)
+    number = value[:-1] if value[-1:] in _SIZE_SUFFIXES else value
+    return int(float(number) * multiplier)
+
+
+def _try_acquire(sched_dir: Path, slots: int, weight: int) -> list[tuple[int, int]]:
+    """Take `weight` free slots without blocking; all or nothing. Returns (slot, fd) pairs."""
+    held = []
+    for slot in range(slots):
+        fd = os.open(sched_dir / f"slot-{slot}.lock", os.O_RDWR | os.O_CREAT | _NOFOLLOW, 0o600)
+        if _try_lock(fd):
+            held.append((slot, fd))
+            if len(held) == weight:
+                return held
+        else:
+            os.close(fd)
+    _release(held)
+    return []
+
+
+def _release(held: list[tuple[int, int]]) -> None:
+    for _, fd in held:
+        _unlock(fd)
+        os.close(fd)
+
+
+@contextmanager
+def cpu_slots(weight: int = 1, on_wait: Optional[Callable[[], None]] = None) -> Iterator[list[int]]:
+    """
+    Hold `weight` machine-wide CPU slots for the duration of the block.
+    
+    Blocks until enough slots are free; `on_wait` is called once if it has
+    to wait. A weight above the slot count is capped to it.
+    
+    Yields:
+        The indices of the held slots (used for CPU pinning)
+    """
+    sched_dir = get_sched_dir()
+    slots = get_slot_count()
+    weight = max(1, min(weight, slots))
+    
+    held = _try_acquire(sched_dir, slots, weight)
+    delay = WAIT_INITIAL
+    if not held and on_wait is not None:
+        on_wait()
+    while not held:
+        time.sleep(delay)
+        delay = min(delay * 2, WAIT_MAX)
+        held = _try_acquire(sched_dir, slots, weight)
+    try:
+        yield [slot for slot, _ in held]
+    finally:
+        _release(held)
+
+
+def slot_usage() -> tuple[int, int]:
+    """
+    Count busy slots by probing their locks.
+    
+    Returns:
+        (busy, total)
+    """
+    sched_dir = get_sched_dir()
+    slots = get_slot_count()
+    busy = 0
+    for slot in range(slots):
+        path = sched_dir / f"slot-{slot}.lock"
+        if not path.exists():
+            continue
+        fd = os.open(path, os.O_RDWR | _NOFOLLOW)
+        try:
+            if _try_lock(fd):
+                _unlock(fd)
+            else:
+                busy += 1
+        finally:
+            os.close(fd)
+    return busy, slots
+
+
+def pinned_cpus(slots: list[int]) -> set[int]:
+    """Map held slot indices onto the CPUs this process may run on."""
+    available = sorted(os.sched_getaffinity(0))
+    return {available[slot % len(available)] for slot in slots}
+
+
+# Run with `python -c` in place of the shell: applies the limits to itself,
+# then execs the command, so they are in place before it starts
+_WRAPPER = """\
+import os, sys
+cpus, max_mem, max_files, command = sys.argv[1:]
+if cpus:
+    os.sched_setaffinity(0, {int(cpu) for cpu in cpus.split(",")})
+if max_mem or max_files:
+    import resource
+if max_mem:
+    resource.setrlimit(resource.RLIMIT_AS, (int(max_mem), int(max_mem)))
+if max_files:
+    hard = resource.getrlimit(resource.RLIMIT_NOFILE)[1]
+    limit = int(max_files) if hard == resource.RLIM_INFINITY else min(int(max_files), hard)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (limit, limit))
+os.execv("/bin/sh", ["/bin/sh", "-c", command])
+"""
+
+
+def make_wrapper(
+    cpus: Optional[set[int]] = None,
+    max_mem: Optional[int] = None,
+    max_files: Optional[int] = None,
+) -> Optional[Callable[[str], list[str]]]:
+    """
+    Build a function turning a shell command into an argv that runs it with
+    CPU affinity and rlimits applied.
+    
+    The limits are set by a short-lived interpreter that then execs
+    /bin/sh, rather than by a Popen preexec_fn, which is unsafe in the
+    threads that start concurrent runs.
+    
+    Raises:
+        OSError: if pinning or limits are not supported on this platform
+    
+    Returns:
+        The function, or None if there is nothing to apply (run the command
+        with shell=True as usual)
+    """
+    if cpus is None and max_mem is None and max_files is None:
+        return None
+    if cpus is not None and not hasattr(os, "sched_setaffinity"):
+        raise OSError(f"CPU pinning is not supported on {sys.platform}")
+    if max_mem is not None or max_files is not None:
+        try:
+            import resource  # noqa: F401
+        except ImportError:
+            raise OSError(f"Resource limits are not supported on {sys.platform}") from None
+    settings = [
+        ",".join(str(cpu) for cpu in sorted(cpus)) if cpus is not None else "",
+        str(max_mem) if max_mem is not None else "",
+        str(max_files) if max_files is not None else "",
+    ]
+    
+    def wrap(command: str) -> list[str]:
+        return [sys.executable, "-S", "-c", _WRAPPER, *settings, command]
+    
+    return wrap
+
+
+@contextmanager
+def scheduled(
+    weight: Optional[int] = None,
+    pin: bool = False,
+    max_mem: Optional[int] = None,
+    max_files: Optional[int] = None,
+    on_wait: Optional[Callable[[], None]] = None,
+) -> Iterator[Optional[Callable[[str], list[str]]]]:
+    """
+    Hold CPU slots (if `weight` is set) while one child runs.
+    
+    With `pin`, the child is bound to one CPU per held slot.
+    
+    Yields:
+        The wrapper to start the child's command with (see make_wrapper;
+        None if nothing to apply)
+    """
+    if weight is None:
+        yield make_wrapper(None, max_mem, max_files)
+        return
+    with cpu_slots(weight, on_wait=on_wait) as slots:
+        yield make_wrapper(pinned_cpus(slots) if pin else None, max_mem, max_files)
@@ -0,0 +1,275 @@
+"""
+Durable push spool (`agt ws push --async` / `--wait`).
+
+`push --async` records a job - remote, branch and the commit to publish - in
+.work/.spool/push/jobs/ and returns at once. Jobs are keyed by remote and
+branch, so queueing again before the push happened replaces the job: only
+the latest commit of each branch is pushed. A detached worker (`agt ws push
+--drain`, started on demand; only one runs per repository) pushes due jobs
+with bounded concurrency. Failed pushes are retried with exponential
+backoff; rejected refs (non-fast-forward, remote hooks) and jobs out of
+attempts are given up. Each branch's last outcome is kept in results/,
+which `push --wait` polls.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from agt.lock import file_lock
+from agt.worktree import get_work_dir
+
+SPOOL_DIR_NAME = ".spool"
+
+# Concurrent pushes of one worker
+DEFAULT_JOBS = int(os.environ.get("AGT_PUSH_JOBS") or 4)
+
+# Attempts per job before it is given up
+MAX_ATTEMPTS = int(os.environ.get("AGT_PUSH_MAX_ATTEMPTS") or 8)
+
+# First retry delay (doubles per failed attempt, capped)
+RETRY_DELAY = 2.0
+MAX_RETRY_DELAY = 300.0
+
+# How often an idle worker or a waiter checks the spool
+POLL_INTERVAL = 0.2
+
+
+def get_spool_dir(root: Path) -> Path:
+    """Get the push spool directory (.work/.spool/push)."""
+    return get_work_dir(root) / SPOOL_DIR_NAME / "push"
+
+
+def _key(remote: str, branch: str) -> str:
+    return hashlib.sha1(f"{remote}\0{branch}".encode()).hexdigest()[:16]
+
+
+def _read(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(data, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _jobs_lock(root: Path):
+    """Serializes read-modify-write of job files between enqueuers and the worker."""
+    return file_lock(get_spool_dir(root) / "jobs.lock")
+
+
+def enqueue(root: Path, remote: str, branch: str, commit: str, agent_id: Optional[str] = None) -> dict:
+    """
+    Queue a push of `commit` to `branch` on `remote`, replacing any queued push of that branch.
+    
+    Returns:
+        The job
+    """
+    job = {
+        "remote": remote,
+        "branch": branch,
+        "commit": commit,
+        "agent_id": agent_id,
+        "queued_at": time.time(),
+        "attempts": 0,
+        "next_attempt": 0.0,
+        "last_error": None,
+    }
+    with _jobs_lock(root):
+        _write(get_spool_dir(root) / "jobs" / f"{_key(remote, branch)}.json", job)
+    return job
+
+
+def get_job(root: Path, remote: str, branch: str) -> Optional[dict]:
+    """The queued push of a branch, if any."""
+    return _read(get_spool_dir(root) / "jobs" / f"{_key(remote, branch)}.json")
+
+
+def get_result(root: Path, remote: str, branch: str) -> Optional[dict]:
+    """
+    The outcome of the last finished push of a branch.
+    
+    Returns:
+        {"remote", "branch", "commit", "ok", "error", "finished_at"}, or None
+    """
+    return _read(get_spool_dir(root) / "results" / f"{_key(remote, branch)}.json")
+
+
+def list_jobs(root: Path) -> list[dict]:
+    """All queued pushes, oldest first."""
+    jobs_dir = get_spool_dir(root) / "jobs"
+    if not jobs_dir.exists():
+        return []
+    jobs = [job for job in (_read(p) for p in jobs_dir.glob("*.json")) if job]
+    return sorted(jobs, key=lambda job: job["queued_at"])
+
+
+def _push(root: Path, job: dict) -> tuple[bool, bool, str]:
+    """
+    Push one job's commit.
+    
+    Returns:
+        (ok, permanent failure, message)
+    """
+    from agt.push import parse_porcelain
+    
+    branch, remote = job["branch"], job["remote"]
+    proc = subprocess.run(
+        ["git", "push", "--porcelain", remote, f"{job['commit']}:refs/heads/{branch}"],
+        capture_output=True,
+        text=True,
+        cwd=root,
+    )
+    flag, summary = parse_porcelain(proc.stdout).get(f"refs/heads/{branch}", ("", ""))
+    if proc.returncode == 0 and flag != "!":
+        return True, False, summary
+    if flag == "!":
+        # The remote answered and refused: retrying won't help
+        return False, True, summary
+    lines = proc.stderr.strip().splitlines()
+    return False, False, lines[-1] if lines else f"git push exited with {proc.returncode}"
+
+
+def _set_upstream(root: Path, remote: str, branch: str) -> None:
+    """Set the branch's upstream like `push -u` does, unless it already has one."""
+    current = subprocess.run(["git", "config", "--get", f"branch.{branch}.remote"], capture_output=True, cwd=root)
+    if current.returncode == 0:
+        return
+    subprocess.run(["git", "config", f"branch.{branch}.remote", remote], capture_output=True, cwd=root)
+    subprocess.run(["git", "config", f"branch.{branch}.merge", f"refs/heads/{branch}"], capture_output=True, cwd=root)
+
+
+def _finish(root: Path, job: dict, ok: bool, permanent: bool, message: str) -> None:
+    """Record a push outcome; the job stays queued if it will be retried or was replaced."""
+    spool_dir = get_spool_dir(root)
+    key = _key(job["remote"], job["branch"])
+    attempts = job["attempts"] + 1
+    with _jobs_lock(root):
+        current = _read(spool_dir / "jobs" / f"{key}.json")
+        replaced = current is not None and current["queued_at"] != job["queued_at"]
+        if ok or permanent or attempts >= MAX_ATTEMPTS:
+            result = {
+                "remote": job["remote"],
+                "branch": job["branch"],
+                "commit": job["commit"],
+                "ok": ok,
+                "error": None if ok else message,
+                "finished_at": time.time(),
+            }
+            _write(spool_dir / "results" / f"{key}.json", result)
+            if not replaced:
+                (spool_dir / "jobs" / f"{key}.json").unlink(missing_ok=True)
+        elif not replaced:
+            delay = min(RETRY_DELAY * (2 ** (attempts - 1)), MAX_RETRY_DELAY)
+            _write(
+                spool_dir / "jobs" / f"{key}.json",
+                dict(job, attempts=attempts, next_attempt=time.time() + delay, last_error=message),
+            )
+
+
+def drain(root: Path, jobs: int = DEFAULT_JOBS, wait_retries: bool = True) -> int:
+    """
+    Push queued jobs until the spool is empty (the spool worker).
+    
+    At most `jobs` pushes run at once. With `wait_retries` False, jobs that
+    are backing off are left for a later drain instead of waited for. Only
+    one worker runs per repository; if another holds the worker lock, this
+    returns at once.
+    
+    Returns:
+        Number of pushes attempted
+    """
+    def attempt(job: dict) -> None:
+        ok, permanent, message = _push(root, job)
+        if ok:
+            _set_upstream(root, job["remote"], job["branch"])
+        _finish(root, job, ok, permanent, message)
+    
+    attempted = 0
+    with file_lock(get_spool_dir(root) / "worker.lock", blocking=False) as locked:
+        if not locked:
+            return 0
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            while True:
+                queued = list_jobs(root)
+                now = time.time()
+                due = [job for job in queued if job["next_attempt"] <= now]
+                if not due:
+                    if not queued or not wait_retries:
+                        break
+                    time.sleep(min(POLL_INTERVAL, max(0.0, min(j["next_attempt"] for j in queued) - now)))
+                    continue
+                attempted += len(due)
+                list(executor.map(attempt, due))
+    return attempted
+
+
+def is_worker_running(root: Path) -> bool:
+    """Whether a spool worker currently holds the worker lock."""
+    with file_lock(get_spool_dir(root) / "worker.lock", blocking=False) as locked:
+        return not locked
+
+
+def start_worker(root: Path) -> None:
+    """Start a detached `agt ws push --drain` unless a worker is already running."""
+    if is_worker_running(root):
+        return
+    subprocess.Popen(
+        [sys.executable, "-m", "agt", "ws", "push", "--drain"],
+        cwd=root,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def wait_for(root: Path, remote: str, branch: str, commit: str, timeout: Optional[float] = None) -> dict:
+    """
+    Block until the push of `commit` to `branch` has finished (landed or given up).
+    
+    If a newer commit of the branch replaced it in the spool, that push's
+    outcome counts. Restarts the worker if it stopped while the job is
+    still queued.
+    
+    Raises:
+        LookupError: if no push of `commit` is queued or finished
+        TimeoutError: if `timeout` seconds pass first
+    
+    Returns:
+        The result (see get_result)
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    started_worker = 0.0
+    while True:
+        if get_job(root, remote, branch) is None:
+            # The worker writes the result before it removes the job
+            result = get_result(root, remote, branch)
+            if result is not None and (result["commit"] == commit or _contains(root, result["commit"], commit)):
+                return result
+            raise LookupError(f"no push of {commit[:12]} to {remote} {branch} is queued")
+        # Give a freshly started worker time to take its lock
+        if time.monotonic() - started_worker > 2.0 and not is_worker_running(root):
+            start_worker(root)
+            started_worker = time.monotonic()
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TimeoutError(f"push of {branch} to {remote} is still pending")
+        time.sleep(POLL_INTERVAL)
+
+
+def _contains(root: Path, descendant: str, commit: str) -> bool:
+    """Whether `commit` is an ancestor of (or equal to) `descendant`."""
+    return subprocess.run(
+        ["git", "merge-base", "--is-ancestor", commit, descendant], capture_output=True, cwd=root
+    ).returncode == 0
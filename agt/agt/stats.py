@@ -0,0 +1,65 @@
+"""Run statistics (stats) command handlers."""
+
+from pathlib import Path
+from typing import Optional
+
+from agt.cli import _parse_agent_flag, _parse_value_flag, err, safe_print
+
+
+def stats_dispatch(action: str, args: list[str]) -> None:
+    """Dispatch run statistics commands."""
+    if action in ("agent", "command"):
+        agent_id, args = _parse_agent_flag(args)
+        since, args = _parse_value_flag(args, "--since")
+        cmd_stats(by=action, since=since, agent_id=agent_id)
+    else:
+        err(f"Unknown stats action: {action}. Available: agent, command")
+
+
+def _format_bytes(value: float) -> str:
+    """Format a byte count with a binary unit (e.g. 1.5M)."""
+    for unit in ("B", "K", "M", "G"):
+        if value < 1024:
+            return f"{value:.0f}{unit}" if unit == "B" else f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}T"
+
+
+def cmd_stats(by: str = "agent", since: Optional[str] = None, agent_id: Optional[str] = None) -> None:
+    """
+    Summarize recorded `ws run` metrics by agent or command.
+    
+    `since` limits the window to runs started after a duration ago (30m, 2h,
+    7d) or an ISO date/time; `agent_id` limits it to one agent.
+    """
+    from agt.metrics import aggregate, get_metrics_path, parse_since, read_runs
+    from agt.worktree import get_repo_root
+    
+    root = get_repo_root(Path.cwd())
+    
+    start = None
+    if since:
+        try:
+            start = parse_since(since)
+        except ValueError:
+            err(f"Invalid --since value: {since} (use e.g. 30m, 2h, 7d or an ISO date)")
+    
+    runs = read_runs(root, since=start)
+    if agent_id:
+        runs = [run for run in runs if run.get("agent") == agent_id]
+    if not runs:
+        safe_print(f"No runs recorded in {get_metrics_path(root)}")
+        return
+    
+    safe_print(
+        f"{by.upper():<30} {'RUNS':>5} {'FAIL':>5} {'CACHED':>6} {'P50':>8} {'P90':>8} {'P99':>8} "
+        f"{'CPU':>9} {'MAXRSS':>8} {'READ':>8} {'WRITE':>8}"
+    )
+    for row in aggregate(runs, by=by):
+        name = row["name"] if len(row["name"]) <= 30 else row["name"][:27] + "..."
+        safe_print(
+            f"{name:<30} {row['runs']:>5} {row['failed']:>5} {row['cached']:>6} "
+            f"{row['wall_p50']:>7.2f}s {row['wall_p90']:>7.2f}s {row['wall_p99']:>7.2f}s "
+            f"{row['cpu_total']:>8.2f}s {_format_bytes(row['maxrss_kb'] * 1024):>8} "
+            f"{_format_bytes(row['read_bytes']):>8} {_format_bytes(row['write_bytes']):>8}"
+        )
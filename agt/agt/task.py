@@ -0,0 +1,16 @@
+"""Task management (task) command handlers (preview)."""
+
+import sys
+
+from agt.cli import err, safe_print
+
+
+def task_dispatch(action: str, args: list[str]) -> None:
+    """Dispatch task management commands (preview - not yet implemented)."""
+    available_actions = ["list", "add", "pick", "done"]
+    if action not in available_actions:
+        err(f"Unknown task action: {action}. Available: {', '.join(available_actions)}")
+    
+    safe_print("🟡 Task module is a preview; functionality not yet implemented.", file=sys.stderr)
+    safe_print(f"Command: agt task {action} {' '.join(args) if args else ''}", file=sys.stderr)
+    sys.exit(0)
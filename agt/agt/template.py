@@ -0,0 +1,221 @@
+"""Copy-on-write worktree materialization from per-commit template checkouts."""
+
+import errno
+import os
+import shutil
+import subprocess
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from agt.lock import file_lock
+from agt.worktree import get_work_dir, repair_worktree
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+TEMPLATE_DIR_NAME = ".templates"
+
+# Number of template checkouts (one per base commit) kept around.
+MAX_TEMPLATES = 3
+
+# ioctl(2) request number for FICLONE (_IOW(0x94, 9, int)); not exposed by fcntl
+FICLONE = getattr(fcntl, "FICLONE", 0x40049409)
+
+# errno values meaning "this filesystem can't reflink", not a real failure
+_NO_REFLINK = {errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.ENOSYS, errno.EPERM}
+
+CLONE_MODES = ("auto", "reflink", "hardlink", "copy")
+
+
+def get_template_dir(root: Path) -> Path:
+    """Get the template directory path (.work/.templates)."""
+    return get_work_dir(root) / TEMPLATE_DIR_NAME
+
+
+def resolve_commit(root: Path, rev: str) -> str:
+    """Resolve a branch or revision to a full commit ID."""
+    result = subprocess.run(
+        ["git", "rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}"],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=root,
+    )
+    return result.stdout.strip()
+
+
+def worktree_git_dir(worktree_path: Path) -> Path:
+    """Return the private git dir (.git/worktrees/<name>) of a linked worktree."""
+    content = (worktree_path / ".git").read_text(encoding="utf-8").strip()
+    git_dir = Path(content[len("gitdir: "):])
+    if not git_dir.is_absolute():
+        git_dir = (worktree_path / git_dir).resolve()
+    return git_dir
+
+
+@contextmanager
+def ensure_template(root: Path, commit: str) -> Iterator[Path]:
+    """
+    Hold a clean, detached template checkout of `commit`, creating it if needed.
+    
+    The template's lock is held (shared) for the duration of the block, so
+    it cannot be pruned while a worktree is being cloned from it. Older
+    templates beyond MAX_TEMPLATES are removed, least recently used first.
+    
+    Yields:
+        The template checkout path
+    """
+    template_dir = get_template_dir(root)
+    template_path = template_dir / commit
+    lock_path = template_dir / f"{commit}.lock"
+    
+    while True:
+        with file_lock(lock_path, shared=True):
+            if template_path.exists():
+                os.utime(template_path)
+                _prune_templates(root, keep=template_path)
+                yield template_path
+                return
+        # Building needs the lock exclusively; it is then retaken shared (and
+        # the template rebuilt if it was pruned in between)
+        with file_lock(lock_path):
+            if not template_path.exists():
+                _build_template(root, commit, template_path)
+            os.utime(template_path)
+
+
+def _build_template(root: Path, commit: str, template_path: Path) -> None:
+    """Check out `commit` into `template_path` (under the template's exclusive lock)."""
+    building_path = template_path.with_name(f"building-{commit}")
+    if building_path.exists():
+        # Left behind by a crashed builder
+        subprocess.run(
+            ["git", "worktree", "remove", "--force", str(building_path)],
+            capture_output=True,
+            cwd=root,
+        )
+        shutil.rmtree(building_path, ignore_errors=True)
+    subprocess.run(
+        ["git", "worktree", "add", "--detach", str(building_path), commit],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=root,
+    )
+    os.rename(building_path, template_path)
+    repair_worktree(root, template_path)
+
+
+def _prune_templates(root: Path, keep: Path) -> None:
+    """
+    Remove least recently used templates beyond MAX_TEMPLATES.
+    
+    Templates still being built, or locked by a builder or a clone in
+    progress, are skipped.
+    """
+    template_dir = get_template_dir(root)
+    templates = [
+        p for p in template_dir.iterdir()
+        if p.is_dir() and not p.name.startswith("building-") and len(p.name) >= 40
+    ]
+    templates.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in templates[MAX_TEMPLATES:]:
+        if stale == keep:
+            continue
+        with file_lock(template_dir / f"{stale.name}.lock", blocking=False) as locked:
+            if locked and stale.exists():
+                subprocess.run(
+                    ["git", "worktree", "remove", "--force", str(stale)],
+                    capture_output=True,
+                    cwd=root,
+                )
+
+
+def _reflink(src: str, dst: str) -> None:
+    """Clone src into a new file dst sharing the same extents (btrfs, xfs, ...)."""
+    if fcntl is None:
+        raise OSError(errno.ENOTSUP, "reflink is not supported on this platform")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+
+def clone_tree(src: Path, dst: Path, mode: str = "auto") -> str:
+    """
+    Clone the files of checkout `src` into the existing directory `dst`.
+    
+    The top-level .git entry is skipped. Modes:
+        reflink  - copy-on-write clones; fails if the filesystem can't
+        hardlink - share inodes with src (only safe if nothing edits files in place)
+        copy     - plain copies
+        auto     - reflink, falling back to copy on the first unsupported file
+    
+    File mtimes and permissions are preserved so git's stat check still
+    matches the template's index.
+    
+    Returns:
+        The mode that was actually used
+    """
+    if mode not in CLONE_MODES:
+        raise ValueError(f"Unknown clone mode: {mode}. Available: {', '.join(CLONE_MODES)}")
+    used = "reflink" if mode == "auto" else mode
+    
+    stack = [(str(src), str(dst))]
+    while stack:
+        src_dir, dst_dir = stack.pop()
+        with os.scandir(src_dir) as entries:
+            for entry in entries:
+                if src_dir == str(src) and entry.name == ".git":
+                    continue
+                target = os.path.join(dst_dir, entry.name)
+                if entry.is_symlink():
+                    os.symlink(os.readlink(entry.path), target)
+                elif entry.is_dir():
+                    os.mkdir(target)
+                    stack.append((entry.path, target))
+                elif used == "hardlink":
+                    os.link(entry.path, target)
+                else:
+                    if used == "reflink":
+                        try:
+                            _reflink(entry.path, target)
+                        except OSError as e:
+                            if mode != "auto" or e.errno not in _NO_REFLINK:
+                                raise
+                            used = "copy"
+                    if used == "copy":
+                        shutil.copyfile(entry.path, target)
+                    shutil.copystat(entry.path, target)
+    return used
+
+
+def materialize_from_template(
+    root: Path,
+    worktree_path: Path,
+    commit: str,
+    mode: str = "auto",
+) -> str:
+    """
+    Fill a --no-checkout worktree at `commit` by cloning the template checkout.
+    
+    The template's index is copied over and refreshed once so git treats the
+    result as a clean worktree. That one refresh compares only mtime/size/mode
+    (core.checkStat=minimal, core.trustctime=false, set for the command alone),
+    so it is a stat pass instead of rehashing every cloned file; the
+    worktree's own config is left as it is.
+    
+    Returns:
+        The clone mode that was actually used
+    """
+    with ensure_template(root, commit) as template_path:
+        used = clone_tree(template_path, worktree_path, mode)
+        shutil.copyfile(worktree_git_dir(template_path) / "index", worktree_git_dir(worktree_path) / "index")
+    
+    subprocess.run(
+        ["git", "-c", "core.checkStat=minimal", "-c", "core.trustctime=false", "update-index", "-q", "--refresh"],
+        capture_output=True,
+        cwd=worktree_path,
+    )
+    return used
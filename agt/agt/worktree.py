@@ -2,10 +2,42 @@
 
 import os
 import subprocess
-import uuid
+import sys
+import time
 from pathlib import Path
 from typing import Optional
 
+# Parallel `git worktree add` calls contend on locks in the shared .git dir;
+# retry those failures with a short exponential backoff.
+LOCK_RETRY_ATTEMPTS = 6
+LOCK_RETRY_DELAY = 0.05
+
+# Default number of concurrent `git worktree add` processes for batch creation.
+DEFAULT_JOBS = min(8, os.cpu_count() or 1)
+
+# Per-worktree settings that keep status and `add -A` fast on large trees.
+# Opt-in (AGT_FAST_INDEX=1 or `git config agt.fastIndex true`): they turn on
+# extensions.worktreeConfig for the whole repository; measure the gain with
+# scripts/bench_ws_status.py first.
+FAST_INDEX_CONFIG = {"core.untrackedCache": "true", "index.version": "4", "core.splitIndex": "true"}
+
+# git's built-in fsmonitor daemon only exists on macOS and Windows
+FSMONITOR_PLATFORMS = ("darwin", "win32")
+
+
+# Environment variables that change how git discovers the repository; when
+# any is set, discovery is left to git itself.
+_GIT_DISCOVERY_ENV = (
+    "GIT_DIR",
+    "GIT_WORK_TREE",
+    "GIT_COMMON_DIR",
+    "GIT_CEILING_DIRECTORIES",
+    "GIT_DISCOVERY_ACROSS_FILESYSTEM",
+)
+
+# Memoized repo roots, keyed by the directory discovery started from
+_repo_root_cache: dict[Path, Path] = {}
+
 
 def get_repo_root(cwd: Optional[Path] = None) -> Path:
     """
@@ -13,10 +45,127 @@ def get_repo_root(cwd: Optional[Path] = None) -> Path:
     
     If we're in a worktree, this returns the main repository root,
     not the worktree directory itself.
+    
+    The repository is discovered in-process (walking up to .git and
+    following gitdir:/commondir links the way git does) and memoized per
+    starting directory. Only layouts the walker doesn't handle fall back to
+    `git rev-parse --show-toplevel`.
     """
     if cwd is None:
         cwd = Path.cwd()
     
+    cached = _repo_root_cache.get(cwd)
+    if cached is not None:
+        return cached
+    
+    repo_root = None
+    if not any(name in os.environ for name in _GIT_DISCOVERY_ENV):
+        repo_root = _discover_repo_root(cwd)
+    if repo_root is None:
+        repo_root = _repo_root_from_git(cwd)
+    
+    _repo_root_cache[cwd] = repo_root
+    return repo_root
+
+
+def _read_gitfile(path: Path) -> Optional[Path]:
+    """Return the git dir a `.git` file points to ("gitdir: <path>")."""
+    try:
+        content = path.read_text(encoding="utf-8").strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+    if not content.startswith("gitdir: "):
+        return None
+    git_dir = Path(content[len("gitdir: "):].strip())
+    if not git_dir.is_absolute():
+        git_dir = path.parent / git_dir
+    return Path(os.path.realpath(git_dir))
+
+
+def _read_commondir(git_dir: Path) -> Optional[Path]:
+    """Return the common dir of a linked worktree's git dir, if it has one."""
+    try:
+        content = (git_dir / "commondir").read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    common_dir = Path(content)
+    if not common_dir.is_absolute():
+        common_dir = git_dir / common_dir
+    return Path(os.path.realpath(common_dir))
+
+
+def _is_git_dir(git_dir: Path) -> bool:
+    """Mirror git's is_git_directory(): HEAD plus objects/ and refs/ (via commondir)."""
+    if not (git_dir / "HEAD").is_file():
+        return False
+    common_dir = _read_commondir(git_dir) or git_dir
+    return (common_dir / "objects").is_dir() and (common_dir / "refs").is_dir()
+
+
+def _is_plain_repo(git_dir: Path) -> bool:
+    """
+    Return True if the repository's work tree is simply the parent of git_dir.
+    
+    Bare repositories, core.worktree and repositories owned by another user
+    (which git may refuse as dubious ownership) are left to git.
+    """
+    try:
+        if hasattr(os, "getuid") and git_dir.stat().st_uid != os.getuid():
+            return False
+        config = (git_dir / "config").read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return False
+    for line in config.splitlines():
+        key = line.strip().replace(" ", "").replace("\t", "").lower()
+        if key.startswith("worktree=") or key == "bare=true":
+            return False
+    return True
+
+
+def _discover_repo_root(cwd: Path) -> Optional[Path]:
+    """
+    Find the main repository root without running git.
+    
+    Returns:
+        The main worktree root, or None if git has to decide
+    """
+    start = Path(os.path.realpath(cwd))
+    try:
+        device = start.stat().st_dev
+    except OSError:
+        return None
+    
+    for directory in (start, *start.parents):
+        if directory.name == ".git":
+            return None  # inside a git dir: no work tree
+        try:
+            if directory.stat().st_dev != device:
+                return None  # git stops at filesystem boundaries
+        except OSError:
+            return None
+        
+        dot_git = directory / ".git"
+        if dot_git.is_dir():
+            if _is_git_dir(dot_git):
+                return directory if _is_plain_repo(dot_git) else None
+        elif dot_git.is_file():
+            git_dir = _read_gitfile(dot_git)
+            if git_dir is None or not _is_git_dir(git_dir):
+                return None
+            common_dir = _read_commondir(git_dir)
+            if common_dir is None:
+                # Submodule or --separate-git-dir checkout: this is its own root
+                return directory if _is_plain_repo(git_dir) else None
+            # Linked worktree: report the main worktree next to the common dir
+            if common_dir.name == ".git" and _is_plain_repo(common_dir):
+                return common_dir.parent
+            return None
+    
+    return None
+
+
+def _repo_root_from_git(cwd: Path) -> Path:
+    """Ask git for the repository root (fallback for unusual layouts)."""
     result = subprocess.run(
         ["git", "rev-parse", "--show-toplevel"],
         capture_output=True,
@@ -49,9 +198,28 @@ def get_repo_root(cwd: Optional[Path] = None) -> Path:
     return repo_root
 
 
+def get_git_common_dir(root: Path) -> Path:
+    """Return the git dir shared by the main repository and all its worktrees."""
+    git_path = root / ".git"
+    if git_path.is_dir():
+        return git_path
+    if git_path.is_file() and "GIT_DIR" not in os.environ:
+        git_dir = _read_gitfile(git_path)
+        if git_dir is not None and _is_git_dir(git_dir):
+            return _read_commondir(git_dir) or git_dir
+    result = subprocess.run(
+        ["git", "rev-parse", "--path-format=absolute", "--git-common-dir"],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=root,
+    )
+    return Path(result.stdout.strip())
+
+
 def generate_agent_id() -> str:
     """Generate a unique agent ID."""
-    return f"agent-{uuid.uuid4().hex[:8]}"
+    return f"agent-{os.urandom(4).hex()}"
 
 
 def get_work_dir(root: Optional[Path] = None) -> Path:
@@ -61,10 +229,199 @@ def get_work_dir(root: Optional[Path] = None) -> Path:
     return root / ".work"
 
 
-def add_worktree(root: Path, agent_id: str, base_branch: str = "main") -> tuple[Path, str]:
+def _is_lock_error(stderr: str) -> bool:
+    """Return True if git failed because of a concurrent git process."""
+    stderr = stderr.lower()
+    if ".lock" in stderr or "unable to lock" in stderr or "could not lock" in stderr:
+        return True
+    # `git worktree add` reads every worktree's metadata and trips over ones
+    # another process is still writing
+    return "failed to read" in stderr and "worktrees" in stderr
+
+
+def run_git_with_retry(args: list[str], cwd: Path) -> subprocess.CompletedProcess:
+    """Run a git command, retrying failures caused by lock contention."""
+    for attempt in range(LOCK_RETRY_ATTEMPTS):
+        result = subprocess.run(["git", *args], capture_output=True, text=True, cwd=cwd)
+        if result.returncode == 0:
+            return result
+        if attempt + 1 == LOCK_RETRY_ATTEMPTS or not _is_lock_error(result.stderr):
+            break
+        time.sleep(LOCK_RETRY_DELAY * (2 ** attempt))
+    raise subprocess.CalledProcessError(
+        result.returncode, result.args, output=result.stdout, stderr=result.stderr
+    )
+
+
+def format_git_error(error: subprocess.CalledProcessError) -> str:
+    """Return the most relevant line of a failed git command's output."""
+    lines = (error.stderr or error.output or "").strip().splitlines()
+    return lines[-1] if lines else str(error)
+
+
+def resolve_sparse_patterns(root: Path, spec: str) -> list[str]:
+    """
+    Resolve a --sparse spec into cone-mode directory patterns.
+    
+    The spec is a comma-separated list of directories and/or profile names.
+    A profile is a multi-valued git config key, e.g.:
+    
+        git config --add agt.sparse.frontend web/app
+        git config --add agt.sparse.frontend shared/ui
+    
+    Items that name a profile expand to its directories; all other items are
+    used as directories verbatim.
+    """
+    result = subprocess.run(
+        ["git", "config", "--get-regexp", r"^agt\.sparse\."],
+        capture_output=True,
+        text=True,
+        cwd=root,
+    )
+    profiles: dict[str, list[str]] = {}
+    for line in result.stdout.splitlines():
+        key, _, value = line.partition(" ")
+        profiles.setdefault(key[len("agt.sparse."):], []).append(value.strip())
+    
+    patterns = []
+    for item in (part.strip() for part in spec.split(",")):
+        if item:
+            patterns.extend(profiles.get(item, [item]))
+    return list(dict.fromkeys(patterns))
+
+
+def _checkout_sparse(worktree_path: Path, patterns: list[str]) -> None:
+    """Configure cone-mode sparse checkout and materialize only those paths."""
+    # Both steps may touch the shared .git/config when many agents start at once
+    run_git_with_retry(["sparse-checkout", "set", "--cone", "--sparse-index", *patterns], worktree_path)
+    run_git_with_retry(["read-tree", "-mu", "HEAD"], worktree_path)
+
+
+def enable_worktree_config(root: Path) -> None:
+    """Turn on extensions.worktreeConfig so `git config --worktree` settings apply."""
+    enabled = subprocess.run(
+        ["git", "config", "--bool", "extensions.worktreeConfig"],
+        capture_output=True,
+        text=True,
+        cwd=root,
+    )
+    if enabled.stdout.strip() != "true":
+        run_git_with_retry(["config", "extensions.worktreeConfig", "true"], root)
+
+
+def fast_index_enabled(root: Path) -> bool:
+    """
+    Whether new worktrees are set up with configure_fast_index.
+    
+    AGT_FAST_INDEX (1 or 0) wins; otherwise the repository's agt.fastIndex
+    config decides. Off by default.
+    """
+    configured = os.environ.get("AGT_FAST_INDEX")
+    if configured is not None:
+        return configured == "1"
+    result = subprocess.run(
+        ["git", "config", "--bool", "agt.fastIndex"],
+        capture_output=True,
+        text=True,
+        cwd=root,
+    )
+    return result.stdout.strip() == "true"
+
+
+def configure_fast_index(root: Path, worktree_path: Path, sparse: bool = False) -> None:
+    """
+    Set up a worktree for fast status and staging.
+    
+    Enables the untracked cache, index v4 (prefix-compressed paths) and a
+    split index (only changed entries are rewritten), plus the built-in
+    fsmonitor daemon where git has one. The settings are per worktree
+    (config.worktree), and the index is converted right away. Sparse
+    worktrees keep their sparse index instead of a split one.
+    """
+    from agt.template import worktree_git_dir
+    
+    settings = dict(FAST_INDEX_CONFIG)
+    if sparse:
+        del settings["core.splitIndex"]
+    if sys.platform in FSMONITOR_PLATFORMS:
+        settings["core.fsmonitor"] = "true"
+    
+    enable_worktree_config(root)
+    # Appending to the new worktree's own config file costs no git process per
+    # key; nothing else writes it while the worktree is being created
+    sections: dict[str, list[str]] = {}
+    for key, value in settings.items():
+        section, name = key.split(".")
+        sections.setdefault(section, []).append(f"\t{name} = {value}\n")
+    config_path = worktree_git_dir(worktree_path) / "config.worktree"
+    with open(config_path, "a", encoding="utf-8") as fh:
+        for section, lines in sections.items():
+            fh.write(f"[{section}]\n" + "".join(lines))
+    
+    # A version change rewrites the whole index, so git won't split it in the same call
+    subprocess.run(
+        ["git", "update-index", "--index-version", "4", "--untracked-cache"],
+        check=True,
+        capture_output=True,
+        cwd=worktree_path,
+    )
+    if not sparse:
+        subprocess.run(["git", "update-index", "--split-index"], check=True, capture_output=True, cwd=worktree_path)
+
+
+def worktree_status(worktree_path: Path) -> list[tuple[str, str]]:
+    """
+    List a worktree's changes with `git status --porcelain -z`.
+    
+    This is the path the untracked cache and fsmonitor speed up in worktrees
+    set up by configure_fast_index.
+    
+    Returns:
+        list of (XY status code, path) pairs; "??" marks untracked files
+    """
+    result = subprocess.run(
+        ["git", "status", "--porcelain=v1", "-z"],
+        check=True,
+        capture_output=True,
+        cwd=worktree_path,
+    )
+    entries = []
+    fields = iter(result.stdout.decode(errors="surrogateescape").split("\0"))
+    for field in fields:
+        if not field:
+            continue
+        code, path = field[:2], field[3:]
+        if code[0] in "RC":
+            next(fields, None)  # the rename/copy source
+        entries.append((code, path))
+    return entries
+
+
+def add_worktree(
+    root: Path,
+    agent_id: str,
+    base_branch: str = "main",
+    sparse: Optional[list[str]] = None,
+    cow: Optional[str] = None,
+    owner_pid: Optional[int] = None,
+) -> tuple[Path, str]:
     """
     Add a new Git worktree for an agent.
     
+    Lock contention with concurrent `git worktree add` calls is retried with
+    exponential backoff; any other failure raises CalledProcessError.
+    
+    If sparse patterns are given, the worktree is created with --no-checkout,
+    switched to a cone-mode sparse checkout with a sparse index, and only
+    those directories (plus top-level files) are written to disk.
+    
+    If cow is a clone mode ("auto", "reflink", "hardlink" or "copy"), files
+    are cloned from a template checkout of the base commit instead of being
+    written from the object store (see agt.template).
+    
+    `owner_pid` is recorded as the worktree's owner (default: see
+    registry.get_owner_pid).
+    
     Returns:
         tuple: (worktree_path, branch_name)
     """
@@ -74,26 +431,140 @@ def add_worktree(root: Path, agent_id: str, base_branch: str = "main") -> tuple[
     worktree_path = work_dir / agent_id
     branch_name = f"feat/{agent_id}"
     
-    subprocess.run(
-        ["git", "worktree", "add", str(worktree_path), "-b", branch_name, base_branch],
-        check=True,
-        cwd=root,
+    if sparse and cow:
+        raise ValueError("sparse and copy-on-write worktrees cannot be combined")
+    if cow:
+        from agt.template import resolve_commit
+        
+        # Pin the commit so the worktree and its template can't diverge
+        base_branch = resolve_commit(root, base_branch)
+    
+    from agt import registry
+    
+    stamp = registry.begin_change(root)
+    registry.register_worktree(
+        root, agent_id, worktree_path, branch_name, state=registry.CREATING, owner_pid=owner_pid
     )
+    try:
+        _create_worktree(root, worktree_path, branch_name, base_branch, sparse=sparse, cow=cow)
+    except BaseException:
+        registry.unregister_worktree(root, agent_id)
+        raise
     
+    base_commit = registry.read_branch_commit(root, branch_name)
+    registry.register_worktree(
+        root, agent_id, worktree_path, branch_name, base_commit=base_commit, stamp_before=stamp
+    )
     return worktree_path, branch_name
 
 
+def _create_worktree(
+    root: Path,
+    worktree_path: Path,
+    branch_name: str,
+    base_branch: str,
+    sparse: Optional[list[str]] = None,
+    cow: Optional[str] = None,
+) -> None:
+    """Run `git worktree add` (with lock retries) and materialize the files."""
+    for attempt in range(LOCK_RETRY_ATTEMPTS):
+        # A failed attempt may already have created the branch; -B reuses it
+        branch_flag = "-b" if attempt == 0 else "-B"
+        checkout_flags = ["--no-checkout"] if sparse or cow else []
+        result = subprocess.run(
+            ["git", "worktree", "add", *checkout_flags, str(worktree_path), branch_flag, branch_name, base_branch],
+            capture_output=True,
+            text=True,
+            cwd=root,
+        )
+        if result.returncode == 0:
+            break
+        if attempt + 1 == LOCK_RETRY_ATTEMPTS or not _is_lock_error(result.stderr):
+            raise subprocess.CalledProcessError(
+                result.returncode, result.args, output=result.stdout, stderr=result.stderr
+            )
+        if worktree_path.exists() and not (worktree_path / ".git").exists():
+            import shutil
+            
+            shutil.rmtree(worktree_path, ignore_errors=True)
+        time.sleep(LOCK_RETRY_DELAY * (2 ** attempt))
+    
+    if sparse:
+        _checkout_sparse(worktree_path, sparse)
+    if cow:
+        from agt.template import materialize_from_template
+        
+        materialize_from_template(root, worktree_path, base_branch, mode=cow)
+    if fast_index_enabled(root):
+        configure_fast_index(root, worktree_path, sparse=bool(sparse))
+
+
+def add_worktrees(
+    root: Path,
+    base_branches: list[str],
+    jobs: Optional[int] = None,
+    sparse: Optional[list[str]] = None,
+    cow: Optional[str] = None,
+) -> list[tuple[str, Optional[Path], Optional[str], Optional[str]]]:
+    """
+    Create one agent worktree per entry in base_branches, in parallel.
+    
+    At most `jobs` `git worktree add` processes run at once. Failures do not
+    abort the batch; they are reported per worktree.
+    
+    Returns:
+        list of (agent_id, worktree_path, branch_name, error) tuples in input
+        order; path and branch are None and error is set on failure
+    """
+    agent_ids = [generate_agent_id() for _ in base_branches]
+    
+    def create(agent_id: str, base_branch: str):
+        try:
+            worktree_path, branch_name = add_worktree(root, agent_id, base_branch, sparse=sparse, cow=cow)
+        except subprocess.CalledProcessError as e:
+            return agent_id, None, None, format_git_error(e)
+        return agent_id, worktree_path, branch_name, None
+    
+    # Create .work up front so workers don't race on mkdir
+    get_work_dir(root).mkdir(parents=True, exist_ok=True)
+    
+    from concurrent.futures import ThreadPoolExecutor
+    
+    workers = max(1, min(jobs or DEFAULT_JOBS, len(base_branches)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(create, agent_ids, base_branches))
+
+
 def remove_worktree(root: Path, agent_id: str) -> None:
     """Remove a Git worktree."""
+    from agt import registry
+    
     work_dir = get_work_dir(root)
     worktree_path = work_dir / agent_id
     
     if worktree_path.exists():
-        subprocess.run(
-            ["git", "worktree", "remove", str(worktree_path)],
-            check=True,
-            cwd=root,
-        )
+        stamp = registry.begin_change(root)
+        registry.set_state(root, agent_id, registry.REMOVING)
+        try:
+            subprocess.run(
+                ["git", "worktree", "remove", str(worktree_path)],
+                check=True,
+                cwd=root,
+            )
+        except subprocess.CalledProcessError:
+            registry.set_state(root, agent_id, registry.ACTIVE)
+            raise
+        registry.unregister_worktree(root, agent_id, stamp_before=stamp)
+
+
+def repair_worktree(root: Path, worktree_path: Path) -> None:
+    """Point git's worktree metadata at a worktree that was moved on disk."""
+    subprocess.run(
+        ["git", "worktree", "repair", str(worktree_path)],
+        check=True,
+        capture_output=True,
+        cwd=root,
+    )
 
 
 def get_worktree_path(root: Path, agent_id: str) -> Path:
@@ -102,8 +573,15 @@ def get_worktree_path(root: Path, agent_id: str) -> Path:
     return work_dir / agent_id
 
 
-def list_worktrees(root: Optional[Path] = None) -> list[str]:
-    """List all active agent worktree IDs."""
+def list_worktrees(root: Optional[Path] = None, verify: bool = False) -> list[str]:
+    """
+    List all active agent worktree IDs (from the worktree registry).
+    
+    With `verify`, directories deleted by hand are dropped too (see
+    registry.list_entries); the cheap default is for per-command lookups.
+    """
+    from agt import registry
+    
     if root is None:
         root = get_repo_root(Path.cwd())
     work_dir = get_work_dir(root)
@@ -111,14 +589,7 @@ def list_worktrees(root: Optional[Path] = None) -> list[str]:
     if not work_dir.exists():
         return []
     
-    agent_ids = []
-    for item in work_dir.iterdir():
-        if item.is_dir() and item.name.startswith("agent-"):
-            # Verify it's actually a git worktree
-            if (item / ".git").exists() or (item / ".git").is_file():
-                agent_ids.append(item.name)
-    
-    return sorted(agent_ids)
+    return [entry["agent_id"] for entry in registry.list_entries(root, verify=verify)]
 
 
 def detect_agent_id_from_cwd(cwd: Optional[Path] = None) -> Optional[str]:
@@ -0,0 +1,1169 @@
+"""Workspace (ws) command handlers: Git worktree lifecycle for agents."""
+
+import subprocess
+import sys
+from pathlib import Path
+from typing import Callable, ContextManager, Optional
+
+from agt.cli import (
+    _parse_agent_flag,
+    _parse_bool_flag,
+    _parse_int_flag,
+    _parse_value_flag,
+    err,
+    safe_print,
+)
+from agt.worktree import (
+    add_worktree,
+    add_worktrees,
+    format_git_error,
+    generate_agent_id,
+    get_current_agent_id,
+    get_repo_root,
+    get_worktree_path,
+    list_worktrees,
+    remove_worktree,
+    resolve_sparse_patterns,
+    worktree_status,
+)
+
+# agt options of `ws run`; everything from the first other word is the command
+RUN_BOOL_FLAGS = ("--all", "--no-log", "--cache", "--pin")
+RUN_VALUE_FLAGS = ("--agent", "--agents", "--jobs", "--cpus", "--max-mem", "--max-files")
+
+
+def _split_command(args: list[str]) -> tuple[list[str], list[str]]:
+    """
+    Split `ws run` arguments into agt's options and the command.
+    
+    Options are only read before the command (or before `--`), so flags of
+    the command itself (`make --jobs 4`, `git log --all`) are left alone.
+    
+    Returns:
+        (options, command)
+    """
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg == "--":
+            return args[:index], args[index + 1:]
+        if arg in RUN_VALUE_FLAGS:
+            index += 2
+        elif arg in RUN_BOOL_FLAGS:
+            index += 1
+        else:
+            break
+    return args[:index], args[index:]
+
+
+def ws_dispatch(action: str, args: list[str]) -> None:
+    """Dispatch workspace (worktree) commands."""
+    command = []
+    if action == "run":
+        args, command = _split_command(args)
+    agent_id, args = _parse_agent_flag(args)
+    
+    if action == "new":
+        count, args = _parse_int_flag(args, "--count")
+        jobs, args = _parse_int_flag(args, "--jobs")
+        sparse, args = _parse_value_flag(args, "--sparse")
+        cow, args = _parse_bool_flag(args, "--cow")
+        cmd_start(
+            base_branches=args or ["main"],
+            count=count or 1,
+            jobs=jobs,
+            sparse=sparse,
+            cow="auto" if cow else None,
+        )
+    
+    elif action == "run":
+        all_agents, args = _parse_bool_flag(args, "--all")
+        agents, args = _parse_value_flag(args, "--agents")
+        jobs, args = _parse_int_flag(args, "--jobs")
+        no_log, args = _parse_bool_flag(args, "--no-log")
+        cache, args = _parse_bool_flag(args, "--cache")
+        cpus, args = _parse_int_flag(args, "--cpus")
+        pin, args = _parse_bool_flag(args, "--pin")
+        max_mem, args = _parse_value_flag(args, "--max-mem")
+        max_files, args = _parse_int_flag(args, "--max-files")
+        if not command:
+            err("Missing command to run")
+        cmd_run(
+            command,
+            agent_id=agent_id,
+            agent_ids=[a for a in agents.split(",") if a] if agents else None,
+            all_agents=all_agents,
+            jobs=jobs,
+            log=not no_log,
+            cache=cache,
+            cpus=cpus,
+            pin=pin,
+            max_mem=max_mem,
+            max_files=max_files,
+        )
+    
+    elif action == "status":
+        all_agents, args = _parse_bool_flag(args, "--all")
+        cmd_status(agent_id=agent_id, all_agents=all_agents)
+    
+    elif action == "touch":
+        if not args:
+            err("Usage: agt ws touch [--agent <id>] <path>...")
+        cmd_touch(args, agent_id=agent_id)
+    
+    elif action == "watch":
+        cmd_watch(agent_id=agent_id)
+    
+    elif action == "slots":
+        cmd_slots()
+    
+    elif action == "cache":
+        cmd_cache(args[0] if args else "stats")
+    
+    elif action == "fetch":
+        cmd_fetch(args[0] if args else "stats")
+    
+    elif action == "logs":
+        follow, args = _parse_bool_flag(args, "--follow")
+        lines, args = _parse_int_flag(args, "--lines")
+        cmd_logs(agent_id=agent_id or (args[0] if args else None), follow=follow, lines=lines or 50)
+    
+    elif action == "save":
+        from_stdin, args = _parse_bool_flag(args, "--from-stdin")
+        fmt, args = _parse_value_flag(args, "--format")
+        no_checkout, args = _parse_bool_flag(args, "--no-checkout")
+        if not args:
+            err('Usage: agt ws save [--agent <id>] [--from-stdin [--format json|ndjson|diff] [--no-checkout]] "<message>"')
+        message = args[0]
+        if from_stdin:
+            cmd_commit_stdin(message, agent_id=agent_id, fmt=fmt, checkout=not no_checkout)
+        else:
+            cmd_commit(message, agent_id=agent_id)
+    
+    elif action == "push":
+        # Values first, so a value that looks like a flag is not taken as one
+        agents, args = _parse_value_flag(args, "--agents")
+        timeout, args = _parse_int_flag(args, "--timeout")
+        all_agents, args = _parse_bool_flag(args, "--all")
+        queue, args = _parse_bool_flag(args, "--async")
+        wait, args = _parse_bool_flag(args, "--wait")
+        drain, args = _parse_bool_flag(args, "--drain")
+        remote = args[0] if args else "origin"
+        agent_ids = [a for a in agents.split(",") if a] if agents else None
+        if drain:
+            cmd_push_drain()
+        elif queue or wait:
+            cmd_push_spooled(remote, agent_id=agent_id, agent_ids=agent_ids, all_agents=all_agents, queue=queue, wait=wait, timeout=timeout)
+        elif agents or all_agents:
+            cmd_push_many(remote, agent_ids)
+        else:
+            cmd_push(remote, agent_id=agent_id)
+    
+    elif action == "merge":
+        verify, args = _parse_value_flag(args, "--verify")
+        agents, args = _parse_value_flag(args, "--agents")
+        batch, args = _parse_int_flag(args, "--batch")
+        queue, args = _parse_bool_flag(args, "--queue")
+        run_queue, args = _parse_bool_flag(args, "--run-queue")
+        status, args = _parse_bool_flag(args, "--status")
+        all_agents, args = _parse_bool_flag(args, "--all")
+        remote = args[0] if args else "origin"
+        if queue or run_queue or status:
+            cmd_merge_queue(
+                remote,
+                agent_id=agent_id,
+                agent_ids=[a for a in agents.split(",") if a] if agents else None,
+                all_agents=all_agents,
+                batch=batch,
+                verify=verify,
+                action="add" if queue else "run" if run_queue else "status",
+            )
+        else:
+            cmd_merge(agent_id=agent_id)
+    
+    elif action == "conflicts":
+        agents, args = _parse_value_flag(args, "--agents")
+        as_json, args = _parse_bool_flag(args, "--json")
+        cmd_conflicts(
+            base=args[0] if args else "main",
+            agent_ids=[a for a in agents.split(",") if a] if agents else None,
+            as_json=as_json,
+        )
+    
+    elif action == "clean":
+        cmd_clean(agent_id=agent_id)
+    
+    elif action == "gc":
+        max_age, args = _parse_value_flag(args, "--max-age")
+        merged, args = _parse_bool_flag(args, "--merged")
+        empty, args = _parse_bool_flag(args, "--empty")
+        orphaned, args = _parse_bool_flag(args, "--orphaned")
+        dry_run, args = _parse_bool_flag(args, "--dry-run")
+        maintenance, args = _parse_bool_flag(args, "--maintenance")
+        jobs, args = _parse_int_flag(args, "--jobs")
+        cmd_gc(
+            max_age=max_age,
+            merged=merged,
+            empty=empty,
+            orphaned=orphaned,
+            dry_run=dry_run,
+            maintenance=maintenance,
+            jobs=jobs,
+        )
+    
+    elif action == "pipeline":
+        jobs, args = _parse_int_flag(args, "--jobs")
+        retries, args = _parse_int_flag(args, "--retries", minimum=0)
+        if not args:
+            err("Usage: agt ws pipeline <plan.yml|plan.json> [--jobs N] [--retries N]")
+        cmd_pipeline(args[0], jobs=jobs, retries=retries)
+    
+    elif action == "pool":
+        size, args = _parse_int_flag(args, "--size")
+        sub_action = args[0] if args else "status"
+        base_branch = args[1] if len(args) > 1 else None
+        cmd_pool(sub_action, base_branch=base_branch, size=size)
+    
+    else:
+        err(f"Unknown workspace action: {action}. Available: new, run, status, touch, watch, logs, cache, fetch, slots, save, push, merge, conflicts, clean, gc, pipeline, pool")
+
+
+def cmd_start(
+    base_branch: str = "main",
+    count: int = 1,
+    jobs: Optional[int] = None,
+    base_branches: Optional[list[str]] = None,
+    sparse: Optional[str] = None,
+    cow: Optional[str] = None,
+) -> list[str]:
+    """
+    Start new agent worktrees.
+    
+    Creates `count` worktrees for each base branch (default: one from
+    base_branch). Batches are created in parallel with at most `jobs`
+    concurrent `git worktree add` processes. `sparse` is a comma-separated
+    list of directories or sparse profile names; sparse worktrees are never
+    taken from the warm pool. `cow` clones files from a per-commit template
+    checkout using the given mode (see agt.template.clone_tree).
+    
+    Returns:
+        list of created agent IDs
+    """
+    from agt.pool import claim_worktree, refill_in_background
+    
+    root = get_repo_root(Path.cwd())
+    bases = [b for b in (base_branches or [base_branch]) for _ in range(count)]
+    
+    patterns = None
+    if sparse:
+        patterns = resolve_sparse_patterns(root, sparse)
+        if not patterns:
+            err("--sparse requires at least one directory or profile name")
+        if cow:
+            err("--sparse and --cow cannot be combined")
+    
+    # Claim pre-built worktrees from the warm pool first
+    ready = []
+    missing = []
+    for base in bases:
+        claimed = None if patterns else claim_worktree(root, base)
+        if claimed:
+            ready.append(claimed)
+        else:
+            missing.append(base)
+    
+    failed = 0
+    if len(missing) == 1 and not ready:
+        agent_id = generate_agent_id()
+        try:
+            worktree_path, branch_name = add_worktree(root, agent_id, missing[0], sparse=patterns, cow=cow)
+        except subprocess.CalledProcessError as e:
+            err(f"Failed to create worktree from {missing[0]}: {format_git_error(e)}")
+        ready.append((agent_id, worktree_path, branch_name))
+    elif missing:
+        results = add_worktrees(root, missing, jobs=jobs, sparse=patterns, cow=cow)
+        for (agent_id, worktree_path, branch_name, error), base in zip(results, missing):
+            if error:
+                failed += 1
+                safe_print(f"❌ {agent_id} (from {base}): {error}", file=sys.stderr)
+            else:
+                ready.append((agent_id, worktree_path, branch_name))
+    
+    for base in dict.fromkeys(bases):
+        refill_in_background(root, base)
+    
+    for agent_id, worktree_path, branch_name in ready:
+        safe_print(f"✅ Worktree ready: {worktree_path} (branch {branch_name})")
+    for agent_id, _, _ in ready:
+        print(f"AGENT_ID={agent_id}")
+    
+    if failed:
+        err(f"{failed} of {len(bases)} worktrees failed")
+    return [agent_id for agent_id, _, _ in ready]
+
+
+def cmd_run(
+    command: list[str],
+    agent_id: Optional[str] = None,
+    agent_ids: Optional[list[str]] = None,
+    all_agents: bool = False,
+    jobs: Optional[int] = None,
+    log: bool = True,
+    cache: bool = False,
+    cpus: Optional[int] = None,
+    pin: bool = False,
+    max_mem: Optional[str] = None,
+    max_files: Optional[int] = None,
+) -> None:
+    """
+    Run a command in the agent worktree.
+    
+    With `agent_ids` or `all_agents`, the command runs in each of those
+    worktrees concurrently (at most `jobs` at once, see agt.runner) and
+    exits with the highest exit status among them. Unless `log` is False,
+    output is also appended to each agent's run log (see agt.logs). With
+    `cache`, a previous result for the same worktree content, command and
+    environment is replayed instead of running the command (see agt.cache).
+    
+    `cpus` makes each command wait for that many machine-wide CPU slots
+    (see agt.sched); `pin` binds it to those CPUs; `max_mem` (e.g. "4G") and
+    `max_files` set its address-space and open-file limits.
+    """
+    root = get_repo_root(Path.cwd())
+    schedule = _make_schedule(cpus, pin, max_mem, max_files)
+    
+    if cache:
+        from agt.logs import ensure_excluded
+        
+        # Keep agt's own files out of the content hash
+        ensure_excluded(root)
+    
+    if agent_ids or all_agents:
+        _run_fan_out(root, command, agent_ids or list_worktrees(root), jobs, log, cache, schedule)
+        return
+    
+    if not agent_id:
+        agent_id = get_current_agent_id(root, cwd=Path.cwd())
+    
+    if not agent_id:
+        worktrees = list_worktrees(root)
+        if not worktrees:
+            err("No worktrees found. Run 'agt ws new' first!")
+        else:
+            err(
+                f"Multiple worktrees found: {', '.join(worktrees)}\n"
+                f"Either:\n"
+                f"  - Run command from within worktree directory: cd .work/agent-xxxx\n"
+                f"  - Specify agent ID: agt ws run --agent <id> <command>"
+            )
+    
+    worktree_path = get_worktree_path(root, agent_id)
+    
+    if not worktree_path.exists():
+        err(f"Worktree not found: {worktree_path}. Run 'agt ws new' first!")
+    
+    if not command:
+        err("Missing command to run")
+    
+    cmd_str = " ".join(command)
+    from agt.runner import run_captured, run_passthrough
+    
+    if cache:
+        import time
+        
+        from agt import cache as run_cache
+        from agt.metrics import record_run
+        
+        started = time.time()
+        key = run_cache.cache_key(worktree_path, cmd_str)
+        hit = run_cache.lookup(root, key)
+        if hit is not None:
+            records, code = hit
+            run_cache.replay(records, sys.stdout.buffer, sys.stderr.buffer)
+            safe_print(f"agt: cached result ({key[:12]})", file=sys.stderr)
+            record_run(root, agent_id, cmd_str, code, started, time.time() - started, cached=True)
+        else:
+            record = []
+            code = run_captured(root, worktree_path, cmd_str, log=log, record=record, schedule=schedule)
+            run_cache.store(root, key, record, code)
+    elif log:
+        code = run_captured(root, worktree_path, cmd_str, schedule=schedule)
+    else:
+        code = run_passthrough(root, worktree_path, cmd_str, schedule=schedule)
+    if code:
+        sys.exit(code)
+
+
+def _make_schedule(
+    cpus: Optional[int],
+    pin: bool,
+    max_mem: Optional[str],
+    max_files: Optional[int],
+) -> Optional[Callable[[], ContextManager]]:
+    """
+    Build the per-command scheduling context for ws run (see agt.sched.scheduled).
+    
+    Commands are scheduled when --cpus or --pin is given, or by default
+    (with weight 1) when AGT_SLOTS is set.
+    
+    Returns:
+        A factory of context managers, or None if nothing applies
+    """
+    from agt import sched
+    
+    if cpus is None and (pin or sched.is_enabled()):
+        cpus = 1
+    mem_bytes = None
+    if max_mem is not None:
+        try:
+            mem_bytes = sched.parse_size(max_mem)
+        except ValueError:
+            err(f"--max-mem requires a size such as 512M or 4G, got: {max_mem}")
+    if cpus is None and mem_bytes is None and max_files is None:
+        return None
+    try:
+        sched.make_wrapper({0} if pin else None, mem_bytes, max_files)
+        if cpus is not None:
+            sched.get_sched_dir()
+    except OSError as e:
+        err(str(e))
+    
+    def on_wait() -> None:
+        busy, total = sched.slot_usage()
+        safe_print(f"agt: waiting for {cpus} CPU slot(s) ({busy}/{total} busy)...", file=sys.stderr)
+    
+    return lambda: sched.scheduled(cpus, pin, mem_bytes, max_files, on_wait=on_wait)
+
+
+def _run_fan_out(
+    root: Path,
+    command: list[str],
+    agent_ids: list[str],
+    jobs: Optional[int],
+    log: bool,
+    cache: bool,
+    schedule: Optional[Callable[[], ContextManager]],
+) -> None:
+    """Run a command in several agent worktrees and summarize per agent."""
+    from agt.runner import run_in_worktrees
+    
+    if not agent_ids:
+        err("No worktrees found. Run 'agt ws new' first!")
+    if not command:
+        err("Missing command to run")
+    
+    targets = []
+    for target_id in dict.fromkeys(agent_ids):
+        worktree_path = get_worktree_path(root, target_id)
+        if not worktree_path.exists():
+            err(f"Worktree not found: {worktree_path}. Run 'agt ws new' first!")
+        targets.append((target_id, worktree_path))
+    
+    results = run_in_worktrees(targets, " ".join(command), jobs=jobs, root=root, log=log, cache=cache, schedule=schedule)
+    
+    failed = [(target_id, code) for target_id, code, _ in results if code != 0]
+    for target_id, code, seconds in results:
+        mark = "✅" if code == 0 else "❌"
+        safe_print(f"{mark} {target_id}: exit {code} ({seconds:.1f}s)", file=sys.stderr)
+    if failed:
+        safe_print(f"❌ {len(failed)} of {len(results)} agents failed", file=sys.stderr)
+        sys.exit(max(code for _, code in failed))
+    safe_print(f"✅ Command succeeded in all {len(results)} agents", file=sys.stderr)
+
+
+def cmd_logs(agent_id: Optional[str] = None, follow: bool = False, lines: int = 50) -> None:
+    """Show the end of an agent's run log, optionally following new output."""
+    from agt.logs import LOG_NAME, get_log_dir, tail
+    from agt.logs import follow as follow_log
+    
+    root = get_repo_root(Path.cwd())
+    agent_id, worktree_path = _resolve_worktree(root, agent_id, "agt ws logs <id>")
+    
+    log_path = get_log_dir(worktree_path) / LOG_NAME
+    offset = 0
+    if log_path.exists():
+        data, offset = tail(log_path, lines)
+        sys.stdout.buffer.write(data)
+        sys.stdout.flush()
+    elif not follow:
+        err(f"No logs yet for {agent_id}. Run 'agt ws run --agent {agent_id} <command>' first!")
+    
+    if follow:
+        try:
+            follow_log(log_path, sys.stdout.buffer, offset=offset)
+        except KeyboardInterrupt:
+            pass
+
+
+def cmd_cache(action: str) -> None:
+    """Show statistics of, or clear, the shared `ws run --cache` result cache."""
+    from agt import cache as run_cache
+    
+    root = get_repo_root(Path.cwd())
+    
+    if action == "stats":
+        stats = run_cache.get_stats(root)
+        lookups = stats["hits"] + stats["misses"]
+        rate = f"{100 * stats['hits'] / lookups:.0f}%" if lookups else "n/a"
+        safe_print(
+            f"{stats['entries']} entries, {stats['bytes'] / 1024 / 1024:.1f} MB "
+            f"(limit {run_cache.MAX_CACHE_BYTES / 1024 / 1024:.0f} MB)"
+        )
+        safe_print(f"{stats['hits']} hits, {stats['misses']} misses (hit rate {rate})")
+    
+    elif action == "clear":
+        removed = run_cache.clear(root)
+        safe_print(f"✅ Cache cleared ({removed} entries removed)")
+    
+    else:
+        err(f"Unknown cache action: {action}. Available: stats, clear")
+
+
+def cmd_fetch(action: str) -> None:
+    """Show how many shared fetches of remote branches (see agt.fetch) ran and were saved."""
+    from agt import fetch
+    
+    root = get_repo_root(Path.cwd())
+    
+    if action == "stats":
+        stats = fetch.get_stats(root)
+        if not stats:
+            safe_print("No fetches recorded yet")
+        for name, counts in sorted(stats.items()):
+            safe_print(f"{name}: {counts['fetches']} fetches, {counts['saved']} saved")
+    
+    else:
+        err(f"Unknown fetch action: {action}. Available: stats")
+
+
+def cmd_status(agent_id: Optional[str] = None, all_agents: bool = False) -> None:
+    """
+    Show uncommitted changes in the agent worktree, or a summary for every worktree.
+    
+    Uses `git status --porcelain`, which the opt-in fast index setup
+    (AGT_FAST_INDEX=1, see configure_fast_index) keeps fast on large trees.
+    """
+    root = get_repo_root(Path.cwd())
+    
+    if all_agents:
+        from concurrent.futures import ThreadPoolExecutor
+        
+        from agt.worktree import DEFAULT_JOBS
+        
+        agent_ids = list_worktrees(root, verify=True)
+        if not agent_ids:
+            err("No worktrees found. Run 'agt ws new' first!")
+        
+        def summarize(agent_id: str) -> str:
+            try:
+                entries = worktree_status(get_worktree_path(root, agent_id))
+            except subprocess.CalledProcessError as e:
+                return f"❌ {agent_id}: {format_git_error(e)}"
+            if not entries:
+                return f"✅ {agent_id}: clean"
+            untracked = sum(1 for code, _ in entries if code == "??")
+            parts = [f"{len(entries) - untracked} changed"] if len(entries) > untracked else []
+            parts += [f"{untracked} untracked"] if untracked else []
+            return f"{agent_id}: {', '.join(parts)}"
+        
+        with ThreadPoolExecutor(max_workers=DEFAULT_JOBS) as pool:
+            for line in pool.map(summarize, agent_ids):
+                safe_print(line)
+        return
+    
+    agent_id, worktree_path = _resolve_worktree(root, agent_id, "agt ws status --agent <id> (or all: agt ws status --all)")
+    
+    entries = worktree_status(worktree_path)
+    for code, path in entries:
+        print(f"{code} {path}")
+    if not entries:
+        safe_print(f"✅ {agent_id}: clean")
+
+
+def _resolve_worktree(root: Path, agent_id: Optional[str], usage: str) -> tuple[str, Path]:
+    """Resolve the agent (from --agent, the cwd or the only worktree) and its existing worktree."""
+    if not agent_id:
+        agent_id = get_current_agent_id(root, cwd=Path.cwd())
+    
+    if not agent_id:
+        worktrees = list_worktrees(root)
+        if not worktrees:
+            err("No worktrees found. Run 'agt ws new' first!")
+        else:
+            err(
+                f"Multiple worktrees found: {', '.join(worktrees)}\n"
+                f"Either:\n"
+                f"  - Run command from within worktree directory: cd .work/agent-xxxx\n"
+                f"  - Specify agent ID: {usage}"
+            )
+    
+    worktree_path = get_worktree_path(root, agent_id)
+    
+    if not worktree_path.exists():
+        err(f"Worktree not found: {worktree_path}. Run 'agt ws new' first!")
+    return agent_id, worktree_path
+
+
+def cmd_touch(paths: list[str], agent_id: Optional[str] = None) -> None:
+    """Record paths in the agent's change journal so `ws save` stages only them."""
+    from agt import journal
+    
+    root = get_repo_root(Path.cwd())
+    _, worktree_path = _resolve_worktree(root, agent_id, "agt ws touch --agent <id> <path>...")
+    # Relative paths are relative to where the command runs
+    recorded = journal.record(worktree_path, [Path.cwd() / p for p in paths])
+    if recorded < len(paths):
+        err(f"{len(paths) - recorded} path(s) are outside the worktree {worktree_path}")
+
+
+def cmd_watch(agent_id: Optional[str] = None) -> None:
+    """Journal every change in the agent worktree via inotify until interrupted."""
+    from agt import journal
+    
+    root = get_repo_root(Path.cwd())
+    agent_id, worktree_path = _resolve_worktree(root, agent_id, "agt ws watch --agent <id>")
+    
+    def ready(directories: int) -> None:
+        safe_print(f"✅ Watching {worktree_path} ({directories} directories); Ctrl-C to stop", file=sys.stderr)
+    
+    try:
+        journal.watch(worktree_path, on_ready=ready)
+    except OSError as e:
+        err(f"Cannot watch {agent_id}: {e}. Use 'agt ws touch <path>...' to journal changes instead.")
+    except KeyboardInterrupt:
+        pass
+
+
+def cmd_slots() -> None:
+    """Show usage of the machine-wide CPU slots used by ws run --cpus."""
+    from agt import sched
+    
+    try:
+        sched_dir = sched.get_sched_dir()
+        busy, total = sched.slot_usage()
+    except OSError as e:
+        err(f"Cannot use the CPU slots: {e}")
+    state = "" if sched.is_enabled() else " (scheduling only for runs with --cpus; set AGT_SLOTS to always schedule)"
+    safe_print(f"{busy}/{total} CPU slots busy ({sched_dir}){state}")
+
+
+def cmd_commit(message: str, agent_id: Optional[str] = None) -> None:
+    """Commit changes in the agent worktree."""
+    root = get_repo_root(Path.cwd())
+    
+    if not agent_id:
+        agent_id = get_current_agent_id(root, cwd=Path.cwd())
+    
+    if not agent_id:
+        worktrees = list_worktrees(root)
+        if not worktrees:
+            err("No worktrees found. Run 'agt ws new' first!")
+        else:
+            err(
+                f"Multiple worktrees found: {', '.join(worktrees)}\n"
+                f"Either:\n"
+                f"  - Run command from within worktree directory: cd .work/agent-xxxx\n"
+                f"  - Specify agent ID: agt ws save --agent <id> <message>"
+            )
+    
+    worktree_path = get_worktree_path(root, agent_id)
+    
+    if not worktree_path.exists():
+        err(f"Worktree not found: {worktree_path}. Run 'agt ws new' first!")
+    
+    from agt import journal
+    
+    # Stage only journaled paths when the agent keeps a journal (see agt.journal)
+    taken = journal.take(worktree_path)
+    paths = journal.read_paths(taken) if taken else None
+    saved = False
+    try:
+        if paths is None:
+            subprocess.run("git add -A", shell=True, check=True, cwd=worktree_path)
+        else:
+            journal.stage_paths(worktree_path, paths)
+        subprocess.run(
+            ["git", "commit", "-m", message],
+            check=True,
+            cwd=worktree_path,
+        )
+        saved = True
+    finally:
+        if taken:
+            journal.finish(worktree_path, taken, saved)
+    
+    safe_print("✅ Commit ready" + (f" ({len(paths)} journaled paths)" if paths is not None else ""))
+
+
+def cmd_commit_stdin(message: str, agent_id: Optional[str] = None, fmt: Optional[str] = None, checkout: bool = True) -> None:
+    """Commit path -> content entries or a diff read from stdin, without `git add`."""
+    from agt import plumbing
+    
+    if fmt and fmt not in plumbing.FORMATS:
+        err(f"Unknown --format: {fmt}. Available: {', '.join(plumbing.FORMATS)}")
+    root = get_repo_root(Path.cwd())
+    _, worktree_path = _resolve_worktree(root, agent_id, "agt ws save --agent <id> --from-stdin <message>")
+    
+    try:
+        commit = plumbing.commit_stdin(worktree_path, sys.stdin.buffer.read(), message, fmt=fmt, checkout=checkout)
+    except ValueError as e:
+        err(f"Invalid input: {e}")
+    except subprocess.CalledProcessError as e:
+        err(f"Commit failed: {format_git_error(e)}")
+    if commit is None:
+        err("Nothing to commit: the input matches HEAD")
+    
+    safe_print(f"✅ Commit ready ({commit[:12]}{'' if checkout else ', working tree not updated'})")
+
+
+def cmd_push(remote: str = "origin", agent_id: Optional[str] = None) -> None:
+    """Push the agent branch to remote."""
+    root = get_repo_root(Path.cwd())
+    
+    if not agent_id:
+        agent_id = get_current_agent_id(root, cwd=Path.cwd())
+    
+    if not agent_id:
+        worktrees = list_worktrees(root)
+        if not worktrees:
+            err("No worktrees found. Run 'agt ws new' first!")
+        else:
+            err(
+                f"Multiple worktrees found: {', '.join(worktrees)}\n"
+                f"Either:\n"
+                f"  - Run command from within worktree directory: cd .work/agent-xxxx\n"
+                f"  - Specify agent ID: agt ws push --agent <id> [remote]"
+            )
+    
+    worktree_path = get_worktree_path(root, agent_id)
+    
+    if not worktree_path.exists():
+        err(f"Worktree not found: {worktree_path}. Run 'agt ws new' first!")
+    
+    subprocess.run(
+        f"git push -u {remote} HEAD",
+        shell=True,
+        check=True,
+        cwd=worktree_path,
+    )
+    
+    safe_print("🚀 Pushed to remote; open a PR in the UI if needed")
+
+
+def cmd_push_many(remote: str = "origin", agent_ids: Optional[list[str]] = None) -> None:
+    """Push the branches of several agents (all if `agent_ids` is None) with one git push."""
+    from agt.push import push_branches
+    
+    root = get_repo_root(Path.cwd())
+    agent_ids = agent_ids or list_worktrees(root)
+    if not agent_ids:
+        err("No worktrees found. Run 'agt ws new' first!")
+    
+    results = push_branches(root, agent_ids, remote)
+    for result in results:
+        mark = "✅" if result["ok"] else "❌"
+        safe_print(f"{mark} {result['agent_id']}: {result['branch']} ({result['summary']})", file=sys.stdout if result["ok"] else sys.stderr)
+    failed = [r for r in results if not r["ok"]]
+    if failed:
+        err(f"{len(failed)} of {len(results)} branches were not pushed to {remote}")
+    safe_print(f"🚀 Pushed {len(results)} branches to {remote} in one push")
+
+
+def cmd_push_spooled(
+    remote: str = "origin",
+    agent_id: Optional[str] = None,
+    agent_ids: Optional[list[str]] = None,
+    all_agents: bool = False,
+    queue: bool = True,
+    wait: bool = False,
+    timeout: Optional[int] = None,
+) -> None:
+    """
+    Queue pushes in the push spool (--async) and/or wait until they landed (--wait).
+    
+    The current commit of each agent branch is what gets queued or waited
+    for (see agt.spool).
+    """
+    from agt import spool
+    from agt.push import agent_branch
+    from agt.registry import read_branch_commit
+    
+    root = get_repo_root(Path.cwd())
+    if all_agents:
+        agent_ids = list_worktrees(root)
+        if not agent_ids:
+            err("No worktrees found. Run 'agt ws new' first!")
+    elif not agent_ids:
+        agent_ids = [_resolve_worktree(root, agent_id, "agt ws push --agent <id> --async")[0]]
+    
+    targets = []
+    for target_id in dict.fromkeys(agent_ids):
+        branch = agent_branch(root, target_id)
+        commit = read_branch_commit(root, branch)
+        if commit is None:
+            err(f"Branch not found: {branch}")
+        targets.append((target_id, branch, commit))
+    
+    if queue:
+        for target_id, branch, commit in targets:
+            spool.enqueue(root, remote, branch, commit, agent_id=target_id)
+        spool.start_worker(root)
+        if not wait:
+            safe_print(f"✅ Queued {len(targets)} push(es) to {remote}; 'agt ws push --wait' blocks until they land")
+            return
+    
+    failed = 0
+    for target_id, branch, commit in targets:
+        try:
+            result = spool.wait_for(root, remote, branch, commit, timeout=timeout)
+        except (LookupError, TimeoutError) as e:
+            err(f"{target_id}: {e}")
+        if result["ok"]:
+            safe_print(f"🚀 {target_id}: {branch} landed on {remote} ({result['commit'][:12]})")
+        else:
+            failed += 1
+            safe_print(f"❌ {target_id}: {branch} not pushed: {result['error']}", file=sys.stderr)
+    if failed:
+        err(f"{failed} of {len(targets)} pushes failed")
+
+
+def cmd_push_drain() -> None:
+    """Run the push spool worker in the foreground until the spool is empty."""
+    from agt import spool
+    
+    root = get_repo_root(Path.cwd())
+    if spool.is_worker_running(root):
+        safe_print("✅ A spool worker is already running")
+        return
+    attempted = spool.drain(root)
+    safe_print(f"✅ Push spool drained ({attempted} pushes attempted)")
+
+
+def cmd_merge(agent_id: Optional[str] = None) -> None:
+    """
+    Rebase the agent branch onto origin/main and fast-forward main to it.
+    
+    Done in memory (see agt.merge): no checkout of main in the repository
+    root, whose worktree is only updated if it is on main and clean.
+    """
+    root = get_repo_root(Path.cwd())
+    
+    if not agent_id:
+        agent_id = get_current_agent_id(root, cwd=Path.cwd())
+    
+    if not agent_id:
+        worktrees = list_worktrees(root)
+        if not worktrees:
+            err("No worktrees found. Run 'agt ws new' first!")
+        else:
+            err(
+                f"Multiple worktrees found: {', '.join(worktrees)}\n"
+                f"Either:\n"
+                f"  - Run command from within worktree directory: cd .work/agent-xxxx\n"
+                f"  - Specify agent ID: agt ws merge --agent <id>"
+            )
+    
+    worktree_path = get_worktree_path(root, agent_id)
+    
+    if not worktree_path.exists():
+        err(f"Worktree not found: {worktree_path}. Run 'agt ws new' first!")
+    
+    from agt.merge import MergeConflictError, merge_branch
+    
+    try:
+        result = merge_branch(root, agent_id)
+    except MergeConflictError as e:
+        err(f"Cannot rebase {agent_id} onto main: {e}")
+    except subprocess.CalledProcessError as e:
+        err(f"Merge failed: {format_git_error(e)}")
+    except RuntimeError as e:
+        err(str(e))
+    
+    safe_print(f"✅ Branch fast-forwarded to main ({result['commit'][:12]})")
+    if not result["main_updated"]:
+        safe_print("⚠️  Local main was not updated (its worktree has changes or it diverged); pull it later", file=sys.stderr)
+    if not result["branch_updated"]:
+        safe_print(f"⚠️  {result['branch']} was not moved to the rebased commit (its worktree has changes)", file=sys.stderr)
+
+
+def cmd_merge_queue(
+    remote: str = "origin",
+    agent_id: Optional[str] = None,
+    agent_ids: Optional[list[str]] = None,
+    all_agents: bool = False,
+    batch: Optional[int] = None,
+    verify: Optional[str] = None,
+    action: str = "add",
+) -> None:
+    """
+    Use the merge queue (see agt.mergequeue).
+    
+    "add" queues the agents' branches (their current commits) and starts
+    the merger in the background; "run" runs the merger in the foreground
+    and reports every outcome; "status" shows the queue. `batch` and
+    `verify` change the queue's settings.
+    """
+    from agt import mergequeue
+    from agt.push import agent_branch
+    from agt.registry import read_branch_commit
+    
+    root = get_repo_root(Path.cwd())
+    if batch is not None or verify is not None:
+        mergequeue.set_config(root, batch=batch, verify=verify)
+    
+    if action == "status":
+        config = mergequeue.get_config(root)
+        running = "running" if mergequeue.is_merger_running(root) else "idle"
+        safe_print(f"Merge queue: batch {config['batch']}, verify: {config['verify'] or '-'}, merger {running}")
+        blocked = mergequeue.get_blocked(root)
+        if blocked:
+            safe_print(f"⚠️  Blocked: {blocked['detail']}")
+        for entry in mergequeue.list_queue(root):
+            safe_print(f"  {entry['agent_id']}: {entry['branch']} ({entry['commit'][:12]})")
+        return
+    
+    if action == "run":
+        def report(outcome: dict) -> None:
+            ok = outcome["status"] == mergequeue.MERGED
+            safe_print(
+                f"{'✅' if ok else '❌'} {outcome['agent_id']}: {outcome['status']} ({outcome['detail']})",
+                file=sys.stdout if ok else sys.stderr,
+            )
+        
+        try:
+            outcomes = mergequeue.run_queue(root, remote, report=report)
+        except subprocess.CalledProcessError as e:
+            err(f"Merge queue stopped: {format_git_error(e)}")
+        except mergequeue.BaseVerificationError as e:
+            err(f"Merge queue stopped, branches left queued: {e}")
+        failed = [o for o in outcomes if o["status"] != mergequeue.MERGED]
+        if failed:
+            err(f"{len(failed)} of {len(outcomes)} queued branches were not merged")
+        safe_print(f"✅ Merge queue empty ({len(outcomes)} merged)")
+        return
+    
+    if all_agents:
+        agent_ids = list_worktrees(root)
+        if not agent_ids:
+            err("No worktrees found. Run 'agt ws new' first!")
+    elif not agent_ids:
+        agent_ids = [_resolve_worktree(root, agent_id, "agt ws merge --agent <id> --queue")[0]]
+    
+    # Check every branch before queueing any, so a typo queues nothing
+    targets = []
+    for target_id in dict.fromkeys(agent_ids):
+        branch = agent_branch(root, target_id)
+        commit = read_branch_commit(root, branch)
+        if commit is None:
+            err(f"Branch not found: {branch}")
+        targets.append((target_id, branch, commit))
+    for target_id, branch, commit in targets:
+        mergequeue.enqueue(root, target_id, branch, commit)
+    mergequeue.start_merger(root, remote)
+    safe_print(f"✅ Queued {len(agent_ids)} branch(es) for merging into {remote}/main")
+
+
+def cmd_conflicts(base: str = "main", agent_ids: Optional[list[str]] = None, as_json: bool = False) -> None:
+    """
+    Predict which agent branches will conflict with each other or with main.
+    
+    Prints a matrix followed by the colliding pairs, or the prediction as
+    JSON (see agt.conflicts.predict) for schedulers.
+    """
+    import json
+    
+    from agt.conflicts import CONFLICT, format_matrix, predict
+    
+    root = get_repo_root(Path.cwd())
+    agent_ids = agent_ids or list_worktrees(root)
+    try:
+        prediction = predict(root, agent_ids, base=base)
+    except subprocess.CalledProcessError as e:
+        err(f"Conflict check failed: {format_git_error(e)}")
+    except RuntimeError as e:
+        err(str(e))
+    
+    if as_json:
+        print(json.dumps(prediction, indent=2))
+        return
+    if not prediction["agents"]:
+        err("No agent branches found. Run 'agt ws new' first!")
+    for line in format_matrix(prediction):
+        print(line)
+    print()
+    conflicts = [pair for pair in prediction["pairs"] if pair["status"] == CONFLICT]
+    for pair in prediction["pairs"]:
+        if pair["status"] == CONFLICT:
+            safe_print(f"❌ {pair['a']} <-> {pair['b']}: conflicts in {', '.join(pair['conflicts'])}")
+        else:
+            print(f"~ {pair['a']} <-> {pair['b']}: both change {', '.join(pair['overlap'])} (merges cleanly)")
+    if not conflicts:
+        safe_print(f"✅ No conflicts among {len(prediction['agents'])} branch(es) and {base}")
+
+
+def cmd_clean(agent_id: Optional[str] = None) -> None:
+    """Remove the agent worktree."""
+    root = get_repo_root(Path.cwd())
+    
+    if not agent_id:
+        agent_id = get_current_agent_id(root, cwd=Path.cwd())
+    
+    if not agent_id:
+        worktrees = list_worktrees(root)
+        if not worktrees:
+            err("No worktrees found. Nothing to clean.")
+        else:
+            err(
+                f"Multiple worktrees found: {', '.join(worktrees)}\n"
+                f"Either:\n"
+                f"  - Run command from within worktree directory: cd .work/agent-xxxx\n"
+                f"  - Specify agent ID: agt ws clean --agent <id>"
+            )
+    
+    worktree_path = get_worktree_path(root, agent_id)
+    
+    if not worktree_path.exists():
+        err(f"Worktree not found: {worktree_path}. Run 'agt ws new' first!")
+    
+    remove_worktree(root, agent_id)
+    safe_print(f"✅ Worktree removed ({agent_id})")
+
+
+def cmd_gc(
+    max_age: Optional[str] = None,
+    merged: bool = False,
+    empty: bool = False,
+    orphaned: bool = False,
+    dry_run: bool = False,
+    maintenance: bool = False,
+    jobs: Optional[int] = None,
+) -> None:
+    """
+    Remove abandoned agent worktrees and branches matching any given policy.
+    
+    With `dry_run`, only prints the plan. See agt.gc for the policies.
+    """
+    from agt import gc
+    from agt.metrics import parse_since
+    
+    root = get_repo_root(Path.cwd())
+    
+    older_than = None
+    if max_age:
+        try:
+            older_than = parse_since(max_age)
+        except ValueError:
+            err(f"Invalid --max-age value: {max_age} (use e.g. 12h, 7d or an ISO date)")
+    policies = [
+        policy
+        for policy, selected in ((gc.AGE, max_age), (gc.MERGED, merged), (gc.EMPTY, empty), (gc.ORPHANED, orphaned))
+        if selected
+    ]
+    if not policies:
+        err("Usage: agt ws gc [--max-age 7d] [--merged] [--empty] [--orphaned] [--dry-run] [--maintenance] [--jobs N]")
+    
+    try:
+        matches = gc.plan(root, policies, older_than=older_than, jobs=jobs)
+    except subprocess.CalledProcessError as e:
+        err(f"gc failed: {format_git_error(e)}")
+    
+    for match in matches:
+        target = match["agent_id"] if match["path"] is not None else f"{match['branch']} (no worktree)"
+        line = f"{target}: {', '.join(match['reasons'])}, {match['bytes'] / 1024 / 1024:.1f} MB"
+        if match["keep"]:
+            line += f" - kept ({match['keep']})"
+        elif match["keep_branch"]:
+            line += f" - {match['branch']} kept (unmerged commits)"
+        safe_print(line)
+    
+    planned = [match for match in matches if not match["keep"]]
+    if dry_run:
+        planned_bytes = sum(match["bytes"] for match in planned)
+        safe_print(f"Would remove {len(planned)} worktree(s)/branch(es), {planned_bytes / 1024 / 1024:.1f} MB")
+        return
+    if not planned:
+        safe_print("✅ Nothing to remove")
+        return
+    
+    results = gc.collect(root, planned, jobs=jobs)
+    failed = [r for r in results if r["error"]]
+    for r in failed:
+        safe_print(f"❌ {r['agent_id']}: {r['error']}", file=sys.stderr)
+    reclaimed = sum(r["bytes"] for r in results)
+    safe_print(f"✅ Removed {len(results) - len(failed)} worktree(s)/branch(es), reclaimed {reclaimed / 1024 / 1024:.1f} MB")
+    if maintenance:
+        gc.start_maintenance(root)
+        safe_print("🚀 git maintenance started in the background")
+    if failed:
+        err(f"{len(failed)} of {len(results)} could not be removed")
+
+
+def cmd_pipeline(plan_path: str, jobs: Optional[int] = None, retries: Optional[int] = None) -> None:
+    """
+    Run a multi-agent pipeline plan in this process (see agt.pipeline).
+    
+    `jobs` and `retries` override the plan's parallelism and retry count.
+    """
+    import asyncio
+    
+    from agt import pipeline
+    from agt.lock import file_lock
+    
+    root = get_repo_root(Path.cwd())
+    path = Path(plan_path)
+    
+    try:
+        plan = pipeline.load_plan(path)
+    except FileNotFoundError:
+        err(f"Plan not found: {path}")
+    except ImportError:
+        err("YAML plans need PyYAML: pip install 'agent-tools-drnt[pipeline]' (or use a .json plan)")
+    except ValueError as e:
+        err(f"Invalid plan {path}: {e}")
+    
+    state_path = pipeline.get_state_path(root, path)
+    with file_lock(state_path.with_suffix(".lock"), blocking=False) as locked:
+        if not locked:
+            err(f"Pipeline {path.stem} is already running")
+        outcomes = asyncio.run(pipeline.run_pipeline(root, plan, state_path, jobs=jobs, retries=retries))
+    
+    unfinished = [name for name, outcome in outcomes.items() if outcome != pipeline.DONE]
+    if unfinished:
+        err(f"{len(unfinished)} of {len(outcomes)} agents did not finish: {', '.join(unfinished)}")
+    safe_print(f"✅ Pipeline {path.stem} complete ({len(outcomes)} agents)")
+
+
+def cmd_pool(action: str, base_branch: Optional[str] = None, size: Optional[int] = None) -> None:
+    """Manage the warm pool of pre-checked-out worktrees."""
+    from agt.pool import drain_pool, fill_pool, get_pool_sizes, list_pooled, set_pool_size
+    
+    root = get_repo_root(Path.cwd())
+    sizes = get_pool_sizes(root)
+    
+    if action == "status":
+        if not sizes:
+            safe_print("Pool is not configured. Run 'agt ws pool fill [base-branch] --size N' first!")
+            return
+        for base, target in sorted(sizes.items()):
+            safe_print(f"{base}: {len(list_pooled(root, base))}/{target} ready")
+    
+    elif action == "fill":
+        base_branch = base_branch or "main"
+        if size is not None:
+            set_pool_size(root, base_branch, size)
+        try:
+            created = fill_pool(root, base_branch)
+        except subprocess.CalledProcessError as e:
+            err(f"Failed to fill pool for {base_branch}: {format_git_error(e)}")
+        target = get_pool_sizes(root).get(base_branch, 0)
+        safe_print(f"✅ Pool {base_branch}: {len(list_pooled(root, base_branch))}/{target} ready ({created} created)")
+    
+    elif action == "drain":
+        bases = [base_branch] if base_branch else sorted(sizes)
+        for base in bases:
+            set_pool_size(root, base, 0)
+            removed = drain_pool(root, base)
+            safe_print(f"✅ Pool {base} drained ({removed} removed)")
+    
+    else:
+        err(f"Unknown pool action: {action}. Available: status, fill, drain")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark `agt ws status` / `git add -A` with and without the fast index setup.
+
+Builds a synthetic repository (200k files by default), checks out two
+worktrees of it - one with git's defaults, one configured by
+agt.worktree.configure_fast_index - dirties both the same way and times
+`git status --porcelain` and `git add -A` in each.
+
+    python scripts/bench_ws_status.py [--files N] [--repeat N] [--keep]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "agt"))
+
+from agt.worktree import configure_fast_index  # noqa: E402
+
+FILES_PER_DIR = 500
+
+
+def git(*args: str, cwd: Path) -> None:
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def build_repo(root: Path, files: int) -> None:
+    """Create a repository with `files` small files spread over directories."""
+    print(f"Creating {files} files in {root} ...", flush=True)
+    git("init", "-q", "-b", "main", cwd=root)
+    for n in range(files):
+        directory = root / f"pkg{n // FILES_PER_DIR // 20:03d}" / f"mod{n // FILES_PER_DIR:04d}"
+        if n % FILES_PER_DIR == 0:
+            directory.mkdir(parents=True)
+        (directory / f"file{n}.txt").write_text(f"content {n}\n")
+    print("Committing ...", flush=True)
+    git("add", "-A", cwd=root)
+    git("-c", "user.name=bench", "-c", "user.email=bench@example.com", "commit", "-q", "-m", "synthetic", cwd=root)
+
+
+def dirty(worktree: Path) -> None:
+    """Modify a handful of tracked files and add some untracked ones."""
+    for path in sorted(worktree.glob("pkg000/mod000*/file*.txt"))[:20]:
+        path.write_text("changed\n")
+    scratch = worktree / "pkg001" / "scratch"
+    scratch.mkdir()
+    for n in range(20):
+        (scratch / f"new{n}.txt").write_text("new\n")
+
+
+def timed(cmd: list[str], cwd: Path, repeat: int) -> float:
+    """Median wall time of `cmd` over `repeat` runs, after one warm-up run."""
+    subprocess.run(cmd, cwd=cwd, check=True, capture_output=True)
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(cmd, cwd=cwd, check=True, capture_output=True)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=200_000, help="number of files (default 200000)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per command (default 5)")
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic repository")
+    args = parser.parse_args()
+
+    base = Path(tempfile.mkdtemp(prefix="agt-bench-status-"))
+    root = base / "repo"
+    root.mkdir()
+    try:
+        build_repo(root, args.files)
+        plain, fast = root / ".work" / "plain", root / ".work" / "fast"
+        for path in (plain, fast):
+            git("worktree", "add", "-q", "--detach", str(path), "main", cwd=root)
+        configure_fast_index(root, fast)
+        for path in (plain, fast):
+            dirty(path)
+
+        status = ["git", "status", "--porcelain"]
+        # --dry-run stages nothing, so every run does the same work
+        print(f"\n{'':<22}{'default':>10}{'fast':>10}{'speedup':>10}")
+        for label, cmd in (("git status", status), ("git add -A (dry run)", ["git", "add", "-A", "--dry-run"])):
+            t_plain = timed(cmd, plain, args.repeat)
+            t_fast = timed(cmd, fast, args.repeat)
+            print(f"{label:<22}{t_plain * 1000:>8.0f}ms{t_fast * 1000:>8.0f}ms{t_plain / t_fast:>9.1f}x")
+        fsmonitor = "on" if sys.platform in ("darwin", "win32") else "unavailable on this platform"
+        index_kib = [os.path.getsize(root / ".git" / "worktrees" / name / "index") // 1024 for name in ("plain", "fast")]
+        print(f"\nfsmonitor: {fsmonitor}")
+        print(f"index rewritten per update: default {index_kib[0]} KiB, fast {index_kib[1]} KiB (split index)")
+    finally:
+        if args.keep:
+            print(f"Kept {root}")
+        else:
+            shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Shared fixtures for the agt test suite (helpers live in helpers.py)."""
+
+import pytest
+
+from helpers import run_git
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    """Create a temporary Git repository with a main branch."""
+    repo = tmp_path / "test_repo"
+    repo.mkdir()
+    run_git(repo, "init", "-b", "main")
+    run_git(repo, "config", "user.name", "Test User")
+    run_git(repo, "config", "user.email", "test@example.com")
+    (repo / "README.md").write_text("# Test\n")
+    run_git(repo, "add", "README.md")
+    run_git(repo, "commit", "-m", "Initial")
+    return repo.resolve()
+
+
+@pytest.fixture
+def origin(git_repo, tmp_path):
+    """Add an empty bare repository as the test repository's origin."""
+    path = tmp_path / "origin.git"
+    run_git(tmp_path, "init", "--bare", "-b", "main", str(path))
+    run_git(git_repo, "remote", "add", "origin", str(path))
+    return path
@@ -0,0 +1,30 @@
+"""Helpers shared by the agt tests."""
+
+import os
+import subprocess
+import sys
+
+
+def run_agt(cwd, *args, input=None):
+    """Run agt in-process (bypassing agtd) and capture its output as text."""
+    return subprocess.run(
+        [sys.executable, "-m", "agt", *args],
+        cwd=cwd,
+        input=input,
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, AGT_NO_DAEMON="1"),
+    )
+
+
+def run_git(cwd, *args):
+    """Run git, failing the test on error; returns its stripped stdout."""
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def commit_file(cwd, name):
+    """Commit a new file `name` (containing its own name); returns the new HEAD."""
+    (cwd / name).write_text(f"{name}\n")
+    run_git(cwd, "add", name)
+    run_git(cwd, "commit", "-m", f"add {name}")
+    return run_git(cwd, "rev-parse", "HEAD")
@@ -0,0 +1,116 @@
+"""Tests for agt.api module - asyncio library API."""
+
+import asyncio
+import os
+import subprocess
+
+import pytest
+
+from agt import api, registry
+from agt.metrics import read_runs
+
+from helpers import run_git
+
+
+@pytest.fixture
+def git_repo(git_repo, origin):
+    """The test repository with main pushed to a bare origin."""
+    run_git(git_repo, "push", "-q", "origin", "main")
+    return git_repo
+
+
+def _rev(repo, ref):
+    return subprocess.run(["git", "rev-parse", ref], cwd=repo, capture_output=True, text=True).stdout.strip()
+
+
+def test_concurrent_lifecycles(git_repo):
+    """Test that one event loop drives many agents from start to clean."""
+    async def lifecycle(n):
+        wt = await api.start(root=git_repo)
+        result = await api.run(wt.agent_id, f"echo {n} > file{n}.txt && echo done && echo warn >&2", root=git_repo)
+        assert result.ok
+        assert result.stdout == b"done\n"
+        assert result.stderr == b"warn\n"
+        committed = await api.commit(wt.agent_id, f"add file{n}", root=git_repo)
+        assert committed.commit == _rev(wt.path, "HEAD")
+        return wt
+    
+    async def main():
+        return await asyncio.gather(*(lifecycle(n) for n in range(12)))
+    
+    worktrees = asyncio.run(main())
+    
+    assert len({wt.agent_id for wt in worktrees}) == 12
+    assert sorted(e["agent_id"] for e in registry.list_entries(git_repo)) == sorted(wt.agent_id for wt in worktrees)
+    # The embedding process owns them, not its parent
+    assert {e["owner_pid"] for e in registry.list_entries(git_repo)} == {os.getpid()}
+    assert len(read_runs(git_repo)) == 12
+    
+    async def clean_all():
+        return await asyncio.gather(*(api.clean(wt.agent_id, root=git_repo) for wt in worktrees))
+    
+    removed = asyncio.run(clean_all())
+    assert [wt.agent_id for wt in removed] == [wt.agent_id for wt in worktrees]
+    assert registry.list_entries(git_repo) == []
+    assert not any(wt.path.exists() for wt in worktrees)
+
+
+def test_failures_are_results_or_errors(git_repo):
+    """Test that a failing command is a result and a failing operation raises AgtError."""
+    async def main():
+        wt = await api.start(root=git_repo)
+        result = await api.run(wt.agent_id, "exit 3", root=git_repo)
+        assert result.exit_status == 3
+        assert not result.ok
+        with pytest.raises(api.AgtError) as excinfo:
+            await api.commit(wt.agent_id, "nothing to commit", root=git_repo)
+        assert excinfo.value.returncode == 1
+        with pytest.raises(api.AgtError, match="Worktree not found"):
+            await api.run("agent-missing", "true", root=git_repo)
+        with pytest.raises(api.AgtError, match="git worktree failed"):
+            await api.start("no-such-branch", root=git_repo)
+    
+    asyncio.run(main())
+    assert len(registry.list_entries(git_repo)) == 1
+
+
+def test_cancelled_run_kills_the_command(git_repo):
+    """Test that cancelling run() terminates the command instead of leaking it."""
+    async def main():
+        wt = await api.start(root=git_repo)
+        task = asyncio.create_task(api.run(wt.agent_id, "sleep 31.7; true", root=git_repo))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    
+    asyncio.run(main())
+    ps = subprocess.run(["pgrep", "-f", "sleep 31.7"], capture_output=True, text=True)
+    assert ps.stdout == ""
+    assert read_runs(git_repo) == []
+
+
+def test_push_and_merge(git_repo):
+    """Test pushing agent branches and fast-forwarding main in turn."""
+    origin = git_repo.parent / "origin.git"
+    
+    async def land(n):
+        wt = await api.start(root=git_repo)
+        await api.run(wt.agent_id, f"echo {n} > file{n}.txt", root=git_repo)
+        await api.commit(wt.agent_id, f"add file{n}", root=git_repo)
+        pushed = await api.push(wt.agent_id, root=git_repo)
+        assert pushed.branch == f"feat/{wt.agent_id}"
+        return await api.merge(wt.agent_id, root=git_repo)
+    
+    async def main():
+        # Non-overlapping changes: the merges serialize on main
+        first = await land(1)
+        second = await land(2)
+        return first, second
+    
+    first, second = asyncio.run(main())
+    assert _rev(git_repo, "main") == second.commit
+    assert _rev(origin, "main") == second.commit
+    assert _rev(origin, f"refs/heads/{second.branch}") != ""
+    assert (git_repo / "file1.txt").exists() and (git_repo / "file2.txt").exists()
+    assert first.commit != second.commit
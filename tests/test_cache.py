@@ -0,0 +1,76 @@
+"""Tests for agt.cache module - content-addressed run cache."""
+
+import os
+import subprocess
+
+from agt import cache
+from agt.worktree import add_worktree
+
+from helpers import run_agt
+
+
+def test_cache_key_tracks_dirty_and_untracked_state(git_repo):
+    """Test that edits and new files change the key, and identical trees share it."""
+    first, _ = add_worktree(git_repo, "agent-one", "main")
+    second, _ = add_worktree(git_repo, "agent-two", "main")
+    
+    key = cache.cache_key(first, "pytest -q")
+    assert cache.cache_key(second, "pytest -q") == key
+    assert cache.cache_key(first, "ruff check") != key
+    
+    (first / "README.md").write_text("# Changed\n")
+    dirty = cache.cache_key(first, "pytest -q")
+    assert dirty != key
+    (first / "new.txt").write_text("new\n")
+    assert cache.cache_key(first, "pytest -q") != dirty
+    # The real index is untouched
+    status = subprocess.run(["git", "status", "--porcelain"], cwd=first, capture_output=True, text=True)
+    assert status.stdout.splitlines() == [" M README.md", "?? new.txt"]
+
+
+def test_store_lookup_and_stats(git_repo):
+    """Test round-tripping records and counting hits and misses."""
+    assert cache.lookup(git_repo, "ab" * 32) is None
+    
+    records = [(cache.STDOUT, b"out\n"), (cache.STDERR, b"err\n"), (cache.STDOUT, b"more\n")]
+    cache.store(git_repo, "ab" * 32, records, 3)
+    
+    assert cache.lookup(git_repo, "ab" * 32) == (records, 3)
+    stats = cache.get_stats(git_repo)
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 1)
+    assert cache.clear(git_repo) == 1
+    assert cache.get_stats(git_repo)["entries"] == 0
+
+
+def test_evict_removes_least_recently_used(git_repo):
+    """Test that eviction keeps the most recently used entries within the bound."""
+    for i, key in enumerate(("aa" * 32, "bb" * 32, "cc" * 32)):
+        cache.store(git_repo, key, [(cache.STDOUT, b"x" * 100)], 0)
+        os.utime(cache._entry_path(git_repo, key), (1000 + i, 1000 + i))
+    cache.lookup(git_repo, "aa" * 32)  # refreshes its LRU position
+    
+    assert cache.evict(git_repo, max_bytes=300) == 1
+    
+    assert cache.lookup(git_repo, "bb" * 32) is None
+    assert cache.lookup(git_repo, "aa" * 32) is not None
+
+
+def test_ws_run_cache_replays_result(git_repo):
+    """Test that a second identical run is replayed, and a change reruns it."""
+    worktree_path, _ = add_worktree(git_repo, "agent-cache", "main")
+    command = "echo run >> ../runs.txt; echo out; echo err >&2; exit 2"
+    
+    first = run_agt(git_repo, "ws", "run", "--agent", "agent-cache", "--cache", command)
+    second = run_agt(git_repo, "ws", "run", "--agent", "agent-cache", "--cache", command)
+    
+    assert first.returncode == second.returncode == 2
+    assert first.stdout == second.stdout == "out\n"
+    assert "err\n" in second.stderr and "cached result" in second.stderr
+    assert (git_repo / ".work" / "runs.txt").read_text() == "run\n"
+    
+    (worktree_path / "README.md").write_text("# Changed\n")
+    run_agt(git_repo, "ws", "run", "--agent", "agent-cache", "--cache", command)
+    assert (git_repo / ".work" / "runs.txt").read_text() == "run\nrun\n"
+    
+    stats = run_agt(git_repo, "ws", "cache", "stats")
+    assert "1 hits, 2 misses" in stats.stdout
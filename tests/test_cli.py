@@ -3,6 +3,7 @@
 import os
 import subprocess
 import sys
+import time
 from pathlib import Path
 from unittest.mock import patch
 
@@ -12,6 +13,7 @@ import pytest
 sys.path.insert(0, str(Path(__file__).parent.parent / "agt"))
 
 from agt.cli import (
+    COMMANDS,
     cmd_clean,
     cmd_commit,
     cmd_push,
@@ -21,6 +23,8 @@ from agt.cli import (
     main,
 )
 
+from helpers import run_agt
+
 
 def test_err_function():
     """Test that err function prints message and exits."""
@@ -41,7 +45,7 @@ def test_cmd_start_creates_worktree(monkeypatch, tmp_path):
     subprocess.run(["git", "commit", "--allow-empty", "-m", "Initial"], cwd=repo, check=True, capture_output=True)
     
     # Mock get_repo_root to return our test repo
-    with patch("agt.cli.get_repo_root", return_value=repo):
+    with patch("agt.ws.get_repo_root", return_value=repo):
         # Clear AGENT_ID if set
         if "AGENT_ID" in os.environ:
             monkeypatch.delenv("AGENT_ID")
@@ -132,13 +136,21 @@ def test_main_start_command(monkeypatch, tmp_path):
     if "AGENT_ID" in os.environ:
         monkeypatch.delenv("AGENT_ID")
     
-    with patch("agt.cli.get_repo_root", return_value=repo):
+    with patch("agt.ws.get_repo_root", return_value=repo):
         with patch("sys.argv", ["agt", "start"]):
             main()
         
         assert "AGENT_ID" in os.environ
 
 
+def test_help_lists_every_domain():
+    """Test that the DOMAINS section of the help names every registered domain."""
+    out = run_agt(Path.cwd(), "--help").stdout
+    domains = out.split("DOMAINS:")[1].split("\n\n")[0]
+    listed = {line.split()[0] for line in domains.strip().splitlines()}
+    assert listed == set(COMMANDS)
+
+
 def test_main_commit_command_missing_message(monkeypatch):
     """Test that main commit command fails without message."""
     if "AGENT_ID" in os.environ:
@@ -162,3 +174,55 @@ def test_main_run_command_missing_command(monkeypatch):
     
     assert exc_info.value.code == 1
 
+
+
+# Allowed cold-start overhead of `agt --version` over a bare interpreter start
+STARTUP_BUDGET_MS = float(os.environ.get("AGT_STARTUP_BUDGET_MS", "60"))
+
+
+def _best_wall_time_ms(args: list[str], runs: int = 5) -> float:
+    """Best-of-N wall time of a fresh process, in milliseconds."""
+    env = dict(os.environ, AGT_NO_DAEMON="1")
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, check=True, capture_output=True, env=env)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def test_entry_point_imports_no_command_modules():
+    """Importing agt.cli must not pull in domain handlers or their dependencies."""
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, agt.cli; print(' '.join(sorted(sys.modules)))"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    loaded = set(result.stdout.split())
+    for module in ("agt.ws", "agt.worktree", "agt.vscode", "subprocess", "json", "hashlib"):
+        assert module not in loaded
+
+
+def test_profile_startup_reports_phases():
+    """--profile-startup runs the command and reports import and dispatch time."""
+    result = subprocess.run(
+        [sys.executable, "-m", "agt", "--profile-startup", "env", "check"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert "Python" in result.stdout
+    assert "agt startup profile" in result.stderr
+    assert "import agt.env" in result.stderr
+    assert "dispatch" in result.stderr
+
+
+def test_cold_start_within_budget():
+    """`agt --version` stays within the start-up budget."""
+    baseline = _best_wall_time_ms([sys.executable, "-c", "pass"])
+    agt = _best_wall_time_ms([sys.executable, "-m", "agt", "--version"])
+    assert agt - baseline <= STARTUP_BUDGET_MS, (
+        f"agt cold start took {agt - baseline:.1f} ms over the interpreter "
+        f"(budget {STARTUP_BUDGET_MS:.0f} ms); see `agt --profile-startup`"
+    )
@@ -0,0 +1,100 @@
+"""Tests for agt.conflicts module - cross-agent conflict prediction."""
+
+import json
+
+import pytest
+
+from agt import conflicts
+from agt.worktree import add_worktree
+
+from helpers import run_agt, run_git
+
+
+@pytest.fixture
+def git_repo(git_repo):
+    """The test repository with a five-line shared.txt agents edit."""
+    (git_repo / "shared.txt").write_text("one\ntwo\nthree\nfour\nfive\n")
+    run_git(git_repo, "add", "-A")
+    run_git(git_repo, "commit", "-q", "--amend", "--no-edit")
+    return git_repo
+
+
+def _agent(repo, agent_id, files):
+    worktree_path, _ = add_worktree(repo, agent_id, "main")
+    _commit(worktree_path, files)
+    return worktree_path
+
+
+def _commit(cwd, files):
+    for name, content in files.items():
+        (cwd / name).parent.mkdir(parents=True, exist_ok=True)
+        (cwd / name).write_text(content)
+    run_git(cwd, "add", "-A")
+    run_git(cwd, "commit", "-m", "work")
+
+
+def _pairs(prediction):
+    return {(p["a"], p["b"]): p for p in prediction["pairs"]}
+
+
+def test_predicts_overlap_and_conflicts(git_repo):
+    """Test that disjoint branches are clean, overlapping ones are merged and conflicts named."""
+    _agent(git_repo, "agent-cfl00001", {"shared.txt": "ONE\ntwo\nthree\nfour\nfive\n"})
+    _agent(git_repo, "agent-cfl00002", {"shared.txt": "one\ntwo\nthree\nfour\nFIVE\n"})
+    _agent(git_repo, "agent-cfl00003", {"shared.txt": "1\ntwo\nthree\nfour\nfive\n"})
+    _agent(git_repo, "agent-cfl00004", {"docs": "a file\n"})
+    _agent(git_repo, "agent-cfl00005", {"docs/guide.md": "a directory\n"})
+    _commit(git_repo, {"README.md": "# Changed on main\n"})
+    _agent(git_repo, "agent-cfl00006", {"README.md": "# Agent readme\n"})
+    
+    ids = [f"agent-cfl0000{n}" for n in range(1, 7)]
+    prediction = conflicts.predict(git_repo, ids)
+    pairs = _pairs(prediction)
+    assert pairs[("agent-cfl00001", "agent-cfl00002")]["status"] == "overlap"
+    assert pairs[("agent-cfl00001", "agent-cfl00003")]["conflicts"] == ["shared.txt"]
+    assert pairs[("agent-cfl00002", "agent-cfl00003")]["status"] == "overlap"
+    assert pairs[("agent-cfl00004", "agent-cfl00005")]["status"] == "conflict"
+    # Forked after main changed README.md: no conflict with main
+    assert ("main", "agent-cfl00006") not in pairs
+    assert len(pairs) == 4
+    assert [a["paths"] for a in prediction["agents"]] == [1, 1, 1, 1, 1, 1]
+    
+    lines = conflicts.format_matrix(prediction)
+    assert len(lines) == 8
+    assert lines[2].split()[-6:] == ["-", "~", "X", ".", ".", "."]
+
+
+def test_conflict_with_main_and_cache(git_repo, monkeypatch):
+    """Test a conflict with main and that a repeated query reuses cached merges."""
+    _agent(git_repo, "agent-cfl00011", {"README.md": "# Agent\n"})
+    _agent(git_repo, "agent-cfl00012", {"README.md": "# Agent\n", "other.txt": "x\n"})
+    _commit(git_repo, {"README.md": "# Main\n"})
+    
+    ids = ["agent-cfl00011", "agent-cfl00012"]
+    first = conflicts.predict(git_repo, ids)
+    pairs = _pairs(first)
+    assert pairs[("main", "agent-cfl00011")]["conflicts"] == ["README.md"]
+    assert pairs[("agent-cfl00011", "agent-cfl00012")]["status"] == "overlap"
+    
+    def fail(*args):
+        raise AssertionError("merge-tree should not run for cached pairs")
+    
+    monkeypatch.setattr("agt.merge.conflicting_paths", fail)
+    assert conflicts.predict(git_repo, ids) == first
+
+
+def test_ws_conflicts_cli(git_repo):
+    """Test `agt ws conflicts` matrix and JSON output."""
+    _agent(git_repo, "agent-cfl00021", {"README.md": "# One\n"})
+    _agent(git_repo, "agent-cfl00022", {"README.md": "# Two\n"})
+    
+    result = run_agt(git_repo, "ws", "conflicts")
+    assert result.returncode == 0, result.stderr
+    assert "agent-cfl00021 <-> agent-cfl00022: conflicts in README.md" in result.stdout
+    
+    result = run_agt(git_repo, "ws", "conflicts", "--json", "--agents", "agent-cfl00021")
+    assert result.returncode == 0, result.stderr
+    data = json.loads(result.stdout)
+    assert data["base"]["ref"] == "main"
+    assert [a["agent_id"] for a in data["agents"]] == ["agent-cfl00021"]
+    assert data["pairs"] == []
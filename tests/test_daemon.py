@@ -0,0 +1,150 @@
+"""Tests for agt.daemon module - agtd forwarding."""
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from agt.daemon import get_socket_path, is_supported
+
+pytestmark = pytest.mark.skipif(not is_supported(), reason="agtd needs Unix sockets and fork")
+
+
+@pytest.fixture
+def daemon(git_repo):
+    """Run agtd in the foreground for the test repository."""
+    env = os.environ.copy()
+    env.pop("AGT_NO_DAEMON", None)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "agt.daemon", "start", "--foreground"],
+        cwd=git_repo,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    socket_path = get_socket_path(git_repo)
+    deadline = time.monotonic() + 10
+    while not socket_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    yield proc
+    subprocess.run([sys.executable, "-m", "agt.daemon", "stop"], cwd=git_repo, capture_output=True)
+    proc.wait(timeout=10)
+
+
+def _agt(args, cwd, **env):
+    full_env = os.environ.copy()
+    full_env.pop("AGT_NO_DAEMON", None)
+    full_env.update(env)
+    return subprocess.run(
+        [sys.executable, "-m", "agt", *args],
+        cwd=cwd, env=full_env, capture_output=True, text=True,
+    )
+
+
+def test_commands_are_forwarded_to_daemon(git_repo, daemon):
+    """Test that agt runs commands through agtd with the client's stdio and cwd."""
+    result = _agt(["ws", "new"], git_repo)
+    assert result.returncode == 0
+    agent_id = result.stdout.strip().splitlines()[-1].split("=", 1)[1]
+    
+    worktree_path = git_repo / ".work" / agent_id
+    result = _agt(["ws", "run", "pwd; echo oops >&2; exit 3"], worktree_path)
+    assert result.returncode == 3
+    assert result.stdout.strip() == str(worktree_path)
+    assert result.stderr.strip() == "oops"
+    
+    status = subprocess.run(
+        [sys.executable, "-m", "agt.daemon", "status"],
+        cwd=git_repo, capture_output=True, text=True,
+    )
+    assert "2 commands served" in status.stdout
+
+
+def test_no_daemon_env_dispatches_in_process(git_repo, daemon):
+    """Test that AGT_NO_DAEMON bypasses a running daemon."""
+    result = _agt(["env", "check"], git_repo, AGT_NO_DAEMON="1")
+    assert result.returncode == 0
+    
+    status = subprocess.run(
+        [sys.executable, "-m", "agt.daemon", "status"],
+        cwd=git_repo, capture_output=True, text=True,
+    )
+    assert "0 commands served" in status.stdout
+
+
+def test_long_path_socket_lives_in_private_dir(tmp_path, monkeypatch):
+    """Test that a socket too long for .work/ goes to a 0700 directory of the current user."""
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    socket_path = get_socket_path(tmp_path / ("x" * 120))
+    assert socket_path.parent == tmp_path / f"agtd-{os.getuid()}"
+    st = os.lstat(socket_path.parent)
+    assert st.st_uid == os.getuid()
+    assert st.st_mode & 0o777 == 0o700
+    
+    # A directory someone else could write to is refused
+    os.chmod(socket_path.parent, 0o777)
+    with pytest.raises(PermissionError):
+        get_socket_path(tmp_path / ("x" * 120))
+
+
+def test_socket_of_another_user_is_not_used(git_repo, daemon, monkeypatch):
+    """Test that nothing is forwarded to a socket owned by another uid."""
+    from agt import daemon as agtd
+    
+    conn = agtd._connect(git_repo)
+    assert conn is not None
+    conn.close()
+    monkeypatch.setattr(os, "getuid", lambda: os.geteuid() + 1)
+    assert agtd._connect(git_repo) is None
+
+
+def test_socket_is_private(git_repo, daemon):
+    """Test that the daemon creates its socket with mode 0600."""
+    assert os.stat(get_socket_path(git_repo)).st_mode & 0o777 == 0o600
+
+
+def test_forwarded_worktree_is_owned_by_client_parent(git_repo, daemon):
+    """Test that a worktree created through agtd is owned by the caller, not the daemon."""
+    from agt import registry
+    
+    result = _agt(["ws", "new"], git_repo)
+    assert result.returncode == 0, result.stderr
+    agent_id = result.stdout.strip().splitlines()[-1].split("=", 1)[1]
+    
+    status = subprocess.run(
+        [sys.executable, "-m", "agt.daemon", "status"],
+        cwd=git_repo, capture_output=True, text=True,
+    )
+    assert "1 commands served" in status.stdout
+    # The agt client was started directly by this process
+    assert registry.get_entry(git_repo, agent_id)["owner_pid"] == os.getpid()
+
+
+def test_silent_client_does_not_block_others(git_repo, daemon):
+    """Test that a client that connects and sends nothing is dropped after the handshake timeout."""
+    import socket
+    
+    from agt.daemon import HANDSHAKE_TIMEOUT
+    
+    silent = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    silent.connect(str(get_socket_path(git_repo)))
+    try:
+        started = time.monotonic()
+        result = subprocess.run(
+            [sys.executable, "-m", "agt", "ws", "new"],
+            cwd=git_repo, capture_output=True, text=True, timeout=HANDSHAKE_TIMEOUT + 20,
+            env={k: v for k, v in os.environ.items() if k != "AGT_NO_DAEMON"},
+        )
+        assert result.returncode == 0, result.stderr
+        assert time.monotonic() - started < HANDSHAKE_TIMEOUT + 10
+    finally:
+        silent.close()
+    
+    status = subprocess.run(
+        [sys.executable, "-m", "agt.daemon", "status"],
+        cwd=git_repo, capture_output=True, text=True,
+    )
+    assert "1 commands served" in status.stdout
@@ -0,0 +1,85 @@
+"""Tests for agt.fetch module - shared, rate-limited fetch."""
+
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from agt import fetch
+
+from helpers import run_git
+
+
+@pytest.fixture
+def git_repo(git_repo, origin):
+    """The test repository with main pushed to a bare origin."""
+    run_git(git_repo, "push", "-q", "origin", "main")
+    return git_repo
+
+
+def _advance_origin(repo):
+    """Move origin's main without the local tracking ref noticing."""
+    run_git(repo, "commit", "--allow-empty", "-m", "more")
+    run_git(repo, "push", "-q", str(repo.parent / "origin.git"), "HEAD:main")
+    return run_git(repo, "rev-parse", "HEAD")
+
+
+def test_reuses_fetch_within_window(git_repo):
+    """Test that a fetch is reused inside the window and repeated after it."""
+    first = fetch.fetch(git_repo, max_age=60)
+    assert first == run_git(git_repo, "rev-parse", "main")
+    newer = _advance_origin(git_repo)
+    
+    assert fetch.fetch(git_repo, max_age=60) == first
+    assert fetch.fetch(git_repo, max_age=0) == newer
+    assert fetch.get_stats(git_repo) == {"origin/main": {"fetches": 2, "saved": 1}}
+    # State lives in the common git dir, shared by all worktrees
+    assert (git_repo / ".git" / "agt-fetch" / "stats.json").exists()
+
+
+def test_concurrent_callers_share_one_fetch(git_repo):
+    """Test that callers arriving together wait for the fetch in flight."""
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(fetch.fetch(git_repo, max_age=60)))
+        for _ in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(results)) == 1
+    assert fetch.get_stats(git_repo)["origin/main"] == {"fetches": 1, "saved": 5}
+
+
+def test_note_pushed_counts_as_fresh(git_repo):
+    """Test that a recorded push moves the tracking ref without a fetch."""
+    newer = _advance_origin(git_repo)
+    fetch.note_pushed(git_repo, "origin", "main", newer)
+    assert fetch.fetch(git_repo, max_age=60) == newer
+    assert fetch.get_stats(git_repo)["origin/main"] == {"fetches": 0, "saved": 1}
+
+
+def test_ws_fetch_stats(git_repo):
+    """Test `agt ws fetch stats`, and that the run cache statistics leave fetches out."""
+    env = dict(os.environ, AGT_NO_DAEMON="1")
+    result = subprocess.run(
+        [sys.executable, "-m", "agt", "ws", "fetch"], cwd=git_repo, capture_output=True, text=True, env=env
+    )
+    assert result.stdout.strip() == "No fetches recorded yet"
+    
+    fetch.fetch(git_repo, max_age=60)
+    fetch.fetch(git_repo, max_age=60)
+    result = subprocess.run(
+        [sys.executable, "-m", "agt", "ws", "fetch", "stats"], cwd=git_repo, capture_output=True, text=True, env=env
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "origin/main: 1 fetches, 1 saved"
+    
+    result = subprocess.run(
+        [sys.executable, "-m", "agt", "ws", "cache", "stats"], cwd=git_repo, capture_output=True, text=True, env=env
+    )
+    assert result.returncode == 0, result.stderr
+    assert "fetch" not in result.stdout
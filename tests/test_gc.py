@@ -0,0 +1,108 @@
+"""Tests for agt.gc module - garbage collection of worktrees and branches."""
+
+import subprocess
+import sys
+import time
+
+from agt import gc
+from agt.worktree import add_worktree, list_worktrees
+
+from helpers import commit_file, run_agt, run_git
+
+
+def _branches(repo):
+    return run_git(repo, "for-each-ref", "--format=%(refname:short)", "refs/heads/feat/").split()
+
+
+def test_policies_select_matching_worktrees(git_repo, monkeypatch):
+    """Test the merged, empty and orphaned policies and that local changes are kept."""
+    merged_path, merged_branch = add_worktree(git_repo, "agent-gc000001", "main")
+    commit_file(merged_path, "merged.txt")
+    run_git(git_repo, "merge", "-q", "--ff-only", merged_branch)
+    add_worktree(git_repo, "agent-gc000002", "main")
+    busy_path, _ = add_worktree(git_repo, "agent-gc000003", "main")
+    commit_file(busy_path, "busy.txt")
+    dirty_path, _ = add_worktree(git_repo, "agent-gc000004", "main")
+    (dirty_path / "wip.txt").write_text("not committed\n")
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    monkeypatch.setenv("AGT_OWNER_PID", str(dead.pid))
+    orphan_path, _ = add_worktree(git_repo, "agent-gc000005", "main")
+    commit_file(orphan_path, "orphan.txt")
+    
+    reasons = {m["agent_id"]: m["reasons"] for m in gc.plan(git_repo, [gc.MERGED, gc.EMPTY, gc.ORPHANED])}
+    assert reasons == {
+        "agent-gc000001": ["merged"],
+        "agent-gc000002": ["empty"],
+        "agent-gc000004": ["empty"],
+        "agent-gc000005": ["orphaned"],
+    }
+    
+    matches = gc.plan(git_repo, [gc.MERGED, gc.EMPTY, gc.ORPHANED])
+    assert [m["keep"] for m in matches] == [None, None, "local changes", None]
+    assert all(m["bytes"] > 0 for m in matches)
+    results = gc.collect(git_repo, matches)
+    assert [r["agent_id"] for r in results] == ["agent-gc000001", "agent-gc000002", "agent-gc000005"]
+    assert not any(r["error"] for r in results)
+    assert list_worktrees(git_repo) == ["agent-gc000003", "agent-gc000004"]
+    # The orphan's worktree is gone, but its unmerged commit stays on its branch
+    assert [r["branch_deleted"] for r in results] == [True, True, False]
+    assert _branches(git_repo) == ["feat/agent-gc000003", "feat/agent-gc000004", "feat/agent-gc000005"]
+    assert not (git_repo / ".work" / "agent-gc000001").exists()
+
+
+def test_age_policy_and_branch_without_worktree(git_repo):
+    """Test the age cutoff and that branches left behind by a removed worktree are collected once merged."""
+    worktree_path, branch = add_worktree(git_repo, "agent-gc000010", "main")
+    commit_file(worktree_path, "a.txt")
+    run_git(git_repo, "worktree", "remove", str(worktree_path))
+    
+    assert gc.plan(git_repo, [gc.AGE], older_than=time.time() - 3600) == []
+    matches = gc.plan(git_repo, [gc.AGE, gc.ORPHANED], older_than=time.time() + 1)
+    assert [(m["branch"], m["path"], m["reasons"]) for m in matches] == [
+        ("feat/agent-gc000010", None, ["age", "orphaned"])
+    ]
+    
+    run_git(git_repo, "merge", "-q", "--ff-only", branch)
+    matches = gc.plan(git_repo, [gc.AGE, gc.ORPHANED], older_than=time.time() + 1)
+    assert [m["keep"] for m in matches] == [None]
+    gc.collect(git_repo, matches)
+    assert _branches(git_repo) == []
+
+
+def test_unmerged_branch_without_worktree_is_kept(git_repo):
+    """Test that a branch-only candidate with unpushed, unmerged commits is never deleted."""
+    worktree_path, branch = add_worktree(git_repo, "agent-gc000011", "main")
+    commit_file(worktree_path, "work.txt")
+    run_git(git_repo, "worktree", "remove", str(worktree_path))
+    
+    matches = gc.plan(git_repo, [gc.AGE, gc.ORPHANED], older_than=time.time() + 1)
+    assert [(m["branch"], m["keep"]) for m in matches] == [(branch, "unmerged commits")]
+    assert gc.collect(git_repo, matches) == []
+    assert _branches(git_repo) == [branch]
+    
+    result = run_agt(git_repo, "ws", "gc", "--orphaned")
+    assert result.returncode == 0, result.stderr
+    assert "kept (unmerged commits)" in result.stdout
+    assert _branches(git_repo) == [branch]
+
+
+def test_ws_gc_cli(git_repo):
+    """Test `agt ws gc` dry run, removal and the reclaimed bytes report."""
+    add_worktree(git_repo, "agent-gc000020", "main")
+    
+    result = run_agt(git_repo, "ws", "gc")
+    assert result.returncode == 1
+    assert "Usage: agt ws gc" in result.stderr
+    
+    result = run_agt(git_repo, "ws", "gc", "--empty", "--dry-run")
+    assert result.returncode == 0, result.stderr
+    assert "agent-gc000020: empty" in result.stdout
+    assert "Would remove 1 worktree(s)/branch(es)" in result.stdout
+    assert (git_repo / ".work" / "agent-gc000020").exists()
+    
+    result = run_agt(git_repo, "ws", "gc", "--empty")
+    assert result.returncode == 0, result.stderr
+    assert "Removed 1 worktree(s)/branch(es), reclaimed" in result.stdout
+    assert not (git_repo / ".work" / "agent-gc000020").exists()
+    assert _branches(git_repo) == []
@@ -0,0 +1,146 @@
+"""Tests for agt.journal module - per-worktree change journal."""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from agt import journal
+from agt.worktree import add_worktree, worktree_status
+
+from helpers import run_agt, run_git
+
+
+@pytest.fixture
+def git_repo(git_repo):
+    """The test repository with a .gitignore and a small package."""
+    (git_repo / ".gitignore").write_text("*.log\n")
+    (git_repo / "pkg").mkdir()
+    (git_repo / "pkg" / "a.py").write_text("a\n")
+    (git_repo / "pkg" / "b.py").write_text("b\n")
+    run_git(git_repo, "add", "-A")
+    run_git(git_repo, "commit", "-q", "--amend", "--no-edit")
+    return git_repo
+
+
+def _staged(worktree_path):
+    result = subprocess.run(
+        ["git", "diff", "--cached", "--name-status"], cwd=worktree_path, capture_output=True, text=True
+    )
+    return result.stdout.splitlines()
+
+
+def test_stage_only_journaled_paths(git_repo):
+    """Test that recorded changes are staged (adds, edits, deletes) and nothing else."""
+    worktree_path, _ = add_worktree(git_repo, "agent-jrnl0001", "main")
+    assert journal.enable(worktree_path)
+    
+    (worktree_path / "README.md").write_text("# Changed\n")
+    (worktree_path / "new.txt").write_text("new\n")
+    (worktree_path / "pkg" / "a.py").unlink()
+    (worktree_path / "debug.log").write_text("ignored\n")
+    (worktree_path / "pkg" / "b.py").write_text("unrecorded\n")
+    journal.record(worktree_path, ["README.md", worktree_path / "new.txt", "pkg/a.py", "debug.log", "README.md"])
+    assert journal.record(worktree_path, ["../outside.txt", ".git/index"]) == 0
+    
+    taken = journal.take(worktree_path)
+    assert journal.read_paths(taken) == ["README.md", "new.txt", "pkg/a.py", "debug.log"]
+    assert journal.get_journal_path(worktree_path).read_text() == ""
+    
+    assert journal.stage_paths(worktree_path, journal.read_paths(taken)) == 3
+    journal.finish(worktree_path, taken, saved=True)
+    assert _staged(worktree_path) == ["M\tREADME.md", "A\tnew.txt", "D\tpkg/a.py"]
+    assert not taken.exists()
+
+
+def test_directories_and_failed_saves(git_repo):
+    """Test directory expansion, moved-away directories and merging back on failure."""
+    worktree_path, _ = add_worktree(git_repo, "agent-jrnl0002", "main")
+    journal.enable(worktree_path)
+    
+    os.rename(worktree_path / "pkg", worktree_path / "lib")
+    journal.record(worktree_path, ["pkg", "lib"])
+    taken = journal.take(worktree_path)
+    journal.record(worktree_path, ["later.txt"])
+    journal.finish(worktree_path, taken, saved=False)
+    assert journal.get_journal_path(worktree_path).read_text().splitlines() == ["later.txt", "pkg", "lib"]
+    
+    journal.stage_paths(worktree_path, ["pkg", "lib"])
+    assert sorted(_staged(worktree_path)) == ["R100\tpkg/a.py\tlib/a.py", "R100\tpkg/b.py\tlib/b.py"]
+
+
+def test_dirty_or_overflowed_journal_means_full_scan(git_repo, monkeypatch):
+    """Test that a journal started on a dirty worktree, or grown too large, is not trusted."""
+    worktree_path, _ = add_worktree(git_repo, "agent-jrnl0003", "main")
+    (worktree_path / "new.txt").write_text("new\n")
+    journal.enable(worktree_path)
+    taken = journal.take(worktree_path)
+    assert journal.read_paths(taken) is None
+    journal.finish(worktree_path, taken, saved=True)
+    
+    journal.record(worktree_path, ["a"] * 10)
+    monkeypatch.setattr(journal, "MAX_JOURNAL_BYTES", 8)
+    assert journal.read_paths(journal.take(worktree_path)) is None
+
+
+def test_ws_touch_and_save(git_repo):
+    """Test that `ws save` commits only touched paths and keeps other changes."""
+    worktree_path, _ = add_worktree(git_repo, "agent-jrnl0004", "main")
+    (worktree_path / "README.md").write_text("# Changed\n")
+    (worktree_path / "pkg" / "b.py").write_text("unrecorded\n")
+    
+    # Journaling starts on a dirty worktree: the first save is a full scan
+    assert run_agt(worktree_path, "ws", "touch", "README.md").returncode == 0
+    result = run_agt(worktree_path, "ws", "save", "full")
+    assert result.returncode == 0
+    assert "journaled" not in result.stdout
+    
+    (worktree_path / "README.md").write_text("# Again\n")
+    (worktree_path / "pkg" / "b.py").write_text("unrecorded again\n")
+    assert run_agt(worktree_path / "pkg", "ws", "touch", "../README.md").returncode == 0
+    result = run_agt(worktree_path, "ws", "save", "journaled")
+    assert result.returncode == 0, result.stderr
+    assert "(1 journaled paths)" in result.stdout
+    
+    show = subprocess.run(["git", "show", "--name-only", "--format="], cwd=worktree_path, capture_output=True, text=True)
+    assert show.stdout.split() == ["README.md"]
+    assert worktree_status(worktree_path) == [(" M", "pkg/b.py")]
+    
+    assert run_agt(worktree_path, "ws", "touch", "/etc/passwd").returncode == 1
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+def test_watch_journals_changes(git_repo):
+    """Test that the inotify watcher journals edits, new directories and deletions."""
+    worktree_path, _ = add_worktree(git_repo, "agent-jrnl0005", "main")
+    stop = threading.Event()
+    ready = threading.Event()
+    watcher = threading.Thread(
+        target=journal.watch, args=(worktree_path,), kwargs={"stop": stop, "on_ready": lambda n: ready.set()}
+    )
+    watcher.start()
+    try:
+        assert ready.wait(5)
+        (worktree_path / "README.md").write_text("# Changed\n")
+        (worktree_path / "pkg" / "a.py").unlink()
+        (worktree_path / "deep" / "er").mkdir(parents=True)
+        (worktree_path / "deep" / "er" / "x.txt").write_text("x\n")
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            recorded = set(journal.get_journal_path(worktree_path).read_text().splitlines())
+            if {"README.md", "pkg/a.py", "deep/er/x.txt"} <= recorded:
+                break
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        watcher.join()
+    
+    taken = journal.take(worktree_path)
+    paths = journal.read_paths(taken)
+    assert {"README.md", "pkg/a.py", "deep/er/x.txt"} <= set(paths)
+    assert not any(p.startswith(".agt") for p in paths)
+    journal.stage_paths(worktree_path, paths)
+    assert _staged(worktree_path) == ["M\tREADME.md", "A\tdeep/er/x.txt", "D\tpkg/a.py"]
@@ -0,0 +1,122 @@
+"""Tests for agt.logs module - per-agent run logs."""
+
+import gzip
+import io
+import subprocess
+import threading
+
+from agt.logs import LOG_NAME, LogSink, follow, get_log_dir, rotate, tail
+from agt.worktree import add_worktree
+
+from helpers import run_agt
+
+
+def test_sink_rotates_and_compresses(tmp_path):
+    """Test that the live log rotates into gzip segments past max_bytes."""
+    sink = LogSink(tmp_path, max_bytes=100)
+    for i in range(30):
+        sink.write(f"line {i:02d}\n".encode())
+        if i % 10 == 9:
+            sink.close()
+            sink = LogSink(tmp_path, max_bytes=100)
+    sink.close()
+    
+    segments = sorted(tmp_path.glob(f"{LOG_NAME}.*.gz"))
+    assert segments
+    archived = b"".join(gzip.decompress(p.read_bytes()) for p in reversed(segments))
+    live = (tmp_path / LOG_NAME).read_bytes() if (tmp_path / LOG_NAME).exists() else b""
+    assert (archived + live).splitlines() == [f"line {i:02d}".encode() for i in range(30)]
+
+
+def test_rotate_keeps_bounded_segments(tmp_path):
+    """Test that only `keep` compressed segments are retained."""
+    for i in range(4):
+        (tmp_path / LOG_NAME).write_bytes(f"run {i}\n".encode())
+        rotate(tmp_path, keep=2)
+    
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{LOG_NAME}.1.gz", f"{LOG_NAME}.2.gz"]
+    assert gzip.decompress((tmp_path / f"{LOG_NAME}.1.gz").read_bytes()) == b"run 3\n"
+
+
+def test_sink_drops_oldest_output_when_ring_is_full(tmp_path):
+    """Test that a full ring drops old output instead of blocking, and says so."""
+    sink = LogSink(tmp_path, ring_bytes=10)
+    with sink._ready:
+        # Hold the writer off while the ring overflows
+        for i in range(5):
+            sink.write(f"chunk{i}\n".encode())
+    sink.close()
+    
+    content = (tmp_path / LOG_NAME).read_bytes()
+    assert b"bytes of output dropped" in content
+    assert content.endswith(b"chunk4\n")
+
+
+def test_tail_reads_last_lines(tmp_path):
+    """Test that tail returns exactly the last N lines across block boundaries."""
+    path = tmp_path / LOG_NAME
+    path.write_bytes(b"".join(f"line {i}\n".encode() for i in range(1000)))
+    
+    data, end = tail(path, 3, block_size=16)
+    
+    assert data == b"line 997\nline 998\nline 999\n"
+    assert end == path.stat().st_size
+    assert tail(path, 0)[0] == b""
+
+
+def test_follow_streams_appended_output_across_rotation(tmp_path):
+    """Test that follow picks up new output, including after a rotation."""
+    path = tmp_path / LOG_NAME
+    path.write_bytes(b"old\n")
+    out = io.BytesIO()
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=follow, args=(path, out), kwargs={"offset": 4, "poll_interval": 0.01, "stop": stop}
+    )
+    
+    def wait_for(expected):
+        for _ in range(500):
+            if out.getvalue().endswith(expected):
+                return
+            stop.wait(0.01)
+    
+    thread.start()
+    with open(path, "ab") as fh:
+        fh.write(b"new\n")
+    wait_for(b"new\n")
+    rotate(tmp_path)
+    path.write_bytes(b"after rotation\n")
+    wait_for(b"after rotation\n")
+    stop.set()
+    thread.join()
+    
+    assert out.getvalue() == b"new\nafter rotation\n"
+
+
+def test_ws_run_logs_output_and_ws_logs_shows_it(git_repo):
+    """Test that ws run tees into the agent log, kept out of git, and ws logs tails it."""
+    worktree_path, _ = add_worktree(git_repo, "agent-logs", "main")
+    
+    result = run_agt(git_repo, "ws", "run", "--agent", "agent-logs", "echo hello; echo oops >&2")
+    assert result.returncode == 0
+    assert result.stdout == "hello\n"
+    assert result.stderr == "oops\n"
+    
+    log = (get_log_dir(worktree_path) / LOG_NAME).read_text()
+    assert "hello\n" in log and "oops\n" in log and "=== exit 0" in log
+    status = subprocess.run(["git", "status", "--porcelain"], cwd=worktree_path, capture_output=True, text=True)
+    assert status.stdout == ""
+    
+    result = run_agt(git_repo, "ws", "logs", "agent-logs", "--lines", "2")
+    assert result.returncode == 0
+    assert result.stdout.splitlines()[-1] == "=== exit 0"
+
+
+def test_ws_run_no_log(git_repo):
+    """Test that --no-log runs without writing a log."""
+    worktree_path, _ = add_worktree(git_repo, "agent-nolog", "main")
+    
+    result = run_agt(git_repo, "ws", "run", "--agent", "agent-nolog", "--no-log", "exit 3")
+    
+    assert result.returncode == 3
+    assert not get_log_dir(worktree_path).exists()
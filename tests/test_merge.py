@@ -0,0 +1,120 @@
+"""Tests for agt.merge module - in-memory rebase and fast-forward."""
+
+import pytest
+
+from agt import merge
+from agt.worktree import add_worktree
+
+from helpers import run_agt, run_git
+
+
+@pytest.fixture
+def git_repo(git_repo, origin):
+    """The test repository with main pushed to a bare origin."""
+    run_git(git_repo, "push", "-q", "origin", "main")
+    return git_repo
+
+
+def _commit(cwd, files, message, author=None):
+    for name, content in files.items():
+        (cwd / name).write_text(content)
+    run_git(cwd, "add", "-A")
+    args = ["commit", "-m", message] + ([f"--author={author}"] if author else [])
+    run_git(cwd, *args)
+    return run_git(cwd, "rev-parse", "HEAD")
+
+
+def _advance_origin(repo, tmp_path, files):
+    """Land a commit on origin's main from a separate clone."""
+    clone = tmp_path / "other"
+    if not clone.exists():
+        run_git(tmp_path, "clone", "-q", str(tmp_path / "origin.git"), str(clone))
+        run_git(clone, "config", "user.name", "Other")
+        run_git(clone, "config", "user.email", "other@example.com")
+    run_git(clone, "pull", "-q")
+    _commit(clone, files, "upstream work")
+    run_git(clone, "push", "-q", "origin", "main")
+
+
+def test_rebase_keeps_authors_and_drops_empty_commits(git_repo):
+    """Test replaying commits in memory: authorship kept, already-applied changes dropped."""
+    run_git(git_repo, "checkout", "-q", "-b", "topic")
+    _commit(git_repo, {"a.txt": "a\n"}, "add a", author="Agent A <a@example.com>")
+    _commit(git_repo, {"shared.txt": "same\n"}, "add shared")
+    topic = run_git(git_repo, "rev-parse", "HEAD")
+    run_git(git_repo, "checkout", "-q", "main")
+    _commit(git_repo, {"shared.txt": "same\n", "b.txt": "b\n"}, "main work")
+    main = run_git(git_repo, "rev-parse", "HEAD")
+    status_before = run_git(git_repo, "status", "--porcelain")
+    
+    new_tip = merge.rebase(git_repo, main, topic)
+    assert run_git(git_repo, "rev-parse", f"{new_tip}^") == main
+    assert run_git(git_repo, "log", "-1", "--format=%an <%ae>|%s", new_tip) == "Agent A <a@example.com>|add a"
+    assert run_git(git_repo, "ls-tree", "--name-only", new_tip).split() == ["README.md", "a.txt", "b.txt", "shared.txt"]
+    # Nothing was checked out
+    assert run_git(git_repo, "rev-parse", "HEAD") == main
+    assert run_git(git_repo, "status", "--porcelain") == status_before
+    assert not (git_repo / "a.txt").exists()
+
+
+def test_rebase_conflict_names_paths(git_repo):
+    """Test that a conflicting commit raises MergeConflictError with the conflicted paths."""
+    run_git(git_repo, "checkout", "-q", "-b", "topic")
+    topic = _commit(git_repo, {"README.md": "# Topic\n"}, "topic readme")
+    run_git(git_repo, "checkout", "-q", "main")
+    main = _commit(git_repo, {"README.md": "# Main\n"}, "main readme")
+    
+    with pytest.raises(merge.MergeConflictError) as excinfo:
+        merge.rebase(git_repo, main, topic)
+    assert excinfo.value.commit == topic
+    assert excinfo.value.paths == ["README.md"]
+
+
+def test_merge_branch_updates_clean_root(git_repo, tmp_path):
+    """Test merging with the root on a clean main: origin, main, root files and the agent branch all move."""
+    worktree_path, branch = add_worktree(git_repo, "agent-mrg00001", "main")
+    _commit(worktree_path, {"agent.txt": "agent\n"}, "agent work")
+    _advance_origin(git_repo, tmp_path, {"upstream.txt": "up\n"})
+    
+    result = merge.merge_branch(git_repo, "agent-mrg00001")
+    assert result["main_updated"] and result["branch_updated"]
+    assert result["branch"] == branch
+    assert run_git(tmp_path / "origin.git", "rev-parse", "main") == result["commit"]
+    assert run_git(git_repo, "rev-parse", "main") == result["commit"]
+    assert (git_repo / "agent.txt").read_text() == "agent\n"
+    assert (git_repo / "upstream.txt").exists()
+    assert run_git(git_repo, "status", "--porcelain", "--untracked-files=no") == ""
+    # The agent's worktree follows its rebased branch
+    assert run_git(worktree_path, "rev-parse", "HEAD") == result["commit"]
+    assert (worktree_path / "upstream.txt").exists()
+
+
+def test_merge_branch_leaves_dirty_root_alone(git_repo, tmp_path):
+    """Test that a root worktree with local changes is neither checked out nor moved."""
+    worktree_path, _ = add_worktree(git_repo, "agent-mrg00002", "main")
+    _commit(worktree_path, {"agent.txt": "agent\n"}, "agent work")
+    old_main = run_git(git_repo, "rev-parse", "main")
+    (git_repo / "README.md").write_text("# Local edit\n")
+    
+    result = merge.merge_branch(git_repo, "agent-mrg00002")
+    assert result["main_updated"] is False
+    assert run_git(tmp_path / "origin.git", "rev-parse", "main") == result["commit"]
+    assert run_git(git_repo, "rev-parse", "main") == old_main
+    assert (git_repo / "README.md").read_text() == "# Local edit\n"
+    assert not (git_repo / "agent.txt").exists()
+
+
+def test_ws_merge_cli(git_repo, tmp_path):
+    """Test `agt ws merge` and its error on a conflict."""
+    worktree_path, _ = add_worktree(git_repo, "agent-mrg00003", "main")
+    _commit(worktree_path, {"x.txt": "x\n"}, "x")
+    result = run_agt(worktree_path, "ws", "merge")
+    assert result.returncode == 0, result.stderr
+    assert "Branch fast-forwarded to main" in result.stdout
+    assert run_git(tmp_path / "origin.git", "show", "main:x.txt") == "x"
+    
+    worktree_path, _ = add_worktree(git_repo, "agent-mrg00004", "main~1")
+    _commit(worktree_path, {"x.txt": "other\n"}, "other x")
+    result = run_agt(worktree_path, "ws", "merge")
+    assert result.returncode == 1
+    assert "conflicts in: x.txt" in result.stderr
@@ -0,0 +1,133 @@
+"""Tests for agt.mergequeue module - batched merge queue."""
+
+import time
+
+import pytest
+
+from agt import mergequeue
+from agt.worktree import add_worktree
+
+from helpers import run_agt, run_git
+
+
+@pytest.fixture
+def git_repo(git_repo, origin):
+    """The test repository with main pushed to a bare origin."""
+    run_git(git_repo, "push", "-q", "origin", "main")
+    return git_repo
+
+
+def _agent(repo, agent_id, files):
+    """Create an agent worktree with one commit writing `files`, and queue it."""
+    worktree_path, branch = add_worktree(repo, agent_id, "main")
+    for name, content in files.items():
+        (worktree_path / name).write_text(content)
+    run_git(worktree_path, "add", "-A")
+    run_git(worktree_path, "commit", "-m", f"{agent_id} work")
+    mergequeue.enqueue(repo, agent_id, branch, run_git(worktree_path, "rev-parse", "HEAD"))
+
+
+def test_batch_with_conflict_and_failing_branch(git_repo, tmp_path):
+    """Test stacking a batch, dropping a conflicting branch and bisecting a failing one."""
+    origin = tmp_path / "origin.git"
+    _agent(git_repo, "agent-mq000001", {"README.md": "# From agent 1\n", "one.txt": "1\n"})
+    _agent(git_repo, "agent-mq000002", {"two.txt": "2\n"})
+    _agent(git_repo, "agent-mq000003", {"bad.txt": "breaks verification\n"})
+    _agent(git_repo, "agent-mq000004", {"README.md": "# From agent 4\n"})
+    _agent(git_repo, "agent-mq000005", {"five.txt": "5\n"})
+    mergequeue.set_config(git_repo, verify="test ! -f bad.txt")
+    
+    reported = []
+    outcomes = mergequeue.run_queue(git_repo, report=reported.append)
+    assert outcomes == reported
+    status = {o["agent_id"]: o["status"] for o in outcomes}
+    assert status == {
+        "agent-mq000001": "merged",
+        "agent-mq000002": "merged",
+        "agent-mq000003": "failed",
+        "agent-mq000004": "failed",
+        "agent-mq000005": "merged",
+    }
+    assert "conflicts" in mergequeue.get_result(git_repo, "agent-mq000004")["detail"]
+    assert "verification failed" in mergequeue.get_result(git_repo, "agent-mq000003")["detail"]
+    assert mergequeue.list_queue(git_repo) == []
+    
+    # One linear push: main is the top of the stack
+    main = run_git(origin, "rev-parse", "main")
+    assert main == mergequeue.get_result(git_repo, "agent-mq000005")["commit"]
+    files = run_git(origin, "ls-tree", "--name-only", "main").split()
+    assert files == ["README.md", "five.txt", "one.txt", "two.txt"]
+    assert len(run_git(origin, "rev-list", "--merges", "main").split()) == 0
+    assert run_git(git_repo, "rev-parse", "main") == main
+    assert (git_repo / "five.txt").exists()
+
+
+def test_small_batches(git_repo, tmp_path):
+    """Test that the batch size splits the queue into several pushes."""
+    for n in range(3):
+        _agent(git_repo, f"agent-mq00001{n}", {f"f{n}.txt": f"{n}\n"})
+    mergequeue.set_config(git_repo, batch=2)
+    outcomes = mergequeue.run_queue(git_repo)
+    assert [o["status"] for o in outcomes] == ["merged"] * 3
+    assert outcomes[0]["commit"] != outcomes[1]["commit"]
+    assert run_git(tmp_path / "origin.git", "rev-parse", "main") == outcomes[2]["commit"]
+
+
+def test_ws_merge_queue_cli(git_repo, tmp_path):
+    """Test `agt ws merge --queue` with the background merger and `--status`."""
+    worktree_path, branch = add_worktree(git_repo, "agent-mq000020", "main")
+    (worktree_path / "x.txt").write_text("x\n")
+    run_git(worktree_path, "add", "x.txt")
+    run_git(worktree_path, "commit", "-m", "x")
+    
+    result = run_agt(worktree_path, "ws", "merge", "--queue", "--batch", "4")
+    assert result.returncode == 0, result.stderr
+    assert "Queued 1 branch(es) for merging into origin/main" in result.stdout
+    
+    deadline = time.time() + 30
+    while mergequeue.get_result(git_repo, "agent-mq000020") is None and time.time() < deadline:
+        time.sleep(0.1)
+    assert mergequeue.get_result(git_repo, "agent-mq000020")["status"] == "merged"
+    assert run_git(tmp_path / "origin.git", "show", "main:x.txt") == "x"
+    
+    result = run_agt(git_repo, "ws", "merge", "--status")
+    assert "Merge queue: batch 4, verify: -" in result.stdout
+
+
+def test_failing_main_leaves_batch_queued(git_repo, tmp_path):
+    """Test that when main itself fails verification, no branch is blamed."""
+    origin = tmp_path / "origin.git"
+    _agent(git_repo, "agent-mq000030", {"a.txt": "a\n"})
+    _agent(git_repo, "agent-mq000031", {"b.txt": "b\n"})
+    mergequeue.set_config(git_repo, verify="test -f ok.txt")
+    
+    with pytest.raises(mergequeue.BaseVerificationError, match="fails verification"):
+        mergequeue.run_queue(git_repo)
+    assert [e["agent_id"] for e in mergequeue.list_queue(git_repo)] == ["agent-mq000030", "agent-mq000031"]
+    assert mergequeue.get_result(git_repo, "agent-mq000030") is None
+    assert mergequeue.get_blocked(git_repo)["base"] == run_git(origin, "rev-parse", "main")
+    
+    result = run_agt(git_repo, "ws", "merge", "--status")
+    assert "Blocked: main" in result.stdout
+    result = run_agt(git_repo, "ws", "merge", "--run-queue")
+    assert result.returncode == 1
+    assert "branches left queued" in result.stderr
+    
+    # Once main is fixed the batch lands
+    (git_repo / "ok.txt").write_text("ok\n")
+    run_git(git_repo, "add", "ok.txt")
+    run_git(git_repo, "commit", "-m", "fix main")
+    run_git(git_repo, "push", "-q", "origin", "main")
+    outcomes = mergequeue.run_queue(git_repo)
+    assert [o["status"] for o in outcomes] == ["merged", "merged"]
+    assert mergequeue.get_blocked(git_repo) is None
+
+
+def test_ws_merge_queue_checks_all_branches_first(git_repo):
+    """Test that one missing branch queues none of the others."""
+    add_worktree(git_repo, "agent-mq000040", "main")
+    
+    result = run_agt(git_repo, "ws", "merge", "--queue", "--agents", "agent-mq000040,agent-missing")
+    assert result.returncode == 1
+    assert "Branch not found: feat/agent-missing" in result.stderr
+    assert mergequeue.list_queue(git_repo) == []
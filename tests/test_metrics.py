@@ -0,0 +1,100 @@
+"""Tests for agt.metrics module - per-run resource accounting."""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from agt import metrics
+from agt.worktree import add_worktree
+
+from helpers import run_agt
+
+
+@pytest.mark.skipif(not hasattr(os, "wait4"), reason="rusage needs wait4")
+def test_wait_with_usage_collects_cpu_and_memory():
+    """Test that CPU time and peak RSS of the child tree are collected."""
+    proc = subprocess.Popen(
+        [sys.executable, "-c", "x = bytearray(32 * 1024 * 1024); sum(range(3_000_000)); raise SystemExit(3)"]
+    )
+    returncode, usage = metrics.wait_with_usage(proc)
+    
+    assert returncode == 3
+    assert proc.returncode == 3
+    assert usage["user"] + usage["sys"] > 0
+    assert usage["maxrss_kb"] >= 32 * 1024
+    if sys.platform.startswith("linux") and os.path.exists(f"/proc/{os.getpid()}/io"):
+        assert "write_bytes" in usage
+
+
+def test_record_and_read_runs(git_repo):
+    """Test that records are appended as JSON lines and filtered by start time."""
+    now = time.time()
+    metrics.record_run(git_repo, "agent-one", "pytest -q", 0, now - 3600, 1.5, {"user": 1.0, "sys": 0.2})
+    metrics.record_run(git_repo, "agent-two", "pytest -q", 1, now, 0.5, cached=True)
+    
+    lines = metrics.get_metrics_path(git_repo).read_text().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0])["user"] == 1.0
+    
+    runs = metrics.read_runs(git_repo)
+    assert [run["agent"] for run in runs] == ["agent-one", "agent-two"]
+    assert runs[1]["cached"] is True
+    assert [run["agent"] for run in metrics.read_runs(git_repo, since=now - 60)] == ["agent-two"]
+
+
+def test_aggregate_percentiles():
+    """Test grouping and nearest-rank wall-time percentiles."""
+    runs = [{"agent": "a", "cmd": "make", "exit": 0, "wall": float(n), "user": 0.5} for n in range(1, 101)]
+    runs.append({"agent": "b", "cmd": "make", "exit": 2, "wall": 1000.0, "maxrss_kb": 2048})
+    
+    by_agent = {row["name"]: row for row in metrics.aggregate(runs, by="agent")}
+    assert by_agent["a"]["runs"] == 100
+    assert by_agent["a"]["wall_p50"] == 50.0
+    assert by_agent["a"]["wall_p90"] == 90.0
+    assert by_agent["a"]["wall_p99"] == 99.0
+    assert by_agent["a"]["cpu_total"] == pytest.approx(50.0)
+    assert by_agent["b"]["failed"] == 1
+    
+    (by_command,) = metrics.aggregate(runs, by="command")
+    assert by_command["runs"] == 101
+    assert by_command["maxrss_kb"] == 2048
+
+
+def test_parse_since():
+    """Test durations and ISO timestamps as window starts."""
+    assert metrics.parse_since("2h") == pytest.approx(time.time() - 7200, abs=5)
+    assert metrics.parse_since("1.5d") == pytest.approx(time.time() - 129600, abs=5)
+    assert metrics.parse_since("2026-01-02T03:04:05+00:00") == 1767323045.0
+    with pytest.raises(ValueError):
+        metrics.parse_since("yesterday")
+
+
+def test_ws_run_records_metrics_and_stats_reports_them(git_repo):
+    """Test that single, fan-out and cached runs are recorded and summarized."""
+    add_worktree(git_repo, "agent-one", "main")
+    add_worktree(git_repo, "agent-two", "main")
+    
+    assert run_agt(git_repo, "ws", "run", "--agent", "agent-one", "--no-log", "true").returncode == 0
+    assert run_agt(git_repo, "ws", "run", "--all", "exit 4").returncode == 4
+    assert run_agt(git_repo, "ws", "run", "--agent", "agent-one", "--cache", "echo hi").returncode == 0
+    assert run_agt(git_repo, "ws", "run", "--agent", "agent-one", "--cache", "echo hi").returncode == 0
+    
+    runs = metrics.read_runs(git_repo)
+    assert [(run["agent"], run["cmd"], run["exit"]) for run in runs[:1]] == [("agent-one", "true", 0)]
+    assert sorted(run["agent"] for run in runs if run["cmd"] == "exit 4") == ["agent-one", "agent-two"]
+    assert [bool(run.get("cached")) for run in runs if run["cmd"] == "echo hi"] == [False, True]
+    if hasattr(os, "wait4"):
+        assert "maxrss_kb" in runs[0]
+    
+    result = run_agt(git_repo, "stats", "command", "--since", "1h")
+    assert result.returncode == 0
+    rows = {line.split()[0]: line.split() for line in result.stdout.splitlines()[1:]}
+    assert rows["exit"][2:4] == ["2", "2"]  # 2 runs, 2 failed
+    assert rows["echo"][2:5] == ["2", "0", "1"]  # 2 runs, 1 cached
+    
+    result = run_agt(git_repo, "stats", "agent", "--agent", "agent-two")
+    assert [line.split()[0] for line in result.stdout.splitlines()[1:]] == ["agent-two"]
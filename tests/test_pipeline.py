@@ -0,0 +1,174 @@
+"""Tests for agt.pipeline module - declarative multi-agent pipelines."""
+
+import asyncio
+import json
+import subprocess
+
+import pytest
+
+from agt import pipeline, registry
+
+from helpers import run_agt
+
+
+def _run(repo, plan, name="plan", **kwargs):
+    state_path = repo / ".work" / ".pipeline" / f"{name}.json"
+    outcomes = asyncio.run(pipeline.run_pipeline(repo, pipeline.parse_plan(plan), state_path, retry_delay=0, **kwargs))
+    return outcomes, json.loads(state_path.read_text())
+
+
+def test_parse_plan_validates_and_normalizes():
+    """Test step normalization and rejection of invalid plans."""
+    plan = pipeline.parse_plan({
+        "agents": [
+            {"name": "a", "steps": [{"run": "make"}, {"save": "msg"}, "push"]},
+            {"name": "b", "needs": "a", "steps": [{"run": {"command": "make", "retries": 2}}, "clean"]},
+        ],
+    })
+    a, b = plan["agents"]
+    assert a["base"] == "main"
+    assert [s["kind"] for s in a["steps"]] == ["run", "save", "push"]
+    assert a["steps"][2]["arg"] == "origin"
+    assert b["needs"] == ["a"]
+    assert b["steps"][0] == {"kind": "run", "arg": "make", "retries": 2}
+    
+    invalid = [
+        {"agents": [{"name": "a", "steps": ["deploy"]}]},
+        {"agents": [{"name": "a", "steps": ["run"]}]},
+        {"agents": [{"name": "a"}, {"name": "a"}]},
+        {"agents": [{"name": "a", "needs": ["x"]}]},
+        {"agents": [{"name": "a", "needs": ["b"]}, {"name": "b", "needs": ["a"]}]},
+        {"steps": []},
+        {"agents": ["a"]},
+        {"agents": [], "jobs": 0},
+        {"agents": [], "jobs": "4"},
+        {"agents": [], "retries": -1},
+        {"agents": [{"name": "a", "steps": [{"run": {"command": "make", "retries": "x"}}]}]},
+    ]
+    for data in invalid:
+        with pytest.raises(ValueError):
+            pipeline.parse_plan(data)
+
+
+def test_dag_order_and_skipping_unchanged_steps(git_repo, capsys):
+    """Test dependency order, commits, and that a rerun skips everything unchanged."""
+    plan = {
+        "jobs": 4,
+        "agents": [
+            {"name": "gen", "steps": [{"run": "echo gen > gen.txt && echo built"}, {"save": "add gen"}]},
+            {"name": "check", "needs": ["gen"], "steps": [{"run": "echo checked"}]},
+            {"name": "noop", "steps": [{"run": "true"}, {"save": "nothing"}]},
+        ],
+    }
+    outcomes, state = _run(git_repo, plan)
+    
+    assert outcomes == {"gen": "done", "check": "done", "noop": "done"}
+    out = capsys.readouterr().out
+    assert "[gen] built" in out
+    assert "[noop] save: nothing (nothing to commit, skipped)" in out
+    assert out.index("[gen] save: add gen") < out.index("[check] new from main")
+    gen_path = git_repo / ".work" / state["gen"]["agent_id"]
+    log = subprocess.run(["git", "log", "--format=%s", "-1"], cwd=gen_path, capture_output=True, text=True)
+    assert log.stdout.strip() == "add gen"
+    assert all(entry["complete"] for entry in state.values())
+    
+    outcomes, state_again = _run(git_repo, plan)
+    assert outcomes == {"gen": "done", "check": "done", "noop": "done"}
+    assert "[gen] complete (unchanged, skipped)" in capsys.readouterr().out
+    assert state_again == state
+    assert len(registry.list_entries(git_repo)) == 3
+
+
+def test_retries_failures_and_resume(git_repo, capsys):
+    """Test retrying a flaky step, blocking dependents, and resuming after a fix."""
+    plan = {
+        "agents": [
+            {"name": "flaky", "steps": [{"run": {"command": "test -f .ok || { touch .ok; exit 1; }", "retries": 1}}]},
+            {"name": "broken", "steps": [{"run": "echo one >> ran.txt"}, {"run": "test -f ../../fixed"}]},
+            {"name": "after", "needs": ["broken"], "steps": [{"run": "true"}]},
+        ],
+    }
+    outcomes, state = _run(git_repo, plan)
+    assert outcomes == {"flaky": "done", "broken": "failed", "after": "blocked"}
+    err = capsys.readouterr().err
+    assert "[flaky] run: test -f .ok" in err and "retrying (1/1)" in err
+    assert "[after] blocked (needs broken)" in err
+    
+    # Fix what the failing step checks (outside the worktree): the worktree
+    # is unchanged, so the first step is skipped
+    broken_path = git_repo / ".work" / state["broken"]["agent_id"]
+    (git_repo / "fixed").write_text("")
+    outcomes, _ = _run(git_repo, plan)
+    assert outcomes == {"flaky": "done", "broken": "done", "after": "done"}
+    assert (broken_path / "ran.txt").read_text() == "one\n"
+    assert "[broken] run: echo one >> ran.txt (unchanged, skipped)" in capsys.readouterr().out
+
+
+def test_internal_error_fails_only_that_agent(git_repo, capsys, monkeypatch):
+    """Test that an error outside a step's command fails its agent without aborting the others."""
+    step_key = pipeline._step_key
+    
+    async def broken_key(step, worktree_path):
+        if step["arg"] == "echo boom":
+            raise subprocess.CalledProcessError(128, ["git", "ls-files"], stderr="fatal: index file corrupt")
+        return await step_key(step, worktree_path)
+    
+    monkeypatch.setattr(pipeline, "_step_key", broken_key)
+    plan = {
+        "agents": [
+            {"name": "bad", "steps": [{"run": "echo boom"}]},
+            {"name": "good", "steps": [{"run": "echo fine"}]},
+            {"name": "after", "needs": ["bad"], "steps": [{"run": "true"}]},
+        ],
+    }
+    outcomes, _ = _run(git_repo, plan)
+    assert outcomes == {"bad": "failed", "good": "done", "after": "blocked"}
+    assert "[bad] error (fatal: index file corrupt)" in capsys.readouterr().err
+
+
+def test_backoff_releases_slot(git_repo):
+    """Test that a step waiting to be retried lets other agents run meanwhile."""
+    plan = pipeline.parse_plan({
+        "jobs": 1,
+        "agents": [
+            {"name": "flaky", "steps": [{"run": {"command": "test -f ../../quick-ran || { touch ../../flaky-failed; exit 1; }", "retries": 1}}]},
+            {"name": "quick", "steps": [{"run": "touch ../../quick-ran"}]},
+        ],
+    })
+    state_path = git_repo / ".work" / ".pipeline" / "backoff.json"
+    outcomes = asyncio.run(pipeline.run_pipeline(git_repo, plan, state_path, retry_delay=0.5))
+    assert outcomes == {"flaky": "done", "quick": "done"}
+
+
+def test_ws_pipeline_cli(git_repo):
+    """Test running a YAML plan through `agt ws pipeline` and reporting failures."""
+    pytest.importorskip("yaml")
+    (git_repo / "plan.yml").write_text(
+        "agents:\n"
+        "  - name: one\n"
+        "    steps:\n"
+        "      - run: echo hello\n"
+        "      - clean\n"
+        "  - name: two\n"
+        "    needs: [one]\n"
+        "    steps:\n"
+        "      - run: exit 2\n"
+    )
+    result = run_agt(git_repo, "ws", "pipeline", "plan.yml")
+    assert result.returncode == 1
+    assert "[one] hello" in result.stdout
+    assert "1 of 2 agents did not finish: two" in result.stderr
+    # The cleaned agent is complete; only the failed one is left
+    assert len(registry.list_entries(git_repo)) == 1
+    
+    (git_repo / "bad.json").write_text('{"agents": [{"name": "a", "steps": ["deploy"]}]}')
+    result = run_agt(git_repo, "ws", "pipeline", "bad.json")
+    assert result.returncode == 1
+    assert "unknown step 'deploy'" in result.stderr
+    
+    # --retries 0 turns retries off (as `retries: 0` does in a plan)
+    (git_repo / "once.json").write_text('{"retries": 3, "agents": [{"name": "a", "steps": [{"run": "exit 1"}]}]}')
+    result = run_agt(git_repo, "ws", "pipeline", "once.json", "--retries", "0")
+    assert result.returncode == 1
+    assert "retrying" not in result.stderr
+    assert "1 of 1 agents did not finish: a" in result.stderr
@@ -0,0 +1,135 @@
+"""Tests for agt.plumbing module - index-only commits from stdin."""
+
+import base64
+import json
+import subprocess
+
+import pytest
+
+from agt import plumbing
+from agt.worktree import add_worktree, worktree_status
+
+from helpers import run_agt, run_git
+
+
+@pytest.fixture
+def git_repo(git_repo):
+    """The test repository with an executable script and a file to delete."""
+    (git_repo / "run.sh").write_text("echo hi\n")
+    (git_repo / "run.sh").chmod(0o755)
+    (git_repo / "old.txt").write_text("old\n")
+    run_git(git_repo, "add", "-A")
+    run_git(git_repo, "commit", "-q", "--amend", "--no-edit")
+    return git_repo
+
+
+def test_parse_entries_and_detect_format():
+    """Test the accepted input shapes and rejection of unsafe paths."""
+    assert plumbing.detect_format(b"diff --git a/x b/x\n") == "diff"
+    assert plumbing.detect_format(b'{"a": "1"}') == "json"
+    assert plumbing.detect_format(b'{"path": "a"}\n{"path": "b"}\n') == "ndjson"
+    
+    entries = plumbing.parse_entries(b'{"a.txt": "one", "./b/../c.txt": null}', "json")
+    assert entries == [
+        {"path": "a.txt", "data": b"one", "mode": None},
+        {"path": "c.txt", "data": None, "mode": None},
+    ]
+    blob = base64.b64encode(b"\x00\xff").decode()
+    entries = plumbing.parse_entries(
+        f'{{"path": "x.bin", "content": "{blob}", "encoding": "base64", "executable": true}}\n'
+        '{"path": "y", "content": "1"}\n{"path": "y", "content": "2"}\n'.encode(),
+        "ndjson",
+    )
+    assert entries == [
+        {"path": "x.bin", "data": b"\x00\xff", "mode": plumbing.MODE_EXECUTABLE},
+        {"path": "y", "data": b"2", "mode": None},
+    ]
+    for bad in ('{"../x": "1"}', '{"/etc/x": "1"}', '{".git/config": "1"}', '[{"content": "1"}]', '{"a": 1}'):
+        with pytest.raises(ValueError):
+            plumbing.parse_entries(bad.encode(), "json")
+
+
+def test_commit_entries(git_repo):
+    """Test adding, replacing (keeping the mode) and deleting files in one commit."""
+    worktree_path, _ = add_worktree(git_repo, "agent-plmb0001", "main")
+    entries = plumbing.parse_entries(json.dumps([
+        {"path": "src/new.py", "content": "print(1)\n"},
+        {"path": "run.sh", "content": "echo changed\n"},
+        {"path": "old.txt", "content": None},
+    ]).encode(), "json")
+    commit = plumbing.commit_entries(worktree_path, entries, "gen: update")
+    
+    assert run_git(worktree_path, "rev-parse", "HEAD")== commit
+    assert run_git(worktree_path, "log", "-1", "--format=%s")== "gen: update"
+    assert run_git(worktree_path, "show", "HEAD:src/new.py") == "print(1)"
+    assert run_git(worktree_path, "ls-files", "-s", "run.sh").startswith("100755 ")
+    assert (worktree_path / "src" / "new.py").read_text() == "print(1)\n"
+    assert not (worktree_path / "old.txt").exists()
+    assert worktree_status(worktree_path) == []
+    
+    assert plumbing.commit_entries(worktree_path, entries, "again") is None
+
+
+def test_commit_without_checkout_and_staged_changes(git_repo):
+    """Test --no-checkout leaves files alone, and staged changes are refused."""
+    worktree_path, _ = add_worktree(git_repo, "agent-plmb0002", "main")
+    plumbing.commit_entries(worktree_path, plumbing.parse_entries(b'{"gen.txt": "x"}', "json"), "gen", checkout=False)
+    assert run_git(worktree_path, "show", "HEAD:gen.txt") == "x"
+    assert not (worktree_path / "gen.txt").exists()
+    assert worktree_status(worktree_path) == [(" D", "gen.txt")]
+    
+    (worktree_path / "README.md").write_text("staged\n")
+    run_git(worktree_path, "add", "README.md")
+    with pytest.raises(ValueError, match="staged changes"):
+        plumbing.commit_entries(worktree_path, plumbing.parse_entries(b'{"a": "1"}', "json"), "msg")
+
+
+def test_failed_commit_leaves_index_untouched(git_repo, monkeypatch):
+    """Test that nothing stays staged when the branch moves under a commit."""
+    worktree_path, _ = add_worktree(git_repo, "agent-plmb0003", "main")
+    real_git = plumbing._git
+    
+    def racing_git(args, cwd, **kwargs):
+        if args[0] == "update-ref":
+            raced = run_git(cwd, "commit-tree", "HEAD^{tree}", "-p", "HEAD", "-m", "raced").strip()
+            run_git(cwd, "update-ref", "HEAD", raced)
+        return real_git(args, cwd, **kwargs)
+    
+    monkeypatch.setattr(plumbing, "_git", racing_git)
+    with pytest.raises(subprocess.CalledProcessError):
+        plumbing.commit_entries(worktree_path, plumbing.parse_entries(b'{"gen.txt": "x"}', "json"), "gen")
+    with pytest.raises(subprocess.CalledProcessError):
+        plumbing.commit_patch(worktree_path, b"--- /dev/null\n+++ b/new.txt\n@@ -0,0 +1 @@\n+new\n", "patch")
+    
+    assert run_git(worktree_path, "diff", "--cached", "--name-only") == ""
+    assert run_git(worktree_path, "log", "--format=%s", "-2").split() == ["raced", "raced"]
+    assert [p.name for p in (git_repo / ".git" / "worktrees" / "agent-plmb0003").glob("index*")] == ["index"]
+
+
+def test_ws_save_from_stdin(git_repo):
+    """Test `ws save --from-stdin` with NDJSON entries and with a diff."""
+    worktree_path, _ = add_worktree(git_repo, "agent-plmb0003", "main")
+    result = run_agt(worktree_path, "ws", "save", "--from-stdin", "ndjson save", input='{"path": "a.txt", "content": "a\\n"}\n')
+    assert result.returncode == 0, result.stderr
+    assert "Commit ready" in result.stdout
+    assert (worktree_path / "a.txt").read_text() == "a\n"
+    
+    patch = (
+        "diff --git a/README.md b/README.md\n"
+        "--- a/README.md\n"
+        "+++ b/README.md\n"
+        "@@ -1 +1,2 @@\n"
+        " # Test\n"
+        "+patched\n"
+    )
+    result = run_agt(git_repo, "ws", "save", "--agent", "agent-plmb0003", "--from-stdin", "--no-checkout", "diff save", input=patch)
+    assert result.returncode == 0, result.stderr
+    assert run_git(worktree_path, "show", "HEAD:README.md") == "# Test\npatched"
+    assert (worktree_path / "README.md").read_text() == "# Test\n"
+    
+    result = run_agt(worktree_path, "ws", "save", "--from-stdin", "--format", "json", "bad", input='{"../x": "1"}')
+    assert result.returncode == 1
+    assert "path must stay inside the worktree" in result.stderr
+    result = run_agt(worktree_path, "ws", "save", "--from-stdin", "same", input='{"a.txt": "a\\n"}')
+    assert result.returncode == 1
+    assert "Nothing to commit" in result.stderr
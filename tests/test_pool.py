@@ -0,0 +1,76 @@
+"""Tests for agt.pool module - warm worktree pool."""
+
+import subprocess
+
+from agt.pool import claim_worktree, drain_pool, fill_pool, get_pool_sizes, list_pooled, set_pool_size
+from agt.worktree import add_worktree, list_worktrees
+
+
+def test_fill_pool_reaches_target_size(git_repo):
+    """Test that fill_pool creates worktrees up to the configured size."""
+    set_pool_size(git_repo, "main", 2)
+    
+    assert get_pool_sizes(git_repo) == {"main": 2}
+    assert fill_pool(git_repo, "main") == 2
+    assert fill_pool(git_repo, "main") == 0
+    assert len(list_pooled(git_repo, "main")) == 2
+    # Pool entries are not agent worktrees
+    assert list_worktrees(git_repo) == []
+
+
+def test_claim_worktree_retargets_to_latest_base(git_repo):
+    """Test that a claimed worktree gets a fresh branch at the current base tip."""
+    fill_pool(git_repo, "main", size=1)
+    (git_repo / "new.txt").write_text("new\n")
+    subprocess.run(["git", "add", "new.txt"], cwd=git_repo, check=True, capture_output=True)
+    subprocess.run(["git", "commit", "-m", "Second"], cwd=git_repo, check=True, capture_output=True)
+    
+    agent_id, worktree_path, branch_name = claim_worktree(git_repo, "main")
+    
+    assert worktree_path == git_repo / ".work" / agent_id
+    assert branch_name == f"feat/{agent_id}"
+    assert (worktree_path / "new.txt").exists()
+    assert list_worktrees(git_repo) == [agent_id]
+    assert list_pooled(git_repo, "main") == []
+    head = subprocess.run(
+        ["git", "rev-parse", "--abbrev-ref", "HEAD"],
+        cwd=worktree_path, check=True, capture_output=True, text=True,
+    )
+    assert head.stdout.strip() == branch_name
+
+
+def test_claim_worktree_returns_none_when_empty(git_repo):
+    """Test that claiming from an empty pool returns None."""
+    assert claim_worktree(git_repo, "main") is None
+
+
+def test_claim_worktree_discards_unusable_entry(git_repo):
+    """Test that a pool entry that cannot be switched is removed and None returned."""
+    fill_pool(git_repo, "main", size=1)
+    # An untracked file in the entry blocks switching to the new base tip
+    (list_pooled(git_repo, "main")[0] / "new.txt").write_text("stray\n")
+    (git_repo / "new.txt").write_text("new\n")
+    subprocess.run(["git", "add", "new.txt"], cwd=git_repo, check=True, capture_output=True)
+    subprocess.run(["git", "commit", "-m", "Second"], cwd=git_repo, check=True, capture_output=True)
+    
+    assert claim_worktree(git_repo, "main") is None
+    
+    assert list_pooled(git_repo, "main") == []
+    assert list_worktrees(git_repo) == []
+    assert [p.name for p in (git_repo / ".work").iterdir() if p.name.startswith("agent-")] == []
+    worktrees = subprocess.run(
+        ["git", "worktree", "list", "--porcelain"],
+        cwd=git_repo, check=True, capture_output=True, text=True,
+    )
+    assert worktrees.stdout.count("worktree ") == 1
+    # The caller's fallback still works
+    add_worktree(git_repo, "agent-pool0001", "main")
+    assert list_worktrees(git_repo) == ["agent-pool0001"]
+
+
+def test_drain_pool_removes_idle_worktrees(git_repo):
+    """Test that drain_pool removes all pooled worktrees."""
+    fill_pool(git_repo, "main", size=2)
+    
+    assert drain_pool(git_repo, "main") == 2
+    assert list_pooled(git_repo, "main") == []
@@ -0,0 +1,69 @@
+"""Tests for agt.push module - batched push of agent branches."""
+
+from agt import push
+from agt.worktree import add_worktree
+
+from helpers import commit_file, run_agt, run_git
+
+
+def test_parse_porcelain():
+    """Test parsing per-ref results from `git push --porcelain`."""
+    output = (
+        "To /tmp/origin.git\n"
+        "*\trefs/heads/feat/a:refs/heads/feat/a\t[new branch]\n"
+        "!\trefs/heads/feat/b:refs/heads/feat/b\t[rejected] (non-fast-forward)\n"
+        "Done\n"
+    )
+    assert push.parse_porcelain(output) == {
+        "refs/heads/feat/a": ("*", "[new branch]"),
+        "refs/heads/feat/b": ("!", "[rejected] (non-fast-forward)"),
+    }
+
+
+def test_push_branches_in_one_push(git_repo, origin):
+    """Test pushing several branches at once, upstreams, and per-ref failures."""
+    paths = {}
+    for agent_id in ("agent-push0001", "agent-push0002", "agent-push0003"):
+        paths[agent_id], _ = add_worktree(git_repo, agent_id, "main")
+        commit_file(paths[agent_id], f"{agent_id}.txt")
+    
+    results = push.push_branches(git_repo, list(paths))
+    assert [(r["agent_id"], r["ok"], r["flag"]) for r in results] == [
+        ("agent-push0001", True, "*"),
+        ("agent-push0002", True, "*"),
+        ("agent-push0003", True, "*"),
+    ]
+    for agent_id, worktree_path in paths.items():
+        assert run_git(origin, "rev-parse", f"feat/{agent_id}") == run_git(worktree_path, "rev-parse", "HEAD")
+        assert run_git(git_repo, "config", f"branch.feat/{agent_id}.remote") == "origin"
+        assert run_git(worktree_path, "rev-parse", "--abbrev-ref", "@{upstream}") == f"origin/feat/{agent_id}"
+    
+    # Diverge agent 1 on the remote; the other refs still go through
+    run_git(origin, "update-ref", "refs/heads/feat/agent-push0001", run_git(paths["agent-push0002"], "rev-parse", "HEAD"))
+    commit_file(paths["agent-push0002"], "more2.txt")
+    
+    results = {r["agent_id"]: r for r in push.push_branches(git_repo, [*paths, "agent-missing"])}
+    assert results["agent-push0001"]["ok"] is False
+    assert "rejected" in results["agent-push0001"]["summary"]
+    assert results["agent-push0002"]["flag"] == " "
+    assert results["agent-push0003"]["flag"] == "="
+    assert results["agent-missing"] == {
+        "agent_id": "agent-missing", "branch": "feat/agent-missing", "ok": False, "flag": "!", "summary": "no such local branch",
+    }
+    assert run_git(origin, "rev-parse", "feat/agent-push0002") == run_git(paths["agent-push0002"], "rev-parse", "HEAD")
+
+
+def test_ws_push_all(git_repo, origin):
+    """Test `agt ws push --all` and `--agents` reporting."""
+    for agent_id in ("agent-push0004", "agent-push0005"):
+        worktree_path, _ = add_worktree(git_repo, agent_id, "main")
+        commit_file(worktree_path, "x.txt")
+    
+    result = run_agt(git_repo, "ws", "push", "--all")
+    assert result.returncode == 0, result.stderr
+    assert "agent-push0004: feat/agent-push0004 ([new branch])" in result.stdout
+    assert "Pushed 2 branches to origin in one push" in result.stdout
+    
+    result = run_agt(git_repo, "ws", "push", "nowhere", "--agents", "agent-push0004,agent-push0005")
+    assert result.returncode == 1
+    assert "2 of 2 branches were not pushed to nowhere" in result.stderr
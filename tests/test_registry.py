@@ -0,0 +1,81 @@
+"""Tests for agt.registry module - persistent worktree registry."""
+
+import shutil
+import subprocess
+
+from agt import registry
+from agt.worktree import add_worktree, list_worktrees, remove_worktree
+
+
+def test_add_and_remove_update_registry(git_repo, monkeypatch):
+    """Test that add_worktree/remove_worktree keep the registry in sync."""
+    monkeypatch.setenv("AGT_OWNER_PID", "4242")
+    head = subprocess.run(
+        ["git", "rev-parse", "HEAD"], cwd=git_repo, check=True, capture_output=True, text=True
+    ).stdout.strip()
+    
+    worktree_path, branch_name = add_worktree(git_repo, "agent-reg00001", "main")
+    
+    entry = registry.get_entry(git_repo, "agent-reg00001")
+    assert entry["path"] == str(worktree_path)
+    assert entry["branch"] == branch_name
+    assert entry["base_commit"] == head
+    assert entry["owner_pid"] == 4242
+    assert entry["state"] == registry.ACTIVE
+    
+    remove_worktree(git_repo, "agent-reg00001")
+    
+    assert registry.get_entry(git_repo, "agent-reg00001") is None
+    assert list_worktrees(git_repo) == []
+
+
+def test_lookups_skip_reconcile_when_git_metadata_unchanged(git_repo, monkeypatch):
+    """Test that agt's own changes don't force a `git worktree list` on lookup."""
+    # The first lookup syncs the registry with git
+    registry.reconcile(git_repo)
+    add_worktree(git_repo, "agent-reg00002", "main")
+    
+    def fail(*args, **kwargs):
+        raise AssertionError("unexpected reconcile")
+    
+    monkeypatch.setattr(registry, "_reconcile", fail)
+    assert list_worktrees(git_repo) == ["agent-reg00002"]
+
+
+def test_reconcile_picks_up_external_changes(git_repo):
+    """Test that worktrees added or deleted outside agt are reconciled lazily."""
+    add_worktree(git_repo, "agent-reg00003", "main")
+    subprocess.run(
+        ["git", "worktree", "add", "-q", str(git_repo / ".work" / "agent-manual"), "-b", "feat/manual"],
+        cwd=git_repo, check=True, capture_output=True,
+    )
+    
+    assert list_worktrees(git_repo) == ["agent-manual", "agent-reg00003"]
+    assert registry.get_entry(git_repo, "agent-manual")["branch"] == "feat/manual"
+    
+    # Deleting a worktree directory by hand makes it prunable
+    shutil.rmtree(git_repo / ".work" / "agent-reg00003")
+    
+    assert list_worktrees(git_repo, verify=True) == ["agent-manual"]
+    assert registry.get_entry(git_repo, "agent-reg00003") is None
+
+
+def test_plain_lookups_do_not_stat_every_worktree(git_repo, monkeypatch):
+    """Test that get_entry checks only its own row and list_entries checks disk only on request."""
+    add_worktree(git_repo, "agent-reg00004", "main")
+    add_worktree(git_repo, "agent-reg00005", "main")
+    registry.list_entries(git_repo)
+    checked = []
+    missing = registry._missing
+    
+    def spy(rows):
+        checked.append([row["agent_id"] for row in rows])
+        return missing(rows)
+    
+    monkeypatch.setattr(registry, "_missing", spy)
+    assert list_worktrees(git_repo) == ["agent-reg00004", "agent-reg00005"]
+    assert registry.get_entry(git_repo, "agent-reg00005")["state"] == registry.ACTIVE
+    assert checked == [["agent-reg00005"]]
+    
+    list_worktrees(git_repo, verify=True)
+    assert checked[-1] == ["agent-reg00004", "agent-reg00005"]
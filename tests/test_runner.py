@@ -0,0 +1,116 @@
+"""Tests for agt.runner module - concurrent fan-out runs."""
+
+import os
+import subprocess
+import sys
+import time
+
+from agt.runner import exit_status, run_in_worktrees
+from agt.worktree import add_worktrees
+
+
+def test_exit_status_maps_signals():
+    """Test that signal deaths map to 128 + signal number."""
+    assert exit_status(0) == 0
+    assert exit_status(3) == 3
+    assert exit_status(-15) == 143
+
+
+def test_run_in_worktrees_prefixes_output_and_reports_exit_codes(tmp_path, capsys):
+    """Test that each line is prefixed with its agent and failures are reported per agent."""
+    targets = []
+    for agent_id in ("agent-aaaa", "agent-bbbb"):
+        (tmp_path / agent_id).mkdir()
+        targets.append((agent_id, tmp_path / agent_id))
+    (tmp_path / "agent-bbbb" / "fail").write_text("")
+    
+    results = run_in_worktrees(targets, "echo one; echo two >&2; test ! -e fail || exit 3")
+    
+    assert [(agent_id, code) for agent_id, code, _ in results] == [("agent-aaaa", 0), ("agent-bbbb", 3)]
+    out, errors = capsys.readouterr()
+    assert sorted(out.splitlines()) == ["[agent-aaaa] one", "[agent-bbbb] one"]
+    assert sorted(errors.splitlines()) == ["[agent-aaaa] two", "[agent-bbbb] two"]
+
+
+def test_run_in_worktrees_caches_raw_output(git_repo, capsys):
+    """Test that fan-out runs store the same raw bytes in the run cache as single runs."""
+    from agt import cache
+    
+    agent_id, worktree_path, _, _ = add_worktrees(git_repo, ["main"])[0]
+    command = r"printf 'caf\351'; printf 'x\r\ny' >&2"
+    
+    run_in_worktrees([(agent_id, worktree_path)], command, root=git_repo, cache=True)
+    out, errors = capsys.readouterr()
+    assert out == f"[{agent_id}] caf\ufffd\n"
+    assert errors == f"[{agent_id}] x\r\n[{agent_id}] y\n"
+    records, code = cache.lookup(git_repo, cache.cache_key(worktree_path, command))
+    assert code == 0
+    assert sorted(records) == [(1, b"caf\xe9"), (2, b"x\r\n"), (2, b"y")]
+    
+    # A single-agent run hits the same entry and replays the bytes unchanged
+    result = subprocess.run(
+        [sys.executable, "-m", "agt", "ws", "run", "--agent", agent_id, "--cache", command],
+        cwd=git_repo,
+        capture_output=True,
+        env=dict(os.environ, AGT_NO_DAEMON="1"),
+    )
+    assert result.stdout == b"caf\xe9"
+    assert result.stderr.startswith(b"x\r\ny")
+    assert b"cached result" in result.stderr
+
+
+def test_run_in_worktrees_runs_concurrently(tmp_path):
+    """Test that the sweep takes about as long as one command, not the sum."""
+    targets = []
+    for i in range(4):
+        (tmp_path / f"agent-{i}").mkdir()
+        targets.append((f"agent-{i}", tmp_path / f"agent-{i}"))
+    
+    start = time.monotonic()
+    results = run_in_worktrees(targets, "sleep 0.5", jobs=4)
+    
+    assert time.monotonic() - start < 1.5
+    assert all(code == 0 for _, code, _ in results)
+
+
+def test_ws_run_all_aggregates_exit_status(git_repo):
+    """Test that `agt ws run --all` runs everywhere and exits with the worst status."""
+    results = add_worktrees(git_repo, ["main", "main"])
+    agent_ids = [agent_id for agent_id, _, _, _ in results]
+    (git_repo / ".work" / agent_ids[1] / "fail").write_text("")
+    
+    result = subprocess.run(
+        [sys.executable, "-m", "agt", "ws", "run", "--all", "--jobs", "2", "test ! -e fail || exit 4; echo ok"],
+        cwd=git_repo,
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, AGT_NO_DAEMON="1"),
+    )
+    
+    assert result.returncode == 4
+    assert f"[{agent_ids[0]}] ok" in result.stdout
+    assert f"[{agent_ids[1]}] ok" not in result.stdout
+    assert "1 of 2 agents failed" in result.stderr
+
+
+def test_ws_run_leaves_command_flags_alone(git_repo):
+    """Test that agt flags are only read before the command, not from inside it."""
+    results = add_worktrees(git_repo, ["main", "main"])
+    agent_id = results[0][0]
+    
+    def run(*args):
+        return subprocess.run(
+            [sys.executable, "-m", "agt", "ws", "run", *args],
+            cwd=git_repo,
+            capture_output=True,
+            text=True,
+            env=dict(os.environ, AGT_NO_DAEMON="1"),
+        )
+    
+    result = run("--agent", agent_id, "echo", "hello", "--all", "--jobs", "3")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == "hello --all --jobs 3\n"
+    
+    # Everything after -- is the command, even words agt knows
+    result = run("--agent", agent_id, "--", "echo", "--agent", "x")
+    assert result.stdout == "--agent x\n"
@@ -0,0 +1,112 @@
+"""Tests for agt.sched module - machine-wide CPU slots and child limits."""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from agt import sched
+from agt.worktree import add_worktree
+
+
+@pytest.fixture
+def slots(tmp_path, monkeypatch):
+    """Use a private slot directory with two slots."""
+    monkeypatch.setenv("AGT_SCHED_DIR", str(tmp_path / "sched"))
+    monkeypatch.setenv("AGT_SLOTS", "2")
+    return tmp_path / "sched"
+
+
+def test_parse_size():
+    """Test binary size suffixes."""
+    assert sched.parse_size("512") == 512
+    assert sched.parse_size("4k") == 4096
+    assert sched.parse_size("1.5G") == 1536 * 1024 * 1024
+    assert sched.parse_size("2MB") == 2 * 1024 * 1024
+    with pytest.raises(ValueError):
+        sched.parse_size("lots")
+
+
+def test_cpu_slots_block_until_weight_is_free(slots):
+    """Test that a run waits while other runs hold the slots it needs."""
+    released = threading.Event()
+    waited = []
+    
+    def holder():
+        with sched.cpu_slots(1):
+            released.wait(5)
+    
+    thread = threading.Thread(target=holder)
+    with sched.cpu_slots(1) as held:
+        assert held == [0]
+        thread.start()
+        for _ in range(100):
+            if sched.slot_usage() == (2, 2):
+                break
+            time.sleep(0.01)
+        assert sched.slot_usage() == (2, 2)
+    
+    # One slot is free again, but a weight-2 run needs both
+    start = time.monotonic()
+    threading.Timer(0.3, released.set).start()
+    with sched.cpu_slots(2, on_wait=lambda: waited.append(True)) as held:
+        assert sorted(held) == [0, 1]
+        assert time.monotonic() - start >= 0.25
+    thread.join()
+    assert waited == [True]
+    assert sched.slot_usage() == (0, 2)
+
+
+def test_default_sched_dir_is_private(tmp_path, monkeypatch):
+    """Test that the default slot directory is made 0700 and a foreign one is refused."""
+    monkeypatch.delenv("AGT_SCHED_DIR", raising=False)
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    sched_dir = sched.get_sched_dir()
+    assert sched_dir == tmp_path / f"agt-sched-{os.getuid()}"
+    assert os.stat(sched_dir).st_mode & 0o777 == 0o700
+    with sched.cpu_slots(1):
+        assert os.stat(sched_dir / "slot-0.lock").st_mode & 0o777 == 0o600
+    
+    # One that others can write to (e.g. created first by another user) is refused
+    os.chmod(sched_dir, 0o777)
+    with pytest.raises(PermissionError):
+        sched.get_sched_dir()
+
+
+def test_wrapper_applies_rlimits_and_affinity():
+    """Test that the wrapped command runs with limited open files and pinned CPUs."""
+    cpu = min(os.sched_getaffinity(0))
+    wrap = sched.make_wrapper(cpus={cpu}, max_files=64)
+    result = subprocess.run(
+        wrap(f"ulimit -n; {sys.executable} -c 'import os; print(sorted(os.sched_getaffinity(0)))'"),
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert result.stdout.split() == ["64", f"[{cpu}]"]
+    assert sched.make_wrapper() is None
+
+
+def test_ws_run_with_cpus_and_limits(git_repo, slots):
+    """Test that ws run holds its slots while the command runs and applies limits."""
+    add_worktree(git_repo, "agent-sched", "main")
+    
+    result = subprocess.run(
+        [
+            sys.executable, "-m", "agt", "ws", "run", "--agent", "agent-sched",
+            "--cpus", "2", "--max-files", "64", "--max-mem", "4G",
+            f"ulimit -n; {sys.executable} -m agt ws slots",
+        ],
+        cwd=git_repo,
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, AGT_NO_DAEMON="1"),
+    )
+    
+    assert result.returncode == 0, result.stderr
+    lines = result.stdout.splitlines()
+    assert lines[0] == "64"
+    assert lines[1].startswith("2/2 CPU slots busy")
@@ -0,0 +1,80 @@
+"""Tests for agt.spool module - asynchronous push spool."""
+
+from agt import spool
+from agt.worktree import add_worktree
+
+from helpers import commit_file, run_agt, run_git
+
+
+def test_coalesces_to_latest_commit(git_repo, origin):
+    """Test that queueing a branch again replaces the job and only the latest commit is pushed."""
+    worktree_path, branch = add_worktree(git_repo, "agent-spol0001", "main")
+    first = commit_file(worktree_path, "a.txt")
+    spool.enqueue(git_repo, "origin", branch, first)
+    second = commit_file(worktree_path, "b.txt")
+    spool.enqueue(git_repo, "origin", branch, second, agent_id="agent-spol0001")
+    assert [job["commit"] for job in spool.list_jobs(git_repo)] == [second]
+    
+    assert spool.drain(git_repo) == 1
+    assert spool.list_jobs(git_repo) == []
+    result = spool.get_result(git_repo, "origin", branch)
+    assert result["ok"] and result["commit"] == second
+    assert run_git(origin, "rev-parse", branch) == second
+    assert run_git(git_repo, "config", f"branch.{branch}.remote") == "origin"
+    # The earlier commit is contained in what landed
+    assert spool.wait_for(git_repo, "origin", branch, first, timeout=1) == result
+
+
+def test_retries_with_backoff_then_gives_up(git_repo, origin, tmp_path, monkeypatch):
+    """Test that transient failures back off and are given up after MAX_ATTEMPTS."""
+    worktree_path, branch = add_worktree(git_repo, "agent-spol0002", "main")
+    commit = commit_file(worktree_path, "a.txt")
+    unreachable = str(tmp_path / "missing.git")
+    spool.enqueue(git_repo, unreachable, branch, commit)
+    
+    assert spool.drain(git_repo, wait_retries=False) == 1
+    job = spool.get_job(git_repo, unreachable, branch)
+    assert job["attempts"] == 1 and job["last_error"]
+    assert job["next_attempt"] > job["queued_at"] + spool.RETRY_DELAY / 2
+    assert spool.drain(git_repo, wait_retries=False) == 0
+    
+    monkeypatch.setattr(spool, "RETRY_DELAY", 0.01)
+    monkeypatch.setattr(spool, "MAX_ATTEMPTS", 3)
+    spool.enqueue(git_repo, unreachable, branch, commit)
+    assert spool.drain(git_repo) == 3
+    result = spool.get_result(git_repo, unreachable, branch)
+    assert result["ok"] is False and result["error"]
+    assert spool.get_job(git_repo, unreachable, branch) is None
+
+
+def test_rejected_push_is_not_retried(git_repo, origin):
+    """Test that a non-fast-forward rejection fails the job at once."""
+    worktree_path, branch = add_worktree(git_repo, "agent-spol0003", "main")
+    other_path, _ = add_worktree(git_repo, "agent-spol0004", "main")
+    run_git(origin, "fetch", str(git_repo), f"{commit_file(other_path, 'other.txt')}:refs/heads/{branch}")
+    spool.enqueue(git_repo, "origin", branch, commit_file(worktree_path, "a.txt"))
+    
+    assert spool.drain(git_repo) == 1
+    result = spool.get_result(git_repo, "origin", branch)
+    assert result["ok"] is False
+    assert "rejected" in result["error"]
+
+
+def test_ws_push_async_and_wait(git_repo, origin):
+    """Test `agt ws push --async` returning at once and `--wait` blocking until landed."""
+    worktree_path, branch = add_worktree(git_repo, "agent-spol0005", "main")
+    commit = commit_file(worktree_path, "a.txt")
+    
+    result = run_agt(worktree_path, "ws", "push", "--async")
+    assert result.returncode == 0, result.stderr
+    assert "Queued 1 push(es) to origin" in result.stdout
+    
+    result = run_agt(worktree_path, "ws", "push", "--wait", "--timeout", "30")
+    assert result.returncode == 0, result.stderr
+    assert f"{branch} landed on origin ({commit[:12]})" in result.stdout
+    assert run_git(origin, "rev-parse", branch) == commit
+    
+    commit_file(worktree_path, "b.txt")
+    result = run_agt(worktree_path, "ws", "push", "--wait")
+    assert result.returncode == 1
+    assert "is queued" in result.stderr
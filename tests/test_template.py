@@ -0,0 +1,110 @@
+"""Tests for agt.template module - copy-on-write worktree materialization."""
+
+import os
+import subprocess
+
+import pytest
+
+from agt import template
+from agt.lock import file_lock
+from agt.template import clone_tree, get_template_dir
+from agt.worktree import add_worktree
+
+from helpers import run_git
+
+
+@pytest.fixture
+def git_repo(git_repo):
+    """The test repository with an executable script and a symlink."""
+    (git_repo / "src").mkdir()
+    (git_repo / "src" / "tool.sh").write_text("#!/bin/sh\necho hi\n")
+    (git_repo / "src" / "tool.sh").chmod(0o755)
+    os.symlink("src", git_repo / "link")
+    run_git(git_repo, "add", ".")
+    run_git(git_repo, "commit", "-q", "--amend", "--no-edit")
+    return git_repo
+
+
+def test_clone_tree_copy_preserves_files(git_repo, tmp_path):
+    """Test that clone_tree copies content, modes, mtimes and symlinks but not .git."""
+    dst = tmp_path / "clone"
+    dst.mkdir()
+    
+    assert clone_tree(git_repo, dst, mode="copy") == "copy"
+    
+    assert (dst / "README.md").read_text() == "# Test\n"
+    assert os.access(dst / "src" / "tool.sh", os.X_OK)
+    assert os.readlink(dst / "link") == "src"
+    assert not (dst / ".git").exists()
+    assert (dst / "README.md").stat().st_mtime == (git_repo / "README.md").stat().st_mtime
+
+
+def test_clone_tree_hardlink_shares_inodes(git_repo, tmp_path):
+    """Test that hardlink mode links files instead of copying them."""
+    dst = tmp_path / "clone"
+    dst.mkdir()
+    
+    clone_tree(git_repo, dst, mode="hardlink")
+    
+    assert (dst / "README.md").stat().st_ino == (git_repo / "README.md").stat().st_ino
+
+
+def test_add_worktree_cow_is_clean(git_repo):
+    """Test that a worktree cloned from a template is a clean checkout on its branch."""
+    worktree_path, branch_name = add_worktree(git_repo, "agent-cow00001", "main", cow="auto")
+    
+    assert (worktree_path / "src" / "tool.sh").exists()
+    assert len(list(get_template_dir(git_repo).glob("*/README.md"))) == 1
+    status = subprocess.run(
+        ["git", "status", "--porcelain"],
+        cwd=worktree_path, check=True, capture_output=True, text=True,
+    )
+    assert status.stdout == ""
+    head = subprocess.run(
+        ["git", "rev-parse", "--abbrev-ref", "HEAD"],
+        cwd=worktree_path, check=True, capture_output=True, text=True,
+    )
+    assert head.stdout.strip() == branch_name
+    
+    # The relaxed stat check applied to the refresh only, not the worktree's config
+    check_stat = subprocess.run(["git", "config", "core.checkStat"], cwd=worktree_path, capture_output=True)
+    assert check_stat.returncode == 1
+    
+    # Edits are detected
+    (worktree_path / "README.md").write_text("# Changed\n")
+    status = subprocess.run(
+        ["git", "status", "--porcelain"],
+        cwd=worktree_path, check=True, capture_output=True, text=True,
+    )
+    assert "README.md" in status.stdout
+
+
+def test_prune_skips_builds_and_templates_in_use(git_repo, monkeypatch):
+    """Test that pruning never removes a template being built or cloned from."""
+    monkeypatch.setattr(template, "MAX_TEMPLATES", 1)
+    commits = []
+    for i in range(3):
+        subprocess.run(["git", "commit", "--allow-empty", "-m", f"c{i}"], cwd=git_repo, check=True, capture_output=True)
+        commits.append(template.resolve_commit(git_repo, "HEAD"))
+    template_dir = get_template_dir(git_repo)
+    building = template_dir / f"building-{'f' * 40}"
+    building.mkdir(parents=True)
+    
+    with template.ensure_template(git_repo, commits[0]) as first:
+        os.utime(building, (0, 0))
+        # A clone from `first` is in progress while another template is made
+        with template.ensure_template(git_repo, commits[1]):
+            pass
+        assert first.exists()
+        assert building.exists()
+    
+    with file_lock(template_dir / f"{commits[0]}.lock", shared=True):
+        with template.ensure_template(git_repo, commits[2]):
+            pass
+    assert first.exists()
+    
+    with template.ensure_template(git_repo, commits[2]) as last:
+        assert last.exists()
+    assert not first.exists()
+    assert not (template_dir / commits[1]).exists()
+    assert building.exists()
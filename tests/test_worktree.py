@@ -1,12 +1,18 @@
 """Tests for agt.worktree module."""
 
-import pytest
+import subprocess
 from pathlib import Path
+
 from agt.worktree import (
+    add_worktree,
+    add_worktrees,
     generate_agent_id,
     get_repo_root,
     get_work_dir,
     get_worktree_path,
+    list_worktrees,
+    resolve_sparse_patterns,
+    worktree_status,
 )
 
 
@@ -59,3 +65,152 @@ def test_get_worktree_path():
     assert isinstance(worktree_path, Path)
     assert worktree_path == root / ".work" / agent_id
 
+
+def test_add_worktrees_creates_batch_in_parallel(git_repo):
+    """Test that add_worktrees creates one worktree per base branch."""
+    results = add_worktrees(git_repo, ["main"] * 6, jobs=4)
+    
+    assert len(results) == 6
+    assert all(error is None for _, _, _, error in results)
+    agent_ids = [agent_id for agent_id, _, _, _ in results]
+    assert len(set(agent_ids)) == 6
+    assert list_worktrees(git_repo) == sorted(agent_ids)
+    for agent_id, worktree_path, branch_name, _ in results:
+        assert worktree_path == git_repo / ".work" / agent_id
+        assert branch_name == f"feat/{agent_id}"
+        assert (worktree_path / "README.md").exists()
+
+
+def test_add_worktrees_reports_failures_per_worktree(git_repo):
+    """Test that a bad base branch fails only its own worktree."""
+    results = add_worktrees(git_repo, ["main", "does-not-exist"], jobs=2)
+    
+    assert results[0][3] is None
+    assert results[1][1] is None
+    assert results[1][3]
+
+
+def test_add_worktree_sparse_checks_out_only_cone(git_repo):
+    """Test that a sparse worktree materializes only the requested directories."""
+    for rel in ["svc/api/app.py", "svc/web/index.html", "libs/core.py"]:
+        path = git_repo / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x\n")
+    subprocess.run(["git", "add", "."], cwd=git_repo, check=True, capture_output=True)
+    subprocess.run(["git", "commit", "-m", "Layout"], cwd=git_repo, check=True, capture_output=True)
+    
+    worktree_path, _ = add_worktree(git_repo, "agent-sparse01", "main", sparse=["svc/api"])
+    
+    assert (worktree_path / "README.md").exists()
+    assert (worktree_path / "svc" / "api" / "app.py").exists()
+    assert not (worktree_path / "svc" / "web").exists()
+    assert not (worktree_path / "libs").exists()
+    status = subprocess.run(
+        ["git", "status", "--porcelain"],
+        cwd=worktree_path, check=True, capture_output=True, text=True,
+    )
+    assert status.stdout == ""
+
+
+def test_resolve_sparse_patterns_expands_profiles(git_repo):
+    """Test that profile names expand from agt.sparse.<name> git config."""
+    subprocess.run(["git", "config", "--add", "agt.sparse.backend", "svc/api"], cwd=git_repo, check=True)
+    subprocess.run(["git", "config", "--add", "agt.sparse.backend", "libs"], cwd=git_repo, check=True)
+    
+    assert resolve_sparse_patterns(git_repo, "backend") == ["svc/api", "libs"]
+    assert resolve_sparse_patterns(git_repo, "backend, docs,libs") == ["svc/api", "libs", "docs"]
+
+
+def test_get_repo_root_discovers_without_git(git_repo, monkeypatch):
+    """Test that repo discovery from the root, a subdir and a worktree needs no subprocess."""
+    from agt import worktree
+    
+    worktree_path, _ = add_worktree(git_repo, "agent-disc0001", "main")
+    (git_repo / "pkg" / "sub").mkdir(parents=True)
+    
+    def fail(*args, **kwargs):
+        raise AssertionError("unexpected git subprocess")
+    
+    monkeypatch.setattr(worktree, "_repo_root_from_git", fail)
+    monkeypatch.setattr(worktree, "_repo_root_cache", {})
+    for cwd in [git_repo, git_repo / "pkg" / "sub", worktree_path]:
+        assert get_repo_root(cwd) == git_repo.resolve()
+
+
+def test_get_repo_root_memoizes_per_cwd(git_repo, monkeypatch):
+    """Test that repeated lookups from the same directory hit the cache."""
+    from agt import worktree
+    
+    monkeypatch.setattr(worktree, "_repo_root_cache", {})
+    assert get_repo_root(git_repo) == git_repo.resolve()
+    
+    monkeypatch.setattr(worktree, "_discover_repo_root", lambda cwd: None)
+    monkeypatch.setattr(worktree, "_repo_root_from_git", lambda cwd: None)
+    assert get_repo_root(git_repo) == git_repo.resolve()
+
+
+def test_get_repo_root_submodule_is_its_own_root(git_repo, tmp_path):
+    """Test that a submodule checkout (gitdir: without commondir) is its own root."""
+    checkout = tmp_path / "separate"
+    subprocess.run(
+        ["git", "init", "-q", "--separate-git-dir", str(tmp_path / "separate.git"), str(checkout)],
+        check=True, capture_output=True,
+    )
+    
+    assert get_repo_root(checkout) == checkout.resolve()
+
+
+def test_get_repo_root_defers_to_git_when_git_dir_set(git_repo, monkeypatch):
+    """Test that GIT_DIR in the environment falls back to git itself."""
+    from agt import worktree
+    
+    calls = []
+    monkeypatch.setattr(worktree, "_repo_root_cache", {})
+    monkeypatch.setattr(worktree, "_repo_root_from_git", lambda cwd: calls.append(cwd) or git_repo)
+    monkeypatch.setenv("GIT_DIR", str(git_repo / ".git"))
+    
+    assert get_repo_root(git_repo) == git_repo
+    assert calls == [git_repo]
+
+
+def _git_config(worktree_path, key):
+    result = subprocess.run(["git", "config", key], cwd=worktree_path, capture_output=True, text=True)
+    return result.stdout.strip()
+
+
+def test_add_worktree_enables_fast_index(git_repo, monkeypatch):
+    """Test that AGT_FAST_INDEX=1 gives new worktrees the untracked cache, index v4 and a split index."""
+    monkeypatch.setenv("AGT_FAST_INDEX", "1")
+    worktree_path, _ = add_worktree(git_repo, "agent-fast0001", "main")
+    
+    assert _git_config(worktree_path, "core.untrackedCache") == "true"
+    assert _git_config(worktree_path, "index.version") == "4"
+    assert _git_config(worktree_path, "core.splitIndex") == "true"
+    # Per-worktree settings: the main worktree keeps git's defaults
+    assert _git_config(git_repo, "core.splitIndex") == ""
+    assert list((git_repo / ".git" / "worktrees" / "agent-fast0001").glob("sharedindex.*"))
+    
+    (worktree_path / "README.md").write_text("# Changed\n")
+    (worktree_path / "new dir").mkdir()
+    (worktree_path / "new dir" / "a.txt").write_text("a\n")
+    subprocess.run(["git", "mv", "README.md", "README.txt"], cwd=worktree_path, check=True)
+    assert worktree_status(worktree_path) == [("RM", "README.txt"), ("??", "new dir/")]
+
+
+def test_add_worktree_fast_index_is_opt_in(git_repo, monkeypatch):
+    """Test that new worktrees keep git's defaults unless agt.fastIndex or AGT_FAST_INDEX asks otherwise."""
+    monkeypatch.delenv("AGT_FAST_INDEX", raising=False)
+    worktree_path, _ = add_worktree(git_repo, "agent-slow0001", "main")
+    
+    assert _git_config(worktree_path, "core.untrackedCache") == ""
+    assert _git_config(git_repo, "extensions.worktreeConfig") == ""
+    assert worktree_status(worktree_path) == []
+    
+    subprocess.run(["git", "config", "agt.fastIndex", "true"], cwd=git_repo, check=True)
+    worktree_path, _ = add_worktree(git_repo, "agent-fast0002", "main")
+    assert _git_config(worktree_path, "core.untrackedCache") == "true"
+    
+    # The environment overrides the repository's setting
+    monkeypatch.setenv("AGT_FAST_INDEX", "0")
+    worktree_path, _ = add_worktree(git_repo, "agent-slow0002", "main")
+    assert _git_config(worktree_path, "core.untrackedCache") == ""